@@ -0,0 +1,2 @@
+print('Hello, World!')
+
@@ -0,0 +1,5 @@
+import string
+import random
+
+def random_string(length=10):
+    return ''.join(random.choice(string.ascii_lowercase) for i in range(length))
\ No newline at end of file
@@ -5,8 +5,8 @@ import logging
 import os
 from metagpt.software_company import generate_repo
 import socketio
-from eazytec_send import ConnectionState, get_connection_state,connection_states
-import json
+from metagpt.utils.oh_action_bus import OH_ACTION_PREFIX, OHActionSink
+from eazytec_send import FILE_REPLY, FILES_REPLY, MESSAGE_REPLY, ConnectionState, get_connection_state,connection_states
 import asyncio
 
 # 配置日志
@@ -23,24 +23,16 @@ sio = socketio.Client()
 
 
 
-class MetaGPTWrite:
+class MetaGPTWrite(OHActionSink):
     def __init__(self, conversation_id):
         self.conversation_id = conversation_id
 
-    def write(self, message):
-        if message is not None and len(message) > 0 and message.find("<OH_ACTION>") != -1:
-            if message.find("json_data") !=-1:
-                json_data = json.loads(message.split("json_data:")[1].strip())
-                #print(f"################metagpt, json data:{json_data}")
-
-                if 'conversation_id' in json_data:
-                    print(f"########### json data conv id:{json_data['conversation_id']}, sid:{self.conversation_id}")
-                    if json_data['conversation_id'] == self.conversation_id:
-                        sio.emit('eazytec_response', {
-                            'conversation_id': self.conversation_id,
-                            'message': message,
-                            'type': 'action'
-                        })
+    def send(self, action, payload):
+        sio.emit('eazytec_response', {
+            'conversation_id': self.conversation_id,
+            'message': f"{OH_ACTION_PREFIX}{payload}",
+            'type': 'action'
+        })
 
 @sio.event
 def connect():
@@ -89,15 +81,18 @@ def eazytec_request(data):
 
         if data['type'] == 'file':
             content = data['content']
-            state.doc_recv = content.strip()
-            state.continue_flag = True
-            print(f"##########state in data type file:{state}, content:{state.doc_recv}")
+            state.mailbox.deliver(FILE_REPLY, content.strip(), data.get('request_id'))
+            print(f"##########state in data type file:{state}, content:{content.strip()}")
+
+        if data['type'] == 'files':
+            content = data['content']
+            state.mailbox.deliver(FILES_REPLY, content, data.get('request_id'))
+            print(f"##########state in data type files:{state}, request_id:{data.get('request_id')}")
 
         if data['type'] == 'message':
             content = data['content']
-            state.msg_recv = content.strip()
-            state.msg_continue_flag = True
-            print(f"##########state in data type message:{state}, content:{state.msg_recv}")
+            state.mailbox.deliver(MESSAGE_REPLY, content.strip(), data.get('request_id'))
+            print(f"##########state in data type message:{state}, content:{content.strip()}")
 
     except Exception as e:
         logger.error(f"处理消息失败: {e}")
@@ -0,0 +1,281 @@
+"""
+基于 redis.asyncio 的会话分发器
+
+- 会话归属 (meta-server:{conversation_id}) 在本地缓存，带租约，只在首次见到会话时抢占
+- 抢占使用 SET NX EX + GET，多个会话的抢占合并到一个 pipeline 中
+- 租约续期按批次定时执行，只续期有活动的会话，Redis 往返次数从 O(消息数) 降到 O(会话数)
+- 每个会话一个有界队列和独立 worker，慢会话不会阻塞其它会话的归属检查
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[dict], Awaitable[Any]]
+
+# 只有当前持有者才能续期，避免延长其它机器的租约
+RENEW_LEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+@dataclass
+class Ownership:
+    """本地缓存的会话归属"""
+
+    owner: str
+    expires_at: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+
+@dataclass
+class Session:
+    """单个会话的有界消息队列及其 worker"""
+
+    conversation_id: str
+    queue: asyncio.Queue
+    worker: Optional[asyncio.Task] = None
+    background: Set[asyncio.Task] = field(default_factory=set)
+
+
+class SessionDispatcher:
+    """Redis 频道消息的会话级分发器
+
+    :param client: redis.asyncio 客户端
+    :param channel: 订阅的频道
+    :param machine_id: 当前机器 ID
+    :param handler: 消息处理协程
+    :param background_types: 需要在后台执行的消息类型（长任务），其余类型在会话 worker 中顺序执行
+    :param lease_ttl: 会话归属租约时长（秒）
+    :param renew_interval: 批量续期的间隔（秒）
+    :param foreign_ttl: 属于其它机器的会话在本地缓存的时长（秒）
+    :param queue_size: 每个会话的最大排队消息数
+    :param idle_timeout: 会话 worker 空闲多久（秒）后退出
+    :param key_prefix: 会话归属 key 前缀
+    """
+
+    def __init__(
+        self,
+        client,
+        channel: str,
+        machine_id: str,
+        handler: MessageHandler,
+        background_types: Iterable[str] = ("task",),
+        lease_ttl: int = 36000,
+        renew_interval: float = 600,
+        foreign_ttl: float = 30,
+        queue_size: int = 100,
+        idle_timeout: float = 3600,
+        key_prefix: str = "meta-server:",
+    ):
+        self.client = client
+        self.channel = channel
+        self.machine_id = machine_id
+        self.handler = handler
+        self.background_types = set(background_types)
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self.foreign_ttl = foreign_ttl
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.key_prefix = key_prefix
+
+        self._ownership: Dict[str, Ownership] = {}
+        self._sessions: Dict[str, Session] = {}
+        self._active: Set[str] = set()
+        self._pending_claims: Dict[str, asyncio.Future] = {}
+        self._claim_flush: Optional[asyncio.Task] = None
+        self._renew_script = client.register_script(RENEW_LEASE_LUA)
+
+    def ownership_key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}{conversation_id}"
+
+    async def run(self):
+        """订阅频道并持续分发消息，连接异常后自动重试"""
+        renewer = asyncio.create_task(self._renew_loop())
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Redis监听器发生错误: {str(e)}...")
+                    await asyncio.sleep(1)
+        finally:
+            renewer.cancel()
+            await self.close()
+
+    async def _listen(self):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        logger.info(f"开始监听Redis通道: {self.channel}")
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                except json.JSONDecodeError:
+                    logger.error(f"JSON解析错误: {message['data']}")
+                    continue
+                self.dispatch(data)
+        finally:
+            await pubsub.aclose()
+
+    def dispatch(self, data: dict) -> bool:
+        """将消息放入所属会话的队列，不等待 Redis，返回是否入队成功"""
+        conversation_id = data.get("conversation_id")
+        if conversation_id is None:
+            logger.warning("收到消息，但conversation_id为空，忽略")
+            return False
+
+        ownership = self._ownership.get(conversation_id)
+        if ownership and ownership.is_fresh(time.monotonic()) and ownership.owner != self.machine_id:
+            logger.info(f"会话 {conversation_id} 属于机器 {ownership.owner}，当前机器 {self.machine_id} 忽略此消息")
+            return False
+
+        session = self._sessions.get(conversation_id)
+        if session is None:
+            session = Session(conversation_id=conversation_id, queue=asyncio.Queue(maxsize=self.queue_size))
+            session.worker = asyncio.create_task(self._work(session))
+            self._sessions[conversation_id] = session
+        try:
+            session.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            logger.error(f"会话 {conversation_id} 队列已满({self.queue_size})，丢弃消息: {data.get('type')}")
+            return False
+        return True
+
+    async def _work(self, session: Session):
+        conversation_id = session.conversation_id
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(session.queue.get(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if session.background:
+                        continue
+                    break
+                try:
+                    try:
+                        owned = await self.is_owner(conversation_id)
+                    except Exception as e:
+                        logger.warning(f"会话 {conversation_id} 归属检查失败，忽略消息: {e}")
+                        continue
+                    if not owned:
+                        continue
+                    self._active.add(conversation_id)
+                    if data.get("type") in self.background_types:
+                        task = asyncio.create_task(self._handle(data))
+                        session.background.add(task)
+                        task.add_done_callback(session.background.discard)
+                    else:
+                        await self._handle(data)
+                finally:
+                    session.queue.task_done()
+        except asyncio.CancelledError:
+            for task in session.background:
+                task.cancel()
+            raise
+        finally:
+            if self._sessions.get(conversation_id) is session:
+                del self._sessions[conversation_id]
+
+    async def _handle(self, data: dict):
+        try:
+            await self.handler(data)
+        except Exception as e:
+            logger.exception(f"处理消息异常: {e}")
+
+    async def is_owner(self, conversation_id: str) -> bool:
+        """当前机器是否持有会话，本地缓存未命中或过期时才访问 Redis"""
+        ownership = self._ownership.get(conversation_id)
+        if ownership is None or not ownership.is_fresh(time.monotonic()):
+            owner = await self._claim(conversation_id)
+            ttl = self.lease_ttl if owner == self.machine_id else self.foreign_ttl
+            ownership = Ownership(owner=owner, expires_at=time.monotonic() + ttl)
+            self._ownership[conversation_id] = ownership
+            if owner == self.machine_id:
+                logger.info(f"会话 {conversation_id} 已分配给当前机器 {self.machine_id}")
+            else:
+                logger.info(f"会话 {conversation_id} 属于机器 {owner}，当前机器 {self.machine_id} 忽略此消息")
+        return ownership.owner == self.machine_id
+
+    async def _claim(self, conversation_id: str) -> str:
+        future = self._pending_claims.get(conversation_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending_claims[conversation_id] = future
+            if self._claim_flush is None or self._claim_flush.done():
+                self._claim_flush = asyncio.create_task(self._flush_claims())
+        return await asyncio.shield(future)
+
+    async def _flush_claims(self):
+        """把当前排队的抢占合并到一个 pipeline：每个会话 SET NX EX + GET"""
+        await asyncio.sleep(0)
+        claims, self._pending_claims = self._pending_claims, {}
+        if not claims:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for conversation_id in claims:
+                    key = self.ownership_key(conversation_id)
+                    pipe.set(key, self.machine_id, nx=True, ex=self.lease_ttl)
+                    pipe.get(key)
+                results = await pipe.execute()
+        except Exception as e:
+            for future in claims.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, future in enumerate(claims.values()):
+            owner = results[2 * i + 1]
+            owner = owner.decode("utf-8") if isinstance(owner, bytes) else owner
+            if not future.done():
+                future.set_result(owner or self.machine_id)
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.renew()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"会话租约续期失败: {e}")
+
+    async def renew(self):
+        """批量续期自上次续期以来有活动的会话，续期失败的会话从本地缓存中移除"""
+        active, self._active = self._active, set()
+        owned = [cid for cid in active if (o := self._ownership.get(cid)) and o.owner == self.machine_id]
+        if not owned:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for conversation_id in owned:
+                await self._renew_script(
+                    keys=[self.ownership_key(conversation_id)], args=[self.machine_id, self.lease_ttl], client=pipe
+                )
+            results = await pipe.execute()
+        expires_at = time.monotonic() + self.lease_ttl
+        for conversation_id, renewed in zip(owned, results):
+            if renewed:
+                self._ownership[conversation_id].expires_at = expires_at
+            else:
+                logger.warning(f"会话 {conversation_id} 的租约已失效，下次收到消息时重新抢占")
+                self._ownership.pop(conversation_id, None)
+
+    async def close(self):
+        for session in self._sessions.values():
+            if session.worker:
+                session.worker.cancel()
+        self._sessions.clear()
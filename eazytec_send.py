@@ -1,45 +1,156 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
 
 from metagpt.schema import Document
-from time import sleep
 
 # Dictionary to maintain conversation state per connection
 connection_states = {}
+_connection_states_lock = threading.Lock()
+
+# Kinds of replies sent back by OpenHands
+FILE_REPLY = "file"
+FILES_REPLY = "files"
+MESSAGE_REPLY = "message"
+
+# Replies nobody has asked for yet are kept per kind, oldest dropped first
+MAX_UNCLAIMED_REPLIES = 64
+
+# Seconds to wait for OpenHands to send a file back, and for the output of a command it runs
+DEFAULT_REPLY_TIMEOUT = 120
+DEFAULT_CMD_TIMEOUT = 1800
+
+
+def new_request_id() -> str:
+    """Return a new id used to correlate an OH_ACTION request with its reply"""
+    return uuid.uuid4().hex
+
 
 def get_connection_state(sio, sid):
     """Get or create state for a connection"""
     key = (sio.sid, sid)
-    if key not in connection_states:
-        connection_states[key] = ConnectionState(sio)
-        print(f"#########connect state of key: {key}, sio.sid:{sio.sid},session id{sid}")
-    return connection_states[key]
+    with _connection_states_lock:
+        if key not in connection_states:
+            connection_states[key] = ConnectionState(sio)
+            print(f"#########connect state of key: {key}, sio.sid:{sio.sid},session id{sid}")
+        return connection_states[key]
+
+
+class Mailbox:
+    """Replies from OpenHands for one connection, awaited by request id.
+
+    Waiters may live on any event loop (each `generate_*` call runs its own loop in a worker thread),
+    so replies are handed over with `call_soon_threadsafe`. A reply without a request id is given to
+    the oldest waiter of the same kind; a reply nobody waits for yet is kept until someone asks for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, "OrderedDict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]"] = {}
+        self._unclaimed: Dict[str, Deque[Tuple[Optional[str], str]]] = {}
+
+    def deliver(self, kind: str, content: str, request_id: Optional[str] = None):
+        """Resolve the waiter of `request_id` (or the oldest waiter of `kind`) with `content`."""
+        with self._lock:
+            waiters = self._waiters.get(kind)
+            waiter = None
+            if waiters:
+                if request_id is None:
+                    _, waiter = waiters.popitem(last=False)
+                elif request_id in waiters:
+                    waiter = waiters.pop(request_id)
+            if waiter is None:
+                self._unclaimed.setdefault(kind, deque(maxlen=MAX_UNCLAIMED_REPLIES)).append((request_id, content))
+                return
+        loop, future = waiter
+        loop.call_soon_threadsafe(_set_future_result, future, content)
+
+    async def receive(self, kind: str, request_id: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """Wait for the reply of `kind` matching `request_id`.
+
+        :raises asyncio.TimeoutError: if no reply arrives within `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        key = request_id or new_request_id()
+        with self._lock:
+            content = self._take_unclaimed(kind, request_id)
+            if content is not None:
+                return content
+            future = loop.create_future()
+            self._waiters.setdefault(kind, OrderedDict())[key] = (loop, future)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(kind)
+                if waiters and key in waiters and waiters[key][1] is future:
+                    del waiters[key]
+
+    def _take_unclaimed(self, kind: str, request_id: Optional[str]) -> Optional[str]:
+        unclaimed = self._unclaimed.get(kind)
+        if not unclaimed:
+            return None
+        for i, (rid, content) in enumerate(unclaimed):
+            if rid is None or request_id is None or rid == request_id:
+                del unclaimed[i]
+                return content
+        return None
+
+    def pending(self, kind: str) -> int:
+        """Return the number of outstanding waiters of `kind`."""
+        with self._lock:
+            return len(self._waiters.get(kind, ()))
+
+
+def _set_future_result(future: asyncio.Future, content: str):
+    if not future.done():
+        future.set_result(content)
+
 
 class ConnectionState:
     def __init__(self, sio):
         self.sio = sio
         self.sid_stream_obj = {}
-        self.doc_recv = None
-        self.msg_recv = ""
-        self.continue_flag = False
-        self.msg_continue_flag = False
+        self.mailbox = Mailbox()
+
 
-def set_doc_for_recv(sio, sid, doc:Document):
+async def set_doc_for_recv(sio, sid, doc: Document, request_id: str = None, timeout: float = None):
     state = get_connection_state(sio, sid)
 
-    #print(f"######### continue wait for sig sio: {sio}, sid:{sid}")
-    while not state.continue_flag:
-        sleep(0.2)
-    state.continue_flag = False
-    doc.content = state.doc_recv
+    doc.content = await state.mailbox.receive(FILE_REPLY, request_id=request_id, timeout=timeout)
     print(f"######### continue wait get doc: {doc.content}")
 
 
-def get_msg_for_recv(sio, sid):
+async def get_docs_for_recv(sio, sid, request_id: str = None, timeout: float = None) -> Dict[str, str]:
+    """Wait for the reply of a FILE_READ_BATCH request, a mapping of file path to content"""
     state = get_connection_state(sio, sid)
 
-    #print(f"######### continue wait for sig sio: {sio}, sid:{sid}")
-    while not state.msg_continue_flag:
-        sleep(0.2)
-    state.msg_continue_flag = False
-    content = state.msg_recv
+    content = await state.mailbox.receive(FILES_REPLY, request_id=request_id, timeout=timeout)
+    files = json.loads(content) if isinstance(content, str) else content
+    print(f"######### continue wait get docs: {list(files.keys())}")
+    return files
+
+
+async def get_msg_for_recv(sio, sid, request_id: str = None, timeout: float = None):
+    state = get_connection_state(sio, sid)
+
+    content = await state.mailbox.receive(MESSAGE_REPLY, request_id=request_id, timeout=timeout)
     print(f"######### continue wait get msg: {content}")
     return content
+
+
+async def get_cmd_output_for_recv(sio, sid, request_id: str, timeout: float = DEFAULT_CMD_TIMEOUT) -> str:
+    """Wait for the output of a CMD_RUN request.
+
+    A reply lost or not sent within `timeout` seconds gives an error output instead of hanging the role, so the
+    caller reports the command as failed.
+    """
+    try:
+        return await get_msg_for_recv(sio, sid, request_id=request_id, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"######### no reply of request {request_id} within {timeout}s")
+        error = f"Error: no output of the command received within {timeout}s, it hung or its reply was lost"
+        return f"\nCONSOLE OUTPUTS: \n\n{error}\n"
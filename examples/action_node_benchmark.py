@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : action_node_benchmark.py
+@Desc    : Micro-benchmark of the CPU an `ActionNode.fill` spends outside the LLM, with and without the schema cache.
+
+    python examples/action_node_benchmark.py --rounds 200
+"""
+import asyncio
+import time
+
+import fire
+
+from metagpt.actions.action_node import SCHEMA_CACHE, TAG
+from metagpt.actions.design_api_an import DESIGN_API_NODE
+from metagpt.actions.project_management_an import PM_NODE
+from metagpt.actions.write_prd_an import WRITE_PRD_NODE
+
+
+class EchoLLM:
+    """Answers every prompt with the node's own example, so only the node's work is measured."""
+
+    def __init__(self, answer: str):
+        self.answer = answer
+
+    async def aask(self, *args, **kwargs) -> str:
+        return self.answer
+
+
+async def cpu_per_fill(node, rounds: int, cached: bool) -> float:
+    llm = EchoLLM(node.compile_example(schema="json", tag=TAG))
+    await node.fill(context="benchmark", llm=llm)  # warm up imports and the class registry
+    start = time.process_time()
+    for _ in range(rounds):
+        if not cached:
+            SCHEMA_CACHE.clear()
+        await node.fill(context="benchmark", llm=llm)
+    return (time.process_time() - start) / rounds
+
+
+async def benchmark(rounds: int = 100):
+    for node in (WRITE_PRD_NODE, DESIGN_API_NODE, PM_NODE):
+        uncached = await cpu_per_fill(node, rounds, cached=False)
+        cached = await cpu_per_fill(node, rounds, cached=True)
+        print(
+            f"{node.key:<12} uncached {uncached * 1000:7.3f} ms/fill  cached {cached * 1000:7.3f} ms/fill  "
+            f"saved {(uncached - cached) * 1000:7.3f} ms/fill ({(1 - cached / uncached) * 100:.0f}%)"
+        )
+
+
+def main(rounds: int = 100):
+    asyncio.run(benchmark(rounds))
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
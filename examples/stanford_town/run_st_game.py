@@ -11,6 +11,10 @@ import fire
 from metagpt.ext.stanford_town.roles.st_role import STRole
 from metagpt.ext.stanford_town.stanford_town import StanfordTown
 from metagpt.ext.stanford_town.utils.const import STORAGE_PATH
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    DEFAULT_EMBEDDING_MODEL,
+    EmbeddingService,
+)
 from metagpt.ext.stanford_town.utils.mg_ga_transform import (
     get_reverie_meta,
     write_curr_sim_code,
@@ -67,6 +71,7 @@ def main(
     temp_storage_path: Optional[str] = None,
     investment: float = 30.0,
     n_round: int = 500,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
 ):
     """
     Args:
@@ -76,7 +81,9 @@ def main(
         temp_storage_path: generative_agents temp_storage path inside `environment/frontend_server` to interact.
         investment: the investment of running agents
         n_round: rounds to run agents
+        embedding_model: embedding model of the agent memories, `local` for a deterministic offline one
     """
+    EmbeddingService.set_default(EmbeddingService.for_model(embedding_model))
 
     asyncio.run(
         startup(
@@ -10,7 +10,9 @@ NOTE: You should use typing.List instead of list to do type annotation. Because
 """
 import json
 import re
+import threading
 import typing
+from collections import OrderedDict
 from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple, Type, Union
 
@@ -20,11 +22,12 @@ from tenacity import retry, stop_after_attempt, wait_random_exponential
 from metagpt.actions.action_outcls_registry import register_action_outcls
 from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.llm import BaseLLM
-from metagpt.logs import logger
+from metagpt.logs import llm_stream_listener, logger
 from metagpt.provider.postprocess.llm_output_postprocess import llm_output_postprocess
 from metagpt.utils.common import OutputParser, general_after_log
 from metagpt.utils.human_interaction import HumanInteraction
 from metagpt.utils.sanitize import sanitize
+from metagpt.utils.stream_output_parser import StreamingOutputParser
 
 
 class ReviewMode(Enum):
@@ -130,6 +133,46 @@ def dict_to_markdown(d, prefix="- ", kv_sep="\n", postfix="\n"):
     return markdown_str
 
 
+class SchemaCache:
+    """LRU cache of what an ActionNode derives from its schema only: output classes, mappings and prompt texts.
+
+    Keys include `ActionNode.fingerprint`, so a node whose keys, types, instructions or examples change gets new
+    entries instead of stale ones.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    def get_or_create(self, key: tuple, factory: typing.Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+SCHEMA_CACHE = SchemaCache()
+
+
 class ActionNode:
     """ActionNode is a tree of nodes."""
 
@@ -241,6 +284,29 @@ class ActionNode:
             return self._get_children_mapping(exclude=exclude)
         return {} if exclude and self.key in exclude else self._get_self_mapping()
 
+    def _signature(self) -> tuple:
+        return (
+            self.key,
+            repr(self.expected_type),
+            self.instruction,
+            repr(self.example),
+            tuple(child._signature() for child in self.children.values()),
+        )
+
+    def fingerprint(self, mode="auto", exclude=None) -> tuple:
+        """A hashable key of everything the mapping, output class and prompt texts under `mode` depend on"""
+        return mode, tuple(sorted(exclude or [])), self._signature()
+
+    def _mapping_mode(self, mode: str) -> str:
+        """The mode `get_mapping` resolves `mode` to"""
+        return "children" if mode == "children" or (mode == "auto" and self.children) else "root"
+
+    def _cached_mapping(self, mode="children", exclude=None) -> Dict[str, Tuple[Type, Any]]:
+        """`get_mapping` shared between calls, do not modify it"""
+        mode = self._mapping_mode(mode)
+        key = ("mapping", self.fingerprint(mode, exclude))
+        return SCHEMA_CACHE.get_or_create(key, lambda: self.get_mapping(mode=mode, exclude=exclude))
+
     @classmethod
     @register_action_outcls
     def create_model_class(cls, class_name: str, mapping: Dict[str, Tuple[Type, Any]]):
@@ -281,14 +347,15 @@ class ActionNode:
 
     def create_class(self, mode: str = "auto", class_name: str = None, exclude=None):
         class_name = class_name if class_name else f"{self.key}_AN"
-        mapping = self.get_mapping(mode=mode, exclude=exclude)
-        return self.create_model_class(class_name, mapping)
+        mode = self._mapping_mode(mode)
+        key = ("class", class_name, self.fingerprint(mode, exclude))
+        return SCHEMA_CACHE.get_or_create(
+            key, lambda: self.create_model_class(class_name, self._cached_mapping(mode=mode, exclude=exclude))
+        )
 
     def _create_children_class(self, exclude=None):
         """使用object内有的字段直接生成model_class"""
-        class_name = f"{self.key}_AN"
-        mapping = self._get_children_mapping(exclude=exclude)
-        return self.create_model_class(class_name, mapping)
+        return self.create_class(mode="children", exclude=exclude)
 
     def to_dict(self, format_func=None, mode="auto", exclude=None) -> Dict:
         """将当前节点与子节点都按照node: format的格式组织成字典"""
@@ -367,7 +434,10 @@ class ActionNode:
     def compile_instruction(self, schema="markdown", mode="children", tag="", exclude=None) -> str:
         """compile to raw/json/markdown template with all/root/children nodes"""
         format_func = lambda i: f"{i.expected_type}  # {i.instruction}"
-        return self._compile_f(schema, mode, tag, format_func, kv_sep=": ", exclude=exclude)
+        key = ("instruction", schema, tag, self.fingerprint(mode, exclude))
+        return SCHEMA_CACHE.get_or_create(
+            key, lambda: self._compile_f(schema, mode, tag, format_func, kv_sep=": ", exclude=exclude)
+        )
 
     def compile_example(self, schema="json", mode="children", tag="", exclude=None) -> str:
         """compile to raw/json/markdown examples with all/root/children nodes"""
@@ -375,7 +445,10 @@ class ActionNode:
         # 这里不能使用f-string，因为转译为str后再json.dumps会额外加上引号，无法作为有效的example
         # 错误示例："File list": "['main.py', 'const.py', 'game.py']", 注意这里值不是list，而是str
         format_func = lambda i: i.example
-        return self._compile_f(schema, mode, tag, format_func, kv_sep="\n", exclude=exclude)
+        key = ("example", schema, tag, self.fingerprint(mode, exclude))
+        return SCHEMA_CACHE.get_or_create(
+            key, lambda: self._compile_f(schema, mode, tag, format_func, kv_sep="\n", exclude=exclude)
+        )
 
     def compile(self, context, schema="json", mode="children", template=SIMPLE_TEMPLATE, exclude=[]) -> str:
         """
@@ -432,11 +505,15 @@ class ActionNode:
         system_msgs: Optional[list[str]] = None,
         schema="markdown",  # compatible to original format
         timeout=USE_CONFIG_TIMEOUT,
+        output_class: Optional[Type[BaseModel]] = None,
     ) -> (str, BaseModel):
         """Use ActionOutput to wrap the output of aask"""
-        content = await self.llm.aask(prompt, system_msgs, images=images, timeout=timeout)
+        output_class = output_class or self.create_model_class(output_class_name, output_data_mapping)
+        # validate the fields while the reply streams in, a hopeless reply is abandoned before it completes
+        parser = StreamingOutputParser(output_class, schema=schema, mapping=output_data_mapping, node=self.key)
+        with llm_stream_listener(parser.feed):
+            content = await self.llm.aask(prompt, system_msgs, images=images, timeout=timeout)
         logger.debug(f"llm raw output:\n{content}")
-        output_class = self.create_model_class(output_class_name, output_data_mapping)
 
         if schema == "json":
             parsed_data = llm_output_postprocess(
@@ -468,10 +545,11 @@ class ActionNode:
     ):
         prompt = self.compile(context=self.context, schema=schema, mode=mode, exclude=exclude)
         if schema != "raw":
-            mapping = self.get_mapping(mode, exclude=exclude)
+            mapping = self._cached_mapping(mode, exclude=exclude)
             class_name = f"{self.key}_AN"
+            output_class = self.create_class(mode=mode, class_name=class_name, exclude=exclude)
             content, scontent = await self._aask_v1(
-                prompt, class_name, mapping, images=images, schema=schema, timeout=timeout
+                prompt, class_name, mapping, images=images, schema=schema, timeout=timeout, output_class=output_class
             )
             self.content = content
             self.instruct_content = scontent
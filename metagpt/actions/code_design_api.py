@@ -5,6 +5,7 @@ import json
 from metagpt.actions import Action, ActionOutput
 from metagpt.schema import Document, Documents, Message
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.const import DATA_API_DESIGN_FILE_REPO, SEQ_FLOW_FILE_REPO, DESIGN_FILENAME, PRD_FILENAME, CODEDESIGN_FILENAME, SIMULATE_ROOT
 from metagpt.utils.mermaid import mermaid_to_file
 from metagpt.utils.json_to_markdown import json_to_markdown
@@ -59,7 +60,7 @@ class WriteCodeDesignAPI(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data, ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         doc = await self._update_code_desgin(filename=filename)
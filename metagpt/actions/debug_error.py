@@ -14,9 +14,9 @@ from pydantic import Field
 
 from metagpt.actions.action import Action
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import RunCodeContext, RunCodeResult
 from metagpt.utils.common import CodeParser
-import json
 
 PROMPT_TEMPLATE = """
 NOTICE
@@ -75,7 +75,7 @@ class DebugError(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         code_doc = await self.repo.with_src_path(self.context.src_workspace).srcs.get(
@@ -24,6 +24,7 @@ from metagpt.actions.design_api_an import (
 )
 from metagpt.const import DATA_API_DESIGN_FILE_REPO, SEQ_FLOW_FILE_REPO, DESIGN_FILENAME, PRD_FILENAME, SIMULATE_ROOT
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import Document, Documents, Message
 from metagpt.utils.mermaid import mermaid_to_file
 from metagpt.utils.project_setting import get_project_setting, merge_json_string
@@ -67,7 +68,7 @@ class WriteDesign(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         doc = await self._update_system_design(filename=filename)
@@ -9,7 +9,7 @@ from __future__ import annotations
 import asyncio
 import base64
 import re
-from typing import Literal, Tuple
+from typing import Literal, Optional, Tuple
 
 import nbformat
 from nbclient import NotebookClient
@@ -25,6 +25,7 @@ from rich.syntax import Syntax
 
 from metagpt.actions import Action
 from metagpt.logs import logger
+from metagpt.utils.kernel_pool import KernelPool, PooledKernel
 
 
 class ExecuteNbCode(Action):
@@ -35,11 +36,14 @@ class ExecuteNbCode(Action):
     console: Console
     interaction: str
     timeout: int = 600
+    kernel_pool: KernelPool
+    kernel: Optional[PooledKernel] = None  # checked out from `kernel_pool` by `build`
 
     def __init__(
         self,
         nb=nbformat.v4.new_notebook(),
         timeout=600,
+        kernel_pool: Optional[KernelPool] = None,
     ):
         super().__init__(
             nb=nb,
@@ -47,41 +51,29 @@ class ExecuteNbCode(Action):
             timeout=timeout,
             console=Console(),
             interaction=("ipython" if self.is_ipython() else "terminal"),
+            kernel_pool=kernel_pool or KernelPool.default(),
         )
 
     async def build(self):
         if self.nb_client.kc is None or not await self.nb_client.kc.is_alive():
-            self.nb_client.create_kernel_manager()
-            self.nb_client.start_new_kernel()
-            self.nb_client.start_new_kernel_client()
+            if self.kernel is not None:
+                # dead, or left by a replaced `nb_client`
+                await self.kernel_pool.checkin(self.kernel, recycle=self.nb_client.kc is not None)
+            self.kernel = await self.kernel_pool.checkout()
+            self.nb_client.km = self.kernel.km
+            self.nb_client.kc = self.kernel.client
 
     async def terminate(self):
-        """kill NotebookClient"""
-        if self.nb_client.km is not None and await self.nb_client.km.is_alive():
-            await self.nb_client.km.shutdown_kernel(now=True)
-            await self.nb_client.km.cleanup_resources()
-
-            channels = [
-                self.nb_client.kc.stdin_channel,  # The channel for handling standard input to the kernel.
-                self.nb_client.kc.hb_channel,  # The channel for heartbeat communication between the kernel and client.
-                self.nb_client.kc.control_channel,  # The channel for controlling the kernel.
-            ]
-
-            # Stops all the running channels for this kernel
-            for channel in channels:
-                if channel.is_alive():
-                    channel.stop()
-
+        """return the kernel of NotebookClient to the pool"""
+        if self.kernel is not None:
+            kernel, self.kernel = self.kernel, None
             self.nb_client.kc = None
             self.nb_client.km = None
+            await self.kernel_pool.checkin(kernel)
 
     async def reset(self):
-        """reset NotebookClient"""
+        """reset NotebookClient, the next run checks out a clean kernel"""
         await self.terminate()
-
-        # sleep 1s to wait for the kernel to be cleaned up completely
-        await asyncio.sleep(1)
-        await self.build()
         self.nb_client = NotebookClient(self.nb, timeout=self.timeout)
 
     def add_code_cell(self, code: str):
@@ -4,6 +4,7 @@ import json
 import os
 from pydantic import Field
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.actions import Action
 from metagpt.utils.common import CodeParser
 from metagpt.schema import CodingContext, Document, RunCodeResult
@@ -451,7 +452,7 @@ class FixBug(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
 
 
         code = await self.write_code(prompt)
@@ -3,6 +3,7 @@ from tenacity import retry, stop_after_attempt, wait_random_exponential
 import json
 from pydantic import Field
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.actions import Action
 from metagpt.utils.common import CodeParser
 from metagpt.schema import CodingContext, Document, RunCodeResult
@@ -204,7 +205,7 @@ class FixIntegrationBug(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         code = await self.write_code(prompt)
@@ -233,7 +234,7 @@ class FixIntegrationBug(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
 
         coding_context.code_doc.content = code
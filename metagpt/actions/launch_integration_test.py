@@ -7,22 +7,25 @@
 """
 
 from typing import Optional
+import asyncio
 import json
 from pathlib import Path
 from metagpt.actions.action import Action
 from metagpt.const import TEST_CODES_FILE_REPO
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import ProjectIntegrationTestingContext
-import subprocess
-from subprocess import Popen, PIPE, STDOUT
-import threading
-from threading import Thread
-from time import sleep
 from metagpt.actions.launch_integration_test_an import BUGFIX_NODE,BUG_FIX_PLAN, ERROR_MESSAGE, SUGGESTION,ERROR_PRONE_FILES, INTEGRATION_RESULT, INTEGRATION_TEST_NODE
-from eazytec_send import get_msg_for_recv
+from eazytec_send import get_cmd_output_for_recv, new_request_id
+from metagpt.utils.async_subprocess import run_command
 from metagpt.utils.file_repository import extract_file_path
-import os
-import signal
+from metagpt.utils.service_launcher import (
+    DEFAULT_READY_TIMEOUT,
+    ServiceGroup,
+    ServiceNotReadyError,
+    env_port,
+    wait_ready_command,
+)
 
 
 PROMPT_TEMPLATE_BAK = """
@@ -116,53 +119,38 @@ COMBINED_TEST_TEMPLATE = """
 {playwright_console_output}
 """
 
-class ThreadWithReturnValue(Thread):
-    def run(self):
-        if self._target is not None:
-            self._return = self._target(*self._args, **self._kwargs)
-
-    def join(self):
-        super().join()
-        return self._return
-
-
-def run_subprocess_cmd(cmd):
-
-    commands = (cmd)
-
-    process = Popen(["/bin/bash"], shell=False, stdout=PIPE, stdin=PIPE, stderr=STDOUT)
-    outs = process.communicate(commands.encode())[0]
-
-    result = "\nSERVER CONSOLE OUTPUTS: \n\n"
-    print("---------------------Integration Test OUTS:----------------\n",outs)
-    content = [z.strip() for z in outs.decode().split("\n") if z]
-    outs_log = "\n".join(content)
-    result = result + outs_log +"\n"
-
-    return result
-
-def run_playwright_subprocess_cmd(cmd):
+async def run_playwright_subprocess_cmd(cmd):
 
     commands = (cmd)
 
-    process = Popen(["/bin/bash"], shell=False, stdout=PIPE, stdin=PIPE, stderr=STDOUT)
-    outs = process.communicate(commands.encode())[0]
+    outs = (await run_command(["/bin/bash"], input=commands, merge_stderr=True)).stdout
 
     result = "\nPLAYWRIGHT TEST OUTPUTS: \n\n"
     print("---------------------PLAYWRIGHT Test OUTS:----------------\n",outs)
-    content = [z.strip() for z in outs.decode().split("\n") if z]
+    content = [z.strip() for z in outs.split("\n") if z]
     outs_log = "\n".join(content)
     result = result + outs_log +"\n"
 
     return result
-def cmds_thread(cmd_str):
-    server_console_out = run_subprocess_cmd(cmd_str)
-    logger.info(f"Server console output in cmds_thread: {server_console_out}")
-    return server_console_out
 
 class LaunchIntegrationTest(Action):
     name: str = "LaunchIntegrationTest"
     i_context: Optional[ProjectIntegrationTestingContext] = None
+    ready_timeout: int = DEFAULT_READY_TIMEOUT
+
+    async def wait_ready_remote(self, name, port) -> str:
+        # 在runtime中探测端口, 代替固定的sleep
+        oh_action_data = {}
+        oh_action_data['message'] = f"Launch Integration Test - Wait for {name}"
+        oh_action_data['action_type'] = "CMD_RUN"
+        oh_action_data['cmd'] = wait_ready_command(port, timeout=self.ready_timeout)
+        oh_action_data['handle_output'] = True
+        oh_action_data['request_id'] = new_request_id()
+        oh_action_data['conversation_id'] = self.context.config.sid
+        publish_oh_action(oh_action_data)
+        return await get_cmd_output_for_recv(
+            self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+        )
 
     async def check_failed_cases(self,test_result)-> ProjectIntegrationTestingContext:
         
@@ -202,8 +190,8 @@ class LaunchIntegrationTest(Action):
         self.config.current_role = f"TEST_ENGINEER"
         self.config.role_task = f"4/4 Launch Integrate test"
 
-        backend_cmd_str = 'cd ' + project_path + '\n'+ 'source ./venv_test/bin/activate\n'+ 'cd '+  launch_backend_path.parent.as_posix() + '\n'+'timeout 20 uvicorn main:app --reload --port $APP_PORT_2  --log-level trace\n'
-        front_cmd_str = 'cd ' + launch_front_path.parent.as_posix() + '\n' + 'BROWSER=none timeout 15 npm run dev -- --port $APP_PORT_1\n'
+        backend_cmd_str = 'cd ' + project_path + '\n'+ 'source ./venv_test/bin/activate\n'+ 'cd '+  launch_backend_path.parent.as_posix() + '\n'+'exec uvicorn main:app --reload --port $APP_PORT_2  --log-level trace\n'
+        front_cmd_str = 'cd ' + launch_front_path.parent.as_posix() + '\n' + 'BROWSER=none exec npm run dev -- --port $APP_PORT_1\n'
 
         logger.info(f"fr path ------     {front_cmd_str}")
         #cmd_str = 'source ./venv_test/bin/activate\n'+ 'cd '+  project_src_dir + '\n'+'timeout 20 uvicorn main:app --reload --port 8000 --log-level trace\n'
@@ -211,28 +199,19 @@ class LaunchIntegrationTest(Action):
         #thread.start()
         if self.config.local:
             logger.info(f"start ")
-            thread = ThreadWithReturnValue(target=cmds_thread, args=(backend_cmd_str,))
-            # 启动前端进程
-            front_process = subprocess.Popen(front_cmd_str, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-            thread.start()
-
-            sleep(3)
-            playwright_result = run_playwright_subprocess_cmd('cd ' + project_path + '\n'+ 'source ./venv_test/bin/activate\n'+'python '+  integration_test_case_file_path + '\n')
-            # 测试完成后，发送终止信号给前端进程
-            try:
-                # 获取进程组 ID
-                pgid = os.getpgid(front_process.pid)
-                # 发送 SIGKILL 信号给进程组
-                os.killpg(pgid, signal.SIGKILL)
-                front_process.wait()
-            except OSError as e:
-                print(f"Error killing process group: {e}")
-            front_output, front_error = front_process.communicate()
-            if not isinstance(front_error, str):
-                front_error = front_error.decode('utf-8')
-                front_output = front_output.decode('utf-8')
-            backend_console_out =thread.join()
+            # 启动后端和前端进程, 等待端口就绪后再运行playwright, 退出时终止进程组
+            async with ServiceGroup() as services:
+                backend = await services.start("backend", backend_cmd_str, port=env_port("APP_PORT_2"))
+                frontend = await services.start("frontend", front_cmd_str, port=env_port("APP_PORT_1"))
+                for service in (backend, frontend):
+                    try:
+                        await service.wait_ready(timeout=self.ready_timeout)
+                    except ServiceNotReadyError as e:
+                        logger.warning(f"{e}")
+                        service.lines.append(f"{service.name} is not ready after {self.ready_timeout}s")
+                playwright_result = await run_playwright_subprocess_cmd('cd ' + project_path + '\n'+ 'source ./venv_test/bin/activate\n'+'python '+  integration_test_case_file_path + '\n')
+            front_output, front_error = frontend.output, ""
+            backend_console_out = "\nSERVER CONSOLE OUTPUTS: \n\n" + backend.output + "\n"
 
         else:
             oh_action_data = {}
@@ -245,7 +224,7 @@ class LaunchIntegrationTest(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
 
             oh_action_data = {}
@@ -254,9 +233,9 @@ class LaunchIntegrationTest(Action):
             oh_action_data['cmd'] = 'cd '+ extract_file_path(self.context.config.sid, project_path)  + " ; " + '. ./venv_test/bin/activate' + " ; " + 'cd '+  extract_file_path(self.context.config.sid, launch_backend_path.parent.as_posix()) + '\n'
             oh_action_data['handle_output'] = False
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
-            sleep(5)
+            await asyncio.sleep(5)
 
             oh_action_data = {}
             oh_action_data['message'] = f"Remove previous nohup.out"
@@ -264,7 +243,7 @@ class LaunchIntegrationTest(Action):
             oh_action_data['cmd'] = f"rm -rf ./nohup.out\n"
             oh_action_data['handle_output'] = False
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
             oh_action_data = {}
             oh_action_data['message'] = f"Launch Integration Test - Start Server"
@@ -272,7 +251,7 @@ class LaunchIntegrationTest(Action):
             oh_action_data['cmd'] = f"nohup timeout 20 uvicorn main:app --reload --port $APP_PORT_2 --log-level trace &"
             oh_action_data['handle_output'] = False
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
             oh_action_data = {}
             oh_action_data['message'] = f"Update Shell"
@@ -280,8 +259,8 @@ class LaunchIntegrationTest(Action):
             oh_action_data['cmd'] = f"cd ."
             oh_action_data['handle_output'] = False
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
-            sleep(2)
+            publish_oh_action(oh_action_data)
+            await self.wait_ready_remote("backend", "$APP_PORT_2")
 
             # 启动前端
             oh_action_data = {}
@@ -294,26 +273,28 @@ class LaunchIntegrationTest(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
 
             oh_action_data = {}
             oh_action_data['message'] = f"Launch Integration Test - Start Frontend Server"
             oh_action_data['action_type'] = "CMD_RUN"
             oh_action_data['cmd'] = 'cd '+extract_file_path(self.context.config.sid, launch_front_path.parent.as_posix())  + " ; " + 'timeout 20 npm run dev -- --port $APP_PORT_1'
             oh_action_data['handle_output'] = True
+            oh_action_data['request_id'] = new_request_id()
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
-            front_output = get_msg_for_recv(self.context.config.sio, self.context.config.sid) #get_msg_for_recv()
+            publish_oh_action(oh_action_data)
+            front_output = await get_cmd_output_for_recv(
+                self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+            )
 
-            sleep(15)
             oh_action_data = {}
             oh_action_data['message'] = f"Update Shell"
             oh_action_data['action_type'] = "CMD_RUN"
             oh_action_data['cmd'] = f"cd ."
             oh_action_data['handle_output'] = False
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
-            sleep(2)
+            publish_oh_action(oh_action_data)
+            await self.wait_ready_remote("frontend", "$APP_PORT_1")
 
             # 启动playwright 测试
             oh_action_data = {}
@@ -326,7 +307,7 @@ class LaunchIntegrationTest(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
 
             oh_action_data = {}
@@ -334,11 +315,14 @@ class LaunchIntegrationTest(Action):
             oh_action_data['action_type'] = "CMD_RUN"
             oh_action_data['cmd'] =  'cd '+ extract_file_path(self.context.config.sid, project_path)  + " ; " + '. ./venv_test/bin/activate' + " ; " + "python "+  extract_file_path(self.context.config.sid, integration_test_case_file_path) + "\n"
             oh_action_data['handle_output'] = True
+            oh_action_data['request_id'] = new_request_id()
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
-            playwright_result = get_msg_for_recv(self.context.config.sio, self.context.config.sid) #get_msg_for_recv()
-            sleep(15)
+            playwright_result = await get_cmd_output_for_recv(
+                self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+            )
+            await asyncio.sleep(15)
             #test_result = run_subprocess_cmd('source ./playwright_venv/bin/activate\n'+'python '+  integration_test_case_file_path + '\n')
             print("\n----------playwright_result Integration Test Result playwright:----------------\n",playwright_result)
 
@@ -347,10 +331,13 @@ class LaunchIntegrationTest(Action):
             oh_action_data['action_type'] = "CMD_RUN"
             oh_action_data['cmd'] = f"cat ./nohup.out"
             oh_action_data['handle_output'] = True
+            oh_action_data['request_id'] = new_request_id()
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
-            backend_console_out = get_msg_for_recv(self.context.config.sio, self.context.config.sid)
+            backend_console_out = await get_cmd_output_for_recv(
+                self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+            )
             print("\n----------playwright_result Integration Test Result backend_console_out:----------------\n",backend_console_out)
             
 
@@ -12,15 +12,20 @@ from metagpt.actions.action import Action
 from metagpt.actions.launch_project_test_an import LAUNCH_TEST_NODE, LAUNCH_RESULT,  DATABASE_ERROR_RESULT, ERROR_MESSAGE, SUGGESTION,ERROR_PRONE_FILES, CONSOLE_OUTPUT, BUGFIX_NODE, BUG_FIX_PLAN
 from metagpt.const import TEST_CODES_FILE_REPO
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import LaunchProjectTestingContext
 from metagpt.utils.common import CodeParser
-import subprocess
-from subprocess import Popen, PIPE, STDOUT
+from metagpt.utils.env_cache import (
+    ENV_CACHE_ROOT,
+    node_modules_install_command,
+    venv_install_command,
+)
+import asyncio
 from pathlib import Path
 import os
-from eazytec_send import get_msg_for_recv
+from eazytec_send import get_cmd_output_for_recv, new_request_id
+from metagpt.utils.async_subprocess import run_command
 from metagpt.utils.file_repository import extract_file_path
-from time import sleep
 
 # PROMPT_TEMPLATE = """
 # NOTICE
@@ -124,15 +129,14 @@ file list: (optional)
 {file_list}
 """
 
-def run_subprocess_cmd(cmd):
+async def run_subprocess_cmd(cmd):
 
     commands = (cmd)
 
-    process = Popen(["/bin/bash"], shell=False, stdout=PIPE, stdin=PIPE, stderr=STDOUT)
-    outs = process.communicate(commands.encode())[0]
+    outs = (await run_command(["/bin/bash"], input=commands, merge_stderr=True)).stdout
 
     result = "\nCONSOLE OUTPUTS: \n\n"
-    content = [z.strip() for z in outs.decode().split("\n") if z]
+    content = [z.strip() for z in outs.split("\n") if z]
     outs_log = "\n".join(content)
     result = result + outs_log +"\n"
 
@@ -175,19 +179,9 @@ class LaunchProjectTest(Action):
         self.config.current_role = f"TEST_ENGINEER"
         self.config.role_task = f"2/4 Launch project test"
 
-        # 建立python虚拟环境
-        if not os.path.exists(os.path.join(project_path, "venv_test")):
-            run_subprocess_cmd('cd '+  project_path + '\n'+ "virtualenv venv_test --python=python3.11")
-
-            print(f"path: {extract_file_path(self.context.config.sid, project_path)}")
-
-            oh_action_data = {}
-            oh_action_data['message'] = f"create venv_test"
-            oh_action_data['action_type'] = "CMD_RUN"
-            oh_action_data['cmd'] = "cd " + extract_file_path(self.context.config.sid, project_path) + " ; " + 'virtualenv venv_test --python=python3.11'
-            oh_action_data['handle_output'] = True
-            oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+        # venv_test and node_modules are materialized from the environment cache by the dependency steps
+        local_cache_root = ENV_CACHE_ROOT
+        remote_cache_root = extract_file_path(self.context.config.sid, str(ENV_CACHE_ROOT))
 
         launch_backend_path = Path(self.i_context.launch_backend_file)
         launch_front_path = Path(self.i_context.launch_front_file)
@@ -216,23 +210,32 @@ class LaunchProjectTest(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
 
             oh_action_data = {}
             oh_action_data['message'] = f"frontend install dependencies"
             oh_action_data['action_type'] = "CMD_RUN"
-            oh_action_data['cmd'] = 'cd ' + extract_file_path(self.context.config.sid, launch_front_path.parent.as_posix()) + " ; " + 'npm install --registry=http://2.2.0.23:45923/repository/group-npm/' # add vue@3.4.20
+            oh_action_data['cmd'] = node_modules_install_command(
+                extract_file_path(self.context.config.sid, launch_front_path.parent.as_posix()),
+                cache_root=remote_cache_root,
+                registry="http://2.2.0.23:45923/repository/group-npm/",
+            )  # add vue@3.4.20
             oh_action_data['handle_output'] = True
+            oh_action_data['request_id'] = new_request_id()
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
             print(f"##### front install depends data: {oh_action_data}")
 
             if not self.config.local:
-                result = get_msg_for_recv(self.context.config.sio, self.context.config.sid)
+                result = await get_cmd_output_for_recv(
+                    self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+                )
                 print("\n=====================frontend install dependencies===============\n:",result)
             else:
-                result = run_subprocess_cmd('cd '+  launch_front_path.parent.as_posix() + '\n'+ 'npm install --registry=https://registry.npmmirror.com')
+                result = await run_subprocess_cmd(
+                    node_modules_install_command(launch_front_path.parent.as_posix(), cache_root=local_cache_root)
+                )
 
             context = await self.check_failed_cases(result)
             if context.launch_success == False:
@@ -243,7 +246,7 @@ class LaunchProjectTest(Action):
         if self.i_context.launch_front_success == False:
             logger.info("\n======FRONTEND  ----> LAUNCH SERVER=============\n")
             if self.config.local:
-                frontend_launch_result = run_subprocess_cmd(f'cd {launch_front_path.parent.as_posix()} && ' 'BROWSER=none timeout 15 npm run dev -- --debug 2>&1')
+                frontend_launch_result = await run_subprocess_cmd(f'cd {launch_front_path.parent.as_posix()} && ' 'BROWSER=none timeout 15 npm run dev -- --debug 2>&1')
             else:
                 content_info = {
                     "sub_content": f"Frontend run server",
@@ -254,17 +257,20 @@ class LaunchProjectTest(Action):
                 oh_action_data['action_type'] = "MESSAGE"
                 oh_action_data['content'] = content_info
                 oh_action_data['conversation_id'] = self.context.config.sid
-                logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+                publish_oh_action(oh_action_data)
 
                 oh_action_data = {}
                 oh_action_data['message'] = f"frontend run server"
                 oh_action_data['action_type'] = "CMD_RUN"
                 oh_action_data['cmd'] = 'cd ' + extract_file_path(self.context.config.sid, launch_front_path.parent.as_posix()) + " ; " + 'BROWSER=none timeout 10 npm run dev -- --port $APP_PORT_1' # add vue@3.4.20
                 oh_action_data['handle_output'] = True
+                oh_action_data['request_id'] = new_request_id()
                 oh_action_data['conversation_id'] = self.context.config.sid
-                logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+                publish_oh_action(oh_action_data)
                 print(f"##### front run server data: {oh_action_data}")
-                frontend_launch_result = get_msg_for_recv(self.context.config.sio, self.context.config.sid)
+                frontend_launch_result = await get_cmd_output_for_recv(
+                    self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+                )
                 print("\n=====================frontend install dependencies===============\n:",result)
             context = await self.check_failed_cases(frontend_launch_result)
             if context.launch_success == False:
@@ -323,24 +329,35 @@ class LaunchProjectTest(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
             
             oh_action_data = {}
             oh_action_data['message'] = f"install backend dependencies"
             oh_action_data['action_type'] = "CMD_RUN"
-            oh_action_data['cmd'] = 'cd ' + extract_file_path(self.context.config.sid, project_path) + " ; " + '. ./venv_test/bin/activate' + " ; "+ 'cd '+ extract_file_path(self.context.config.sid, launch_requirements_path.parent.as_posix()) + " ; " + 'pip install -r requirements.txt -i https://mirrors.tuna.tsinghua.edu.cn/pypi/web/simple' + " ; "  + 'pip install playwright -i https://mirrors.tuna.tsinghua.edu.cn/pypi/web/simple'
+            oh_action_data['cmd'] = venv_install_command(
+                extract_file_path(self.context.config.sid, os.path.join(project_path, "venv_test")),
+                extract_file_path(self.context.config.sid, launch_requirements_path.as_posix()),
+                cache_root=remote_cache_root,
+            )
             oh_action_data['handle_output'] = True
+            oh_action_data['request_id'] = new_request_id()
             oh_action_data['conversation_id'] = self.context.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
  
             if not self.config.local:
-                result = get_msg_for_recv(self.context.config.sio, self.context.config.sid)
+                result = await get_cmd_output_for_recv(
+                    self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+                )
                 print("\n=====================install backend dependencies===============\n:",result)
             else:
-                result = run_subprocess_cmd('cd ' + project_path + '\n' +
-                'source ./venv_test/bin/activate\n'+ 'cd '+ launch_requirements_path.parent.as_posix() + '\n'+ 'pip install -r requirements.txt -i https://mirrors.tuna.tsinghua.edu.cn/pypi/web/simple\n'
-                + 'pip install playwright -i https://mirrors.tuna.tsinghua.edu.cn/pypi/web/simple\n')
+                result = await run_subprocess_cmd(
+                    venv_install_command(
+                        os.path.join(project_path, "venv_test"),
+                        launch_requirements_path.as_posix(),
+                        cache_root=local_cache_root,
+                    )
+                )
             
             context = await self.check_failed_cases(result)
             if context.launch_success == False:
@@ -361,7 +378,7 @@ class LaunchProjectTest(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.context.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data, ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         oh_action_data = {}
@@ -369,16 +386,19 @@ class LaunchProjectTest(Action):
         oh_action_data['action_type'] = "CMD_RUN"
         oh_action_data['cmd'] = 'cd '+ extract_file_path(self.context.config.sid, project_path)  + " ; " + '. ./venv_test/bin/activate' + " ; " + 'cd '+  extract_file_path(self.context.config.sid, launch_backend_path.parent.as_posix())  + " ; " +'timeout 10 uvicorn main:app --reload --port $APP_PORT_2 --log-level trace\n'
         oh_action_data['handle_output'] = True
+        oh_action_data['request_id'] = new_request_id()
         oh_action_data['conversation_id'] = self.context.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+        publish_oh_action(oh_action_data)
 
-        sleep(5)
+        await asyncio.sleep(5)
 
         #wait_for_msg_continue()
         if not self.config.local:
-            result = get_msg_for_recv(self.context.config.sio, self.context.config.sid) #get_msg_for_recv()
+            result = await get_cmd_output_for_recv(
+                self.context.config.sio, self.context.config.sid, oh_action_data['request_id'], self.context.config.oh_cmd_timeout
+            )
         else:
-            result = run_subprocess_cmd('cd ' + project_path + '\n' + 'source ./venv_test/bin/activate\n'+ 'cd '+  launch_backend_path.parent.as_posix() + '\n'+'timeout 10 uvicorn main:app --reload --port 8002 --log-level trace\n')
+            result = await run_subprocess_cmd('cd ' + project_path + '\n' + 'source ./venv_test/bin/activate\n'+ 'cd '+  launch_backend_path.parent.as_posix() + '\n'+'timeout 10 uvicorn main:app --reload --port 8002 --log-level trace\n')
 
         print("\n=====================Launch result===============\n:",result)
         context = await self.check_failed_cases(result)
@@ -16,8 +16,7 @@ from metagpt.const import REQUIREMENT_FILENAME
 from metagpt.utils.file_repository import FileRepository
 from metagpt.utils.git_repository import GitRepository
 from metagpt.utils.project_repo import ProjectRepo
-import json
-from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 
 
 class PrepareDocuments(Action):
@@ -45,7 +44,8 @@ class PrepareDocuments(Action):
 
         self.context.git_repo = GitRepository(local_path=path, auto_init=True, sid=self.config.sid, local=self.config.local,
                                                sio = self.context.config.sio, current_role =self.config.current_role, 
-                                               role_task = self.config.role_task, user_intend=self.config.user_intend)
+                                               role_task = self.config.role_task, user_intend=self.config.user_intend,
+                                               reply_timeout=self.config.oh_reply_timeout)
         self.context.repo = ProjectRepo(self.context.git_repo, local=self.config.local)
 
 
@@ -67,7 +67,7 @@ class PrepareDocuments(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         # Write the newly added requirements from the main parameter idea to `docs/requirement.txt`.
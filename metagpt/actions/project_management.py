@@ -19,6 +19,7 @@ from metagpt.actions.design_api_an import FILE_LIST
 from metagpt.actions.project_management_an import PM_NODE, REFINED_PM_NODE, FILE_RELATION
 from metagpt.const import PACKAGE_REQUIREMENTS_FILENAME, TASK_FILENAME, CODEDESIGN_FILENAME, PRD_FILENAME, DESIGN_FILENAME, SIMULATE_ROOT
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import Document, Documents
 from metagpt.utils.project_setting import get_project_setting, merge_json_string
 from metagpt.utils.action_utils import chekc_file_realtion, get_values
@@ -66,7 +67,7 @@ class WriteTasks(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         system_design_doc = await self.repo.docs.system_design.get(DESIGN_FILENAME)
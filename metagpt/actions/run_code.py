@@ -15,6 +15,7 @@
             5. Merged the `Config` class of send18:dev branch to take over the set/get operations of the Environment
             class.
 """
+import asyncio
 import subprocess
 from pathlib import Path
 from typing import Tuple
@@ -24,6 +25,7 @@ from pydantic import Field
 from metagpt.actions.action import Action
 from metagpt.logs import logger
 from metagpt.schema import RunCodeContext, RunCodeResult
+from metagpt.utils.async_subprocess import run_command
 from metagpt.utils.exceptions import handle_exception
 
 PROMPT_TEMPLATE = """
@@ -100,22 +102,12 @@ class RunCode(Action):
         additional_python_paths = [working_directory] + additional_python_paths
         additional_python_paths = ":".join(additional_python_paths)
         env["PYTHONPATH"] = additional_python_paths + ":" + env.get("PYTHONPATH", "")
-        RunCode._install_dependencies(working_directory=working_directory, env=env)
+        await asyncio.to_thread(RunCode._install_dependencies, working_directory=working_directory, env=env)
 
-        # Start the subprocess
-        process = subprocess.Popen(
-            command, cwd=working_directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
-        )
+        # Start the subprocess, killed if it does not complete within the timeout
         logger.info(" ".join(command))
-
-        try:
-            # Wait for the process to complete, with a timeout
-            stdout, stderr = process.communicate(timeout=10)
-        except subprocess.TimeoutExpired:
-            logger.info("The command did not complete within the given timeout.")
-            process.kill()  # Kill the process if it times out
-            stdout, stderr = process.communicate()
-        return stdout.decode("utf-8"), stderr.decode("utf-8")
+        result = await run_command(command, cwd=working_directory, env=env, timeout=10)
+        return result.stdout, result.stderr
 
     async def run(self, *args, **kwargs) -> RunCodeResult:
         logger.info(f"Running {' '.join(self.i_context.command)}")
@@ -34,6 +34,7 @@ from metagpt.const import (
     SIMULATE_ROOT
 )
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import BugFixContext, Document, Documents, Message
 from metagpt.utils.common import CodeParser
 from metagpt.utils.file_repository import FileRepository
@@ -98,7 +99,7 @@ class WritePRD(Action):
             oh_action_data['action_type'] = "MESSAGE"
             oh_action_data['content'] = content_info
             oh_action_data['conversation_id'] = self.config.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+            publish_oh_action(oh_action_data)
             #print(f"!!!!!workspace: {oh_action_data}")
 
             return await self._handle_new_requirement(req)
@@ -13,9 +13,9 @@ from typing import Optional
 from metagpt.actions.action import Action
 from metagpt.const import TEST_CODES_FILE_REPO
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import Document, TestingContext
 from metagpt.utils.common import CodeParser
-import json
 
 PROMPT_TEMPLATE = """
 NOTICE
@@ -69,7 +69,7 @@ class WriteTest(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         if not self.i_context.test_doc:
@@ -1,6 +1,6 @@
 from typing import Optional
 import json
-from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.actions import Action, ActionOutput
 from metagpt.schema import Document, Documents, Message
 from metagpt.utils.json_to_markdown import json_to_markdown
@@ -65,7 +65,7 @@ class WriteTestCase(Action):
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = self.config.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         doc = await self.write_testcase(filename=filename)
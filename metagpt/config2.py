@@ -78,6 +78,10 @@ class Config(CLIParams, YamlModel):
     workspace: WorkspaceConfig = WorkspaceConfig()
     enable_longterm_memory: bool = False
     code_review_k_times: int = 2
+    code_parallelism: int = 4  # files the Engineer writes concurrently
+    oh_reply_timeout: float = 120  # seconds to wait for OpenHands to send a file back
+    oh_cmd_timeout: float = 1800  # seconds to wait for the output of a command run by OpenHands
+    oh_action_compress_threshold: Optional[int] = None  # compress larger OH action file_content, if OpenHands decodes it
     agentops_api_key: str = ""
 
     # Will be removed in the future
@@ -43,6 +43,13 @@ class LLMType(Enum):
         return self.OPENAI
 
 
+class LLMCacheMode(Enum):
+    OFF = "off"
+    ON = "on"  # read through, store the responses of misses
+    RECORD = "record"  # always call the LLM and store the responses
+    REPLAY = "replay"  # never call the LLM, a miss is an error
+
+
 class LLMConfig(YamlModel):
     """Config for LLM
 
@@ -100,6 +107,18 @@ class LLMConfig(YamlModel):
     # For Messages Control
     use_system_prompt: bool = True
 
+    # Rate Limit, see metagpt/provider/llm_scheduler.py
+    rpm: Optional[int] = None  # requests per minute
+    tpm: Optional[int] = None  # tokens per minute
+    max_concurrency: Optional[int] = None
+
+    # Response Cache, see metagpt/utils/llm_cache.py
+    cache_mode: LLMCacheMode = LLMCacheMode.OFF
+    cache_backend: str = "memory"  # memory / sqlite
+    cache_path: Optional[str] = None  # sqlite file, defaults to workspace/.llm_cache.sqlite3
+    cache_ttl: Optional[int] = None  # seconds
+    cache_max_entries: int = 1024
+
     @field_validator("api_key")
     @classmethod
     def check_llm_key(cls, v):
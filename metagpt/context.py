@@ -87,16 +87,18 @@ class Context(BaseModel):
             return self.cost_manager
 
     def llm(self) -> BaseLLM:
-        """Return a LLM instance, fixme: support cache"""
-        # if self._llm is None:
-        self._llm = create_llm_instance(self.config.llm)
+        """Return the LLM instance of `config.llm`, reused until the config changes.
+
+        The underlying HTTP connections are shared process-wide, see `metagpt.provider.llm_client_pool`.
+        """
+        if self._llm is None or self._llm.config != self.config.llm:
+            self._llm = create_llm_instance(self.config.llm)
         if self._llm.cost_manager is None:
             self._llm.cost_manager = self._select_costmanager(self.config.llm)
         return self._llm
 
     def llm_with_cost_manager_from_llm_config(self, llm_config: LLMConfig) -> BaseLLM:
-        """Return a LLM instance, fixme: support cache"""
-        # if self._llm is None:
+        """Return a new LLM instance with its own cost manager, sharing the pooled HTTP connections"""
         llm = create_llm_instance(llm_config)
         if llm.cost_manager is None:
             llm.cost_manager = self._select_costmanager(llm_config)
@@ -124,7 +126,7 @@ class Context(BaseModel):
             return
         workdir = serialized_data.get("workdir")
         if workdir:
-            self.git_repo = GitRepository(local_path=workdir, auto_init=True, local=self.config.local, sid=self.config.sid, sio=self.config.sio)
+            self.git_repo = GitRepository(local_path=workdir, auto_init=True, local=self.config.local, sid=self.config.sid, sio=self.config.sio, reply_timeout=self.config.oh_reply_timeout)
             self.repo = ProjectRepo(self.git_repo, local=self.config.local, sid=self.config.sid, sio=self.config.sio)
             src_workspace = self.git_repo.workdir / self.git_repo.workdir.name
             if src_workspace.exists():
@@ -145,7 +147,7 @@ class Context(BaseModel):
         else:
             workdir = serialized_data["context"].get("workdir")
         if workdir:
-            self.git_repo = GitRepository(local_path=workdir, auto_init=True, local=self.config.local, sio = self.config.sio, sid = self.config.sid )
+            self.git_repo = GitRepository(local_path=workdir, auto_init=True, local=self.config.local, sio = self.config.sio, sid = self.config.sid, reply_timeout=self.config.oh_reply_timeout)
             self.repo = ProjectRepo(self.git_repo, local=self.config.local)
             src_workspace = self.git_repo.workdir / self.git_repo.workdir.name
             if src_workspace.exists():
@@ -4,12 +4,21 @@
 
 import asyncio
 from abc import abstractmethod
+from collections import deque
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set, Union
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, Optional, Set, Union
 
 from gymnasium import spaces
 from gymnasium.core import ActType, ObsType
-from pydantic import BaseModel, ConfigDict, Field, SerializeAsAny, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    SerializeAsAny,
+    model_validator,
+)
 
 from metagpt.context import Context
 from metagpt.environment.api.env_api import (
@@ -20,7 +29,8 @@ from metagpt.environment.api.env_api import (
 from metagpt.environment.base_env_space import BaseEnvAction, BaseEnvObsParams
 from metagpt.logs import logger
 from metagpt.schema import Message
-from metagpt.utils.common import get_function_schema, is_coroutine_func, is_send_to
+from metagpt.const import MESSAGE_ROUTE_TO_ALL
+from metagpt.utils.common import get_function_schema, is_coroutine_func
 
 if TYPE_CHECKING:
     from metagpt.roles.role import Role  # noqa: F401
@@ -121,6 +131,10 @@ class ExtEnv(BaseModel):
         """Implement this to feed a action and then get new observation from the env"""
 
 
+# Messages kept in `Environment.history`
+DEFAULT_HISTORY_SIZE = 1000
+
+
 class Environment(ExtEnv):
     """环境，承载一批角色，角色可以向环境发布消息，可以被其他角色观察到
     Environment, hosting a batch of roles, roles can publish messages to the environment, and can be observed by other roles
@@ -131,9 +145,13 @@ class Environment(ExtEnv):
     desc: str = Field(default="")  # 环境描述
     roles: dict[str, SerializeAsAny["Role"]] = Field(default_factory=dict, validate_default=True)
     member_addrs: Dict["Role", Set] = Field(default_factory=dict, exclude=True)
-    history: str = ""  # For debug
+    history_size: int = Field(default=DEFAULT_HISTORY_SIZE, exclude=True)  # messages kept in `history`
+    history_path: Optional[Path] = Field(default=None, exclude=True)  # opt-in log of all the published messages
     context: Context = Field(default_factory=Context, exclude=True)
 
+    _routes: Dict[str, dict] = PrivateAttr(default_factory=dict)  # address -> {role: None}, ordered like a set
+    _history: Optional[Deque[str]] = PrivateAttr(default=None)
+
     def reset(
         self,
         *,
@@ -182,18 +200,36 @@ class Environment(ExtEnv):
         in RFC 113.
         """
         logger.debug(f"publish_message: {message.dump()}")
-        found = False
         # According to the routing feature plan in Chapter 2.2.3.2 of RFC 113
-        for role, addrs in self.member_addrs.items():
-            if is_send_to(message, addrs):
-                role.put_message(message)
-                found = True
-        if not found:
+        if MESSAGE_ROUTE_TO_ALL in message.send_to:
+            recipients = list(self.member_addrs)
+        else:
+            recipients = {}
+            for addr in message.send_to:
+                recipients.update(self._routes.get(addr, {}))
+        for role in recipients:
+            role.put_message(message)
+        if not recipients:
             logger.warning(f"Message no recipients: {message.dump()}")
-        self.history += f"\n{message}"  # For debug
+        self._record_history(message)
 
         return True
 
+    def _record_history(self, message: Message):
+        if self._history is None or self._history.maxlen != self.history_size:
+            self._history = deque(self._history or [], maxlen=self.history_size)
+        line = f"\n{message}"
+        self._history.append(line)
+        if self.history_path:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history_path, "a", encoding="utf-8") as writer:
+                writer.write(line)
+
+    @property
+    def history(self) -> str:
+        """The latest `history_size` published messages, for debug. See `history_path` for all of them."""
+        return "".join(self._history or [])
+
     async def run(self, k=1, with_message=None):
         """处理一次所有信息的运行
         Process all Role runs at once
@@ -236,7 +272,15 @@ class Environment(ExtEnv):
 
     def set_addresses(self, obj, addresses):
         """Set the addresses of the object"""
+        for addr in self.member_addrs.get(obj, ()):
+            roles = self._routes.get(addr)
+            if roles is not None:
+                roles.pop(obj, None)
+                if not roles:
+                    del self._routes[addr]
         self.member_addrs[obj] = addresses
+        for addr in addresses:
+            self._routes.setdefault(addr, {})[obj] = None
 
     def archive(self, auto_archive=True):
         if auto_archive and self.context.git_repo:
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : code_eval.py
+@Desc    : Functions running generated code in the workers of the `SandboxPool`, for the code benchmarks and
+           the Programmer and Test operators. They are imported by the workers, keep the imports light.
+"""
+
+import sys
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from metagpt.logs import logger
+
+CHECK_TIMEOUT = 15
+RUN_CODE_TIMEOUT = 30
+
+DISALLOWED_IMPORTS = [
+    "os",
+    "sys",
+    "subprocess",
+    "multiprocessing",
+    "matplotlib",
+    "seaborn",
+    "plotly",
+    "bokeh",
+    "ggplot",
+    "pylab",
+    "tkinter",
+    "PyQt5",
+    "wx",
+    "pyglet",
+]
+
+
+def solution_namespace() -> dict:
+    return {
+        "math": __import__("math"),
+        "hashlib": __import__("hashlib"),
+        "re": __import__("re"),
+        "List": List,
+        "Dict": Dict,
+        "Tuple": Tuple,
+        "Optional": Optional,
+        "Any": Any,
+    }
+
+
+def check_solution(solution: str, test: str, entry_point: str, pass_candidate: bool = True):
+    """Run the `check` function of the test, on the entry point of the solution if `pass_candidate`"""
+    global_dict = solution_namespace()
+    exec(solution, global_dict)
+    if entry_point not in global_dict:
+        raise ValueError(f"Function {entry_point} is not defined in the solution.")
+    exec(test, global_dict)
+    check = global_dict["check"]
+    return check(global_dict[entry_point]) if pass_candidate else check()
+
+
+def exec_test(code: str):
+    exec(code, solution_namespace())
+
+
+def run_code(code):
+    try:
+        # Create a new global namespace
+        global_namespace = {}
+
+        # Check for prohibited imports
+        for lib in DISALLOWED_IMPORTS:
+            if f"import {lib}" in code or f"from {lib}" in code:
+                logger.info("Detected prohibited import: %s", lib)
+                return "Error", f"Prohibited import: {lib} and graphing functionalities"
+
+        # Use exec to execute the code
+        exec(code, global_namespace)
+        # Assume the code defines a function named 'solve'
+        if "solve" in global_namespace and callable(global_namespace["solve"]):
+            result = global_namespace["solve"]()
+            return "Success", str(result)
+        else:
+            return "Error", "Function 'solve' not found"
+    except Exception as e:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        tb_str = traceback.format_exception(exc_type, exc_value, exc_traceback)
+        return "Error", f"Execution error: {str(e)}\n{''.join(tb_str)}"
@@ -1,11 +1,12 @@
-import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Callable, List, Tuple
 
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 
+from metagpt.ext.aflow.benchmark import code_eval
 from metagpt.ext.aflow.benchmark.benchmark import BaseBenchmark
 from metagpt.logs import logger
+from metagpt.utils.code_sandbox import TIMEOUT, SandboxPool
 from metagpt.utils.sanitize import sanitize
 
 
@@ -13,73 +14,26 @@ class MBPPBenchmark(BaseBenchmark):
     def __init__(self, name: str, file_path: str, log_path: str):
         super().__init__(name, file_path, log_path)
 
-    class TimeoutError(Exception):
-        pass
-
-    def run_with_timeout(self, func, timeout):
-        result = []
-        stop_event = threading.Event()
-
-        def target():
-            try:
-                result.append(func())
-            except Exception as e:
-                result.append(e)
-            finally:
-                stop_event.set()
-
-        thread = threading.Thread(target=target)
-        thread.start()
-        is_timeout = not stop_event.wait(timeout)
-
-        if is_timeout:
-            raise self.TimeoutError("Function execution timed out")
-
-        if not result:
-            return None
-        if isinstance(result[0], Exception):
-            raise result[0]
-        return result[0]
-
-    def check_solution(self, solution, test, entry_point):
+    async def check_solution(self, solution, test, entry_point):
         solution = sanitize(code=solution, entrypoint=entry_point)
-        try:
-            global_dict = {
-                "math": __import__("math"),
-                "hashlib": __import__("hashlib"),
-                "re": __import__("re"),
-                "List": List,
-                "Dict": Dict,
-                "Tuple": Tuple,
-                "Optional": Optional,
-                "Any": Any,
-            }
-
-            exec(solution, global_dict)
-
-            if entry_point not in global_dict:
-                raise ValueError(f"Function {entry_point} is not defined in the solution.")
-
-            exec(test, global_dict)
-
-            check = global_dict["check"]
-
-            result = self.run_with_timeout(check, 15)
-
-            if result is None:
-                result = (self.PASS, "The solution passed all test cases.")
-
-        except self.TimeoutError:
+        sandbox = await SandboxPool.default().run(
+            code_eval.check_solution, solution, test, entry_point, False, timeout=code_eval.CHECK_TIMEOUT
+        )
+        if sandbox.status == TIMEOUT:
             result = (
                 self.FAIL,
                 "Execution timed out. Please check if your solution contains infinite loops or overly time-consuming operations.",
             )
-        except Exception as e:
-            error_message = f"Error: {str(e)}.\n Solution: {solution}.\n Test: {test}"
+        elif not sandbox.ok:
+            error_message = f"Error: {sandbox.error}.\n Solution: {solution}.\n Test: {test}"
             result = (self.FAIL, error_message)
 
             with open("error.log", "a", encoding="utf-8") as log_file:
                 log_file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {error_message}\n")
+        elif sandbox.value is None:
+            result = (self.PASS, "The solution passed all test cases.")
+        else:
+            result = sandbox.value
 
         return result
 
@@ -96,7 +50,7 @@ class MBPPBenchmark(BaseBenchmark):
             prediction, cost = await self._generate_output(graph, input_text, data["entry_point"])
 
             # Check the solution
-            ret = self.check_solution(prediction, data["test"], data["entry_point"])
+            ret = await self.check_solution(prediction, data["test"], data["entry_point"])
             test_case_details = ret[1]
             expected_output = test_case_details + "\nCorrect Solution:" + data["code"]
 
@@ -6,8 +6,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from pydantic import Field, field_serializer, model_validator
+from pydantic import Field, PrivateAttr, field_serializer, model_validator
 
+from metagpt.ext.stanford_town.memory.retrieval_index import RetrievalIndex
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EMBEDDING_CACHE_FILE,
+    EmbeddingService,
+)
 from metagpt.logs import logger
 from metagpt.memory.memory import Memory
 from metagpt.schema import Message
@@ -98,6 +103,7 @@ class AgentMemory(Memory):
     1. embedding.json (Dict embedding_key:embedding)
     2. Node.json (Dict Node_id:Node)
     3. kw_strength.json
+    以及EmbeddingService中本agent记忆文本的缓存embedding_cache.json
     """
 
     storage: list[BasicMemory] = []  # 重写Storage，存储BasicMemory所有节点
@@ -115,6 +121,29 @@ class AgentMemory(Memory):
     memory_saved: Optional[Path] = Field(default=None)
     embeddings: dict[str, list[float]] = dict()
 
+    _retrieval_index: Optional[RetrievalIndex] = PrivateAttr(default=None)
+    _retrieval_owner: int = PrivateAttr(default=0)  # id of the memory the index belongs to, copies rebuild it
+    _retrieval_storage: Optional[list] = PrivateAttr(default=None)
+
+    @property
+    def retrieval_index(self) -> RetrievalIndex:
+        """
+        检索索引，行号与storage中的位置一致；新增的记忆在使用时补充索引，storage被替换时重建
+        """
+        index = self._retrieval_index
+        if (
+            index is None
+            or self._retrieval_owner != id(self)
+            or self._retrieval_storage is not self.storage
+            or index.size > len(self.storage)
+        ):
+            index = self._retrieval_index = RetrievalIndex()
+            self._retrieval_owner = id(self)
+            self._retrieval_storage = self.storage
+        for memory_node in self.storage[index.size :]:
+            index.add(memory_node, self.embeddings.get(memory_node.embedding_key))
+        return index
+
     def set_mem_path(self, memory_saved: Path):
         self.memory_saved = memory_saved
         self.load(memory_saved)
@@ -132,6 +161,8 @@ class AgentMemory(Memory):
             memory_json.update(memory_node)
         write_json_file(memory_saved.joinpath("nodes.json"), memory_json)
         write_json_file(memory_saved.joinpath("embeddings.json"), self.embeddings)
+        # 只保存本agent记忆文本的缓存，共享缓存中其他agent的文本不写入
+        EmbeddingService.default().save(memory_saved.joinpath(EMBEDDING_CACHE_FILE), texts=self.embeddings.keys())
 
         strength_json = dict()
         strength_json["kw_strength_event"] = self.kw_strength_event
@@ -143,6 +174,7 @@ class AgentMemory(Memory):
         将GA的JSON解析，填充到AgentMemory类之中
         """
         self.embeddings = read_json_file(memory_saved.joinpath("embeddings.json"))
+        EmbeddingService.default().load(memory_saved.joinpath(EMBEDDING_CACHE_FILE))
         memory_load = read_json_file(memory_saved.joinpath("nodes.json"))
         for count in range(len(memory_load.keys())):
             node_id = f"node_{str(count + 1)}"
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : Retrieval index of the AgentMemory, scoring all the memories at once with NumPy
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from metagpt.ext.stanford_town.memory.agent_memory import BasicMemory
+
+_EPOCH = datetime(1970, 1, 1)
+_SECONDS_PER_DAY = 86400
+RETRIEVABLE_TYPES = ("event", "thought")
+
+
+def _timestamp(time: Optional[datetime]) -> float:
+    if time is None:
+        return 0.0
+    if time.tzinfo is not None:
+        time = time.astimezone(timezone.utc).replace(tzinfo=None)
+    return (time - _EPOCH).total_seconds()
+
+
+def _normalize(scores: np.ndarray) -> np.ndarray:
+    """Min-max normalize along the last axis to [0, 1], constant rows become 0.5"""
+    low = scores.min(axis=-1, keepdims=True)
+    span = scores.max(axis=-1, keepdims=True) - low
+    return np.where(span == 0, 0.5, (scores - low) / np.where(span == 0, 1, span))
+
+
+class RetrievalIndex:
+    """
+    AgentMemory的检索索引，每条记忆一行：
+    - 连续的embedding矩阵及其范数
+    - poignancy、created、last_accessed数组
+    - memory_id到行号的映射
+    importance、recency、relevance对所有关注点一次矩阵运算打分，再用argpartition取TopK
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.size = 0
+        self.memories: list[BasicMemory] = []
+        self.row_of: dict[str, int] = {}
+        self._capacity = capacity
+        self._embeddings: Optional[np.ndarray] = None  # 第一条embedding确定维度
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._poignancy = np.zeros(capacity, dtype=np.float64)
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._last_accessed = np.zeros(capacity, dtype=np.float64)
+        self._retrievable = np.zeros(capacity, dtype=bool)  # event和thought，且不是idle
+
+    def _grow(self):
+        self._capacity *= 2
+        for name in ("_norms", "_poignancy", "_created", "_last_accessed", "_retrievable"):
+            array = getattr(self, name)
+            grown = np.zeros(self._capacity, dtype=array.dtype)
+            grown[: self.size] = array[: self.size]
+            setattr(self, name, grown)
+        if self._embeddings is not None:
+            grown = np.zeros((self._capacity, self._embeddings.shape[1]), dtype=np.float32)
+            grown[: self.size] = self._embeddings[: self.size]
+            self._embeddings = grown
+
+    def add(self, memory: BasicMemory, embedding: Optional[Sequence[float]]) -> int:
+        """Add a memory and its embedding, a memory without embedding is never relevant"""
+        if self.size == self._capacity:
+            self._grow()
+        row = self.size
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self._capacity, vector.shape[0]), dtype=np.float32)
+            self._embeddings[row] = vector
+            self._norms[row] = np.linalg.norm(vector)
+        self._poignancy[row] = memory.poignancy
+        self._created[row] = _timestamp(memory.created)
+        self._last_accessed[row] = _timestamp(memory.last_accessed)
+        self._retrievable[row] = memory.memory_type in RETRIEVABLE_TYPES and "idle" not in (memory.embedding_key or "")
+        self.memories.append(memory)
+        self.row_of[memory.memory_id] = row
+        self.size += 1
+        return row
+
+    def retrievable_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._retrievable[: self.size])
+
+    def rows_of(self, memories: Sequence[BasicMemory]) -> np.ndarray:
+        return np.array([self.row_of[i.memory_id] for i in memories], dtype=np.int64)
+
+    def touch(self, rows: np.ndarray, time: datetime):
+        """Set the last access time of the rows and of their memories"""
+        self._last_accessed[rows] = _timestamp(time)
+        for row in rows:
+            self.memories[row].last_accessed = time
+
+    def top_k(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        rows: np.ndarray,
+        curr_time: datetime,
+        recency_decay: float,
+        k: int,
+        weights: Sequence[float] = (1, 1, 1),
+    ) -> list[np.ndarray]:
+        """
+        对每个查询返回TopK的行号，按总分降序，同分按last_accessed降序
+        总分为归一化后的importance、recency（每过一天乘一次衰减因子）和relevance（余弦相似度）的加权和
+        """
+        if not len(query_embeddings):
+            return []
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if not len(rows) or k <= 0:
+            return [np.array([], dtype=np.int64) for _ in range(len(queries))]
+
+        importance = _normalize(self._poignancy[rows])
+        days = np.floor((_timestamp(curr_time) - self._created[rows]) / _SECONDS_PER_DAY)
+        recency = _normalize(np.power(recency_decay, days))
+        if self._embeddings is None:
+            relevance = np.zeros((len(queries), len(rows)))
+        else:
+            norms = np.linalg.norm(queries, axis=1)[:, None] * self._norms[rows][None, :]
+            dots = (queries @ self._embeddings[: self.size].T)[:, rows]  # no copy of the rows of the matrix
+            relevance = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        relevance = _normalize(relevance.astype(np.float64))
+        totals = weights[0] * importance[None, :] + weights[1] * recency[None, :] + weights[2] * relevance
+
+        k = min(k, len(rows))
+        last_accessed = self._last_accessed[rows]
+        results = []
+        for total in totals:
+            top = np.argpartition(-total, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+            top = top[np.lexsort((-last_accessed[top], -total[top]))]
+            results.append(rows[top])
+        return results
@@ -17,7 +17,7 @@ from metagpt.ext.stanford_town.actions.task_decomp import TaskDecomp
 from metagpt.ext.stanford_town.actions.wake_up import WakeUp
 from metagpt.ext.stanford_town.memory.retrieve import new_agent_retrieve
 from metagpt.ext.stanford_town.plan.converse import agent_conversation
-from metagpt.ext.stanford_town.utils.utils import get_embedding
+from metagpt.ext.stanford_town.utils.utils import aget_embeddings
 from metagpt.llm import LLM
 from metagpt.logs import logger
 
@@ -545,7 +545,7 @@ async def _long_term_planning(role: "STRole", new_day: bool):
     s, p, o = (role.scratch.name, "plan", role.scratch.curr_time.strftime("%A %B %d"))
     keywords = set(["plan"])
     thought_poignancy = 5
-    thought_embedding_pair = (thought, get_embedding(thought))
+    thought_embedding_pair = (thought, (await aget_embeddings([thought]))[0])
     role.a_mem.add_thought(
         created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, None
     )
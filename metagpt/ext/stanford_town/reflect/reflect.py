@@ -15,7 +15,7 @@ from metagpt.ext.stanford_town.actions.run_reflect_action import (
     AgentPlanThoughtOnConvo,
 )
 from metagpt.ext.stanford_town.memory.retrieve import new_agent_retrieve
-from metagpt.ext.stanford_town.utils.utils import get_embedding
+from metagpt.ext.stanford_town.utils.utils import aget_embeddings
 from metagpt.logs import logger
 
 
@@ -115,14 +115,15 @@ async def run_reflect(role: "STRole"):
             logger.info(f"Nodes retrieved for `{focal_pt}` are `{xxx}`.")
 
         thoughts = await generate_insights_and_evidence(role, nodes, 5)
-        # 生成的是字典类型
-        for thought, evidence in thoughts.items():
+        # 生成的是字典类型，其中所有thought的embedding一次批量获取
+        thought_embeddings = await aget_embeddings(list(thoughts))
+        for (thought, evidence), thought_embedding in zip(thoughts.items(), thought_embeddings):
             created = role.scratch.curr_time
             expiration = created + datetime.timedelta(days=30)
             s, p, o = await generate_action_event_triple("(" + thought + ")", role)
             keywords = set([s, p, o])
             thought_poignancy = await generate_poig_score(role, "thought", thought)
-            thought_embedding_pair = (thought, get_embedding(thought))
+            thought_embedding_pair = (thought, thought_embedding)
 
             role.memory.add_thought(
                 created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, evidence
@@ -200,13 +201,16 @@ async def role_reflect(role: "STRole"):
             planning_thought = await generate_planning_thought_on_convo(role, all_utt)
             planning_thought = f"For {role.scratch.name}'s planning: {planning_thought}"
             logger.info(f"Role: {role.name} planning_thought: {planning_thought}")
+            memo_thought = await generate_memo_on_convo(role, all_utt)
+            memo_thought = f"{role.scratch.name} {memo_thought}"
+            planning_embedding, memo_embedding = await aget_embeddings([planning_thought, memo_thought])
 
             created = role.scratch.curr_time
             expiration = created + datetime.timedelta(days=30)
             s, p, o = await generate_action_event_triple(planning_thought, role)
             keywords = set([s, p, o])
             thought_poignancy = await generate_poig_score(role, "thought", planning_thought)
-            thought_embedding_pair = (planning_thought, get_embedding(planning_thought))
+            thought_embedding_pair = (planning_thought, planning_embedding)
 
             role.memory.add_thought(
                 created,
@@ -221,15 +225,12 @@ async def role_reflect(role: "STRole"):
                 evidence,
             )
 
-            memo_thought = await generate_memo_on_convo(role, all_utt)
-            memo_thought = f"{role.scratch.name} {memo_thought}"
-
             created = role.scratch.curr_time
             expiration = created + datetime.timedelta(days=30)
             s, p, o = await generate_action_event_triple(memo_thought, role)
             keywords = set([s, p, o])
             thought_poignancy = await generate_poig_score(role, "thought", memo_thought)
-            thought_embedding_pair = (memo_thought, get_embedding(memo_thought))
+            thought_embedding_pair = (memo_thought, memo_embedding)
 
             role.memory.add_thought(
                 created,
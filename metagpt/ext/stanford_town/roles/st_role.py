@@ -43,7 +43,7 @@ from metagpt.ext.stanford_town.utils.mg_ga_transform import (
     save_environment,
     save_movement,
 )
-from metagpt.ext.stanford_town.utils.utils import get_embedding, path_finder
+from metagpt.ext.stanford_town.utils.utils import aget_embeddings, path_finder
 from metagpt.logs import logger
 from metagpt.roles.role import Role, RoleContext
 from metagpt.schema import Message
@@ -217,7 +217,7 @@ class STRole(Role):
         s, p, o = await run_event_triple.run(thought, self)
         keywords = set([s, p, o])
         thought_poignancy = await generate_poig_score(self, "event", whisper)
-        thought_embedding_pair = (thought, get_embedding(thought))
+        thought_embedding_pair = (thought, (await aget_embeddings([thought]))[0])
         self.rc.memory.add_thought(
             created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, None
         )
@@ -293,18 +293,28 @@ class STRole(Role):
         for dist, event in percept_events_list[: self.rc.scratch.att_bandwidth]:
             perceived_events += [event]
 
+        # If the object is not present, then we default the event to "idle".
+        perceived_events = [
+            (s, p, o, f"{s.split(':')[-1]} is {desc}") if p else (s, "is", "idle", f"{s.split(':')[-1]} is idle")
+            for s, p, o, desc in perceived_events
+        ]
+
+        # The embeddings of the new events, and of the self chat, are requested in one batch.
+        latest_events = self.rc.memory.get_summarized_latest_events(self.rc.scratch.retention)
+        embedding_texts = []
+        for s, p, o, desc in perceived_events:
+            if (s, p, o) not in latest_events:
+                embedding_texts.append(self._event_embedding_key(desc))
+                if s == f"{self.name}" and p == "chat with":
+                    embedding_texts.append(self.rc.scratch.act_description)
+        embedding_texts = list(dict.fromkeys(i for i in embedding_texts if i not in self.rc.memory.embeddings))
+        new_embeddings = dict(zip(embedding_texts, await aget_embeddings(embedding_texts))) if embedding_texts else {}
+
         # Storing events.
         # <ret_events> is a list of <BasicMemory> instances from the persona's
         # associative memory.
         ret_events = []
-        for p_event in perceived_events:
-            s, p, o, desc = p_event
-            if not p:
-                # If the object is not present, then we default the event to "idle".
-                p = "is"
-                o = "idle"
-                desc = "idle"
-            desc = f"{s.split(':')[-1]} is {desc}"
+        for s, p, o, desc in perceived_events:
             p_event = (s, p, o)
 
             # We retrieve the latest self.rc.scratch.retention events. If there is
@@ -323,13 +333,8 @@ class STRole(Role):
                 keywords.update([sub, obj])
 
                 # Get event embedding
-                desc_embedding_in = desc
-                if "(" in desc:
-                    desc_embedding_in = desc_embedding_in.split("(")[1].split(")")[0].strip()
-                if desc_embedding_in in self.rc.memory.embeddings:
-                    event_embedding = self.rc.memory.embeddings[desc_embedding_in]
-                else:
-                    event_embedding = get_embedding(desc_embedding_in)
+                desc_embedding_in = self._event_embedding_key(desc)
+                event_embedding = await self._embedding_of(desc_embedding_in, new_embeddings)
                 event_embedding_pair = (desc_embedding_in, event_embedding)
 
                 # Get event poignancy.
@@ -341,10 +346,7 @@ class STRole(Role):
                 chat_node_ids = []
                 if p_event[0] == f"{self.name}" and p_event[1] == "chat with":
                     curr_event = self.rc.scratch.act_event
-                    if self.rc.scratch.act_description in self.rc.memory.embeddings:
-                        chat_embedding = self.rc.memory.embeddings[self.rc.scratch.act_description]
-                    else:
-                        chat_embedding = get_embedding(self.rc.scratch.act_description)
+                    chat_embedding = await self._embedding_of(self.rc.scratch.act_description, new_embeddings)
                     chat_embedding_pair = (self.rc.scratch.act_description, chat_embedding)
                     chat_poignancy = await generate_poig_score(self, "chat", self.rc.scratch.act_description)
                     chat_node = self.rc.memory.add_chat(
@@ -381,6 +383,21 @@ class STRole(Role):
 
         return ret_events
 
+    @staticmethod
+    def _event_embedding_key(desc: str) -> str:
+        """the text of an event description embedded, the part in parentheses if any"""
+        if "(" in desc:
+            return desc.split("(")[1].split(")")[0].strip()
+        return desc
+
+    async def _embedding_of(self, text: str, new_embeddings: dict[str, list[float]]) -> list[float]:
+        """the embedding of the text in the memory, in the batch requested by `perceive`, or requested now"""
+        if text in self.rc.memory.embeddings:
+            return self.rc.memory.embeddings[text]
+        if text in new_embeddings:
+            return new_embeddings[text]
+        return (await aget_embeddings([text]))[0]
+
     def retrieve(self, observed: list) -> dict:
         # TODO retrieve memories from agent_memory
         retrieved = dict()
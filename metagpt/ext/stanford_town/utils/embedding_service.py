@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : Embedding service of the agents, with a content-hash cache and micro-batched provider calls
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+from metagpt.logs import logger
+from metagpt.utils.common import read_json_file, write_json_file
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+LOCAL_EMBEDDING_MODEL = "local"
+EMBEDDING_CACHE_FILE = "embedding_cache.json"  # the entries of the memories of an agent, next to its embeddings.json
+DEFAULT_CACHE_SIZE = 2048
+DEFAULT_BATCH_WINDOW = 0.01  # seconds the first request of a batch waits for the concurrent ones
+DEFAULT_MAX_BATCH = 256  # texts per provider call
+
+
+def normalize_text(text: str) -> str:
+    text = text.replace("\n", " ")
+    return text if text else "this is blank"
+
+
+class EmbeddingProvider(ABC):
+    """Embed a list of texts in one call"""
+
+    model: str = ""
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """embeddings of the texts, in their order"""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, retries: int = 3, retry_delay: float = 5):
+        self.model = model
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._client = None
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        from openai import OpenAI
+
+        from metagpt.config2 import config
+
+        for idx in range(self.retries):
+            try:
+                if self._client is None:
+                    self._client = OpenAI(api_key=config.llm.api_key)
+                data = self._client.embeddings.create(input=texts, model=self.model).data
+                return [i.embedding for i in sorted(data, key=lambda i: i.index)]
+            except Exception as exp:
+                logger.info(f"get_embedding failed, exp: {exp}, will retry.")
+                if idx < self.retries - 1:
+                    time.sleep(self.retry_delay)
+        raise ValueError("get_embedding failed")
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    本地确定性的embedding，用于离线运行与测试
+    单词与相邻词对哈希到固定维度（带符号），再做L2归一化；相同文本总是得到相同向量，共享词越多余弦相似度越高
+    """
+
+    def __init__(self, dim: int = 1536):  # same as text-embedding-ada-002, of the embeddings in the forked storage
+        self.model = f"{LOCAL_EMBEDDING_MODEL}-{dim}"
+        self.dim = dim
+
+    def _embed_one(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        words = re.findall(r"\w+", text.lower()) or [text]
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = sum(i * i for i in vector) ** 0.5 or 1.0
+        return [i / norm for i in vector]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+class _Batch:
+    def __init__(self):
+        self.texts: dict[str, str] = {}  # key -> text
+        self.results: dict[str, list[float]] = {}
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class EmbeddingService:
+    """
+    Agent记忆与检索使用的embedding服务
+    - 以(model, 文本)的哈希为键的LRU缓存，可以保存到磁盘并在下次运行时加载
+    - 未命中缓存的并发请求合并为一个批次，一次provider调用；正在请求中的文本不会被重复请求
+    - 事件循环中的角色使用aembed_many：请求在线程中等待批次窗口，同时运行的角色的请求因此合并
+    """
+
+    _default: Optional["EmbeddingService"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider: Optional[EmbeddingProvider] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self.provider = provider or OpenAIEmbeddingProvider()
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.provider_calls = 0
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._pending: Optional[_Batch] = None  # the batch still collecting requests
+        self._inflight: dict[str, _Batch] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_model(cls, model: str = DEFAULT_EMBEDDING_MODEL, **kwargs) -> "EmbeddingService":
+        """`local`使用LocalEmbeddingProvider，其余为OpenAI的embedding模型"""
+        if model == LOCAL_EMBEDDING_MODEL:
+            return cls(LocalEmbeddingProvider(), **kwargs)
+        return cls(OpenAIEmbeddingProvider(model), **kwargs)
+
+    @classmethod
+    def default(cls) -> "EmbeddingService":
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @classmethod
+    def set_default(cls, service: Optional["EmbeddingService"]):
+        with cls._default_lock:
+            cls._default = service
+
+    def key_of(self, text: str) -> str:
+        return hashlib.sha256(f"{self.provider.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[list[float]]:
+        embedding = self._cache.get(key)
+        if embedding is not None:
+            self._cache.move_to_end(key)
+        return embedding
+
+    def _cache_put(self, key: str, embedding: list[float]):
+        self._cache[key] = embedding
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def embed(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> list[list[float]]:
+        texts = [normalize_text(text) for text in texts]
+        keys = [self.key_of(text) for text in texts]
+        found: dict[str, list[float]] = {}
+        batches: dict[int, _Batch] = {}
+        leader: Optional[_Batch] = None
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found:
+                    continue
+                embedding = self._cache_get(key)
+                if embedding is not None:
+                    found[key] = embedding
+                    continue
+                batch = self._inflight.get(key)
+                if batch is None:
+                    if self._pending is None:
+                        self._pending = leader = _Batch()
+                    batch = self._pending
+                    batch.texts[key] = text
+                    self._inflight[key] = batch
+                batches[id(batch)] = batch
+
+        if leader is not None:
+            self._run_batch(leader)
+        for batch in batches.values():
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            found.update(batch.results)
+        return [found[key] for key in keys]
+
+    async def aembed_many(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed off the event loop, so that the concurrent coroutines share the provider calls"""
+        return await asyncio.to_thread(self.embed_many, texts)
+
+    def _run_batch(self, batch: _Batch):
+        try:
+            asyncio.get_running_loop()  # nothing else can join from an event loop thread, do not block it
+        except RuntimeError:
+            time.sleep(self.batch_window)
+        with self._lock:
+            if self._pending is batch:
+                self._pending = None
+        try:
+            items = list(batch.texts.items())
+            for start in range(0, len(items), self.max_batch):
+                chunk = items[start : start + self.max_batch]
+                self.provider_calls += 1
+                embeddings = self.provider.embed([text for _, text in chunk])
+                batch.results.update((key, embedding) for (key, _), embedding in zip(chunk, embeddings))
+        except BaseException as exp:
+            batch.error = exp
+        with self._lock:
+            for key in batch.texts:
+                self._inflight.pop(key, None)
+                if key in batch.results:
+                    self._cache_put(key, batch.results[key])
+        batch.done.set()
+
+    def load(self, path: Path):
+        """Load the cached embeddings saved by `save`, the saved entries are older than the cached ones"""
+        if not path.exists():
+            return
+        saved = read_json_file(path)
+        with self._lock:
+            for key, embedding in reversed(saved.items()):
+                if key not in self._cache and len(self._cache) < self.cache_size:
+                    self._cache[key] = embedding
+                    self._cache.move_to_end(key, last=False)
+
+    def save(self, path: Path, texts: Optional[Iterable[str]] = None):
+        """Save the cached embeddings of `texts`, or the whole cache if None"""
+        keys = None if texts is None else {self.key_of(normalize_text(text)) for text in texts}
+        with self._lock:
+            cache = {key: embedding for key, embedding in self._cache.items() if keys is None or key in keys}
+        write_json_file(path, cache, indent=None)
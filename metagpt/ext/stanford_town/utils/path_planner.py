@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : Path planner of the persona movements on the collision maze
+
+import threading
+from array import array
+from collections import OrderedDict, deque
+from typing import Optional
+
+DEFAULT_CACHE_SIZE = 128  # distance fields kept, about 56KB each on the_ville
+
+
+class PathPlanner:
+    """
+    在collision maze上规划路径
+    - 占用网格与每个格子的可通行邻居只在地图第一次使用时构建一次
+    - 从起点出发做一次BFS得到距离场，同一起点到各个目标的路径只需沿距离场回溯
+    - 距离场按起点LRU缓存，地图被替换时planner随之重建，原地修改地图后需调用`invalidate`
+    路径与原先的wavefront算法一致（回溯时依次尝试上、左、下、右），但不再限制150步
+    """
+
+    _resident: dict = {}  # (id(collision_maze), collision_block_char) -> PathPlanner
+    _resident_lock = threading.Lock()
+
+    def __init__(self, collision_maze: list, collision_block_char: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.maze = collision_maze
+        self.collision_block_char = collision_block_char
+        self.cache_size = cache_size
+        self.height = len(collision_maze)
+        self.width = len(collision_maze[0]) if collision_maze else 0
+        self.blocked = bytearray(
+            1 if collision_maze[i][j] == collision_block_char else 0
+            for i in range(self.height)
+            for j in range(self.width)
+        )
+        self._neighbors = [self._free_neighbors(cell) for cell in range(self.height * self.width)]
+        self._fields: OrderedDict[int, array] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_maze(cls, collision_maze: list, collision_block_char: str) -> "PathPlanner":
+        """Return the planner of the maze, built on its first use"""
+        key = (id(collision_maze), collision_block_char)
+        with cls._resident_lock:
+            planner = cls._resident.get(key)
+            if planner is None or planner.maze is not collision_maze:
+                planner = cls._resident[key] = cls(collision_maze, collision_block_char)
+            return planner
+
+    @classmethod
+    def invalidate(cls, collision_maze: Optional[list] = None):
+        """Drop the planners of the maze, of all the mazes if None, after the maze was changed in place"""
+        with cls._resident_lock:
+            for key in [k for k, v in cls._resident.items() if collision_maze is None or v.maze is collision_maze]:
+                del cls._resident[key]
+
+    def _free_neighbors(self, cell: int) -> tuple:
+        i, j = divmod(cell, self.width)
+        candidates = []
+        if i > 0:
+            candidates.append(cell - self.width)
+        if j > 0:
+            candidates.append(cell - 1)
+        if i < self.height - 1:
+            candidates.append(cell + self.width)
+        if j < self.width - 1:
+            candidates.append(cell + 1)
+        return tuple(c for c in candidates if not self.blocked[c])
+
+    def distance_field(self, start: tuple[int, int]) -> array:
+        """BFS步数，从起点(row, col)到每个格子，-1表示不可达"""
+        source = start[0] * self.width + start[1]
+        with self._lock:
+            field = self._fields.get(source)
+            if field is not None:
+                self._fields.move_to_end(source)
+                return field
+
+        field = array("i", [-1]) * (self.height * self.width)
+        field[source] = 0
+        queue = deque([source])
+        neighbors = self._neighbors
+        while queue:
+            cell = queue.popleft()
+            step = field[cell] + 1
+            for neighbor in neighbors[cell]:
+                if field[neighbor] < 0:
+                    field[neighbor] = step
+                    queue.append(neighbor)
+
+        with self._lock:
+            self._fields[source] = field
+            if len(self._fields) > self.cache_size:
+                self._fields.popitem(last=False)
+        return field
+
+    def find_path(self, start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        返回从start到end（均为(row, col)）的最短路径，包含两端
+        不可达时与原算法一致返回[end]
+        """
+        field = self.distance_field(start)
+        i, j = end
+        cell = i * self.width + j
+        step = field[cell]
+        path = [(i, j)]
+        if step < 0:
+            return path
+        while step > 0:
+            for neighbor, (ni, nj) in (
+                (cell - self.width, (i - 1, j)),
+                (cell - 1, (i, j - 1)),
+                (cell + self.width, (i + 1, j)),
+                (cell + 1, (i, j + 1)),
+            ):
+                if 0 <= ni < self.height and 0 <= nj < self.width and field[neighbor] == step - 1:
+                    cell, i, j = neighbor, ni, nj
+                    break
+            path.append((i, j))
+            step -= 1
+        path.reverse()
+        return path
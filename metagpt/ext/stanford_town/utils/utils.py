@@ -7,15 +7,17 @@ import errno
 import json
 import os
 import shutil
-import time
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
-from openai import OpenAI
-
-from metagpt.config2 import config
+from metagpt.ext.stanford_town.utils.embedding_service import EmbeddingService
+from metagpt.ext.stanford_town.utils.path_planner import PathPlanner
 from metagpt.logs import logger
 
+_model_services: dict[str, EmbeddingService] = {}
+_model_services_lock = threading.Lock()
+
 
 def read_csv_to_list(curr_file: str, header=False, strip_trail=True):
     """
@@ -47,22 +49,29 @@ def read_csv_to_list(curr_file: str, header=False, strip_trail=True):
         return analysis_list[0], analysis_list[1:]
 
 
-def get_embedding(text, model: str = "text-embedding-ada-002"):
-    text = text.replace("\n", " ")
-    embedding = None
-    if not text:
-        text = "this is blank"
-    for idx in range(3):
-        try:
-            embedding = (
-                OpenAI(api_key=config.llm.api_key).embeddings.create(input=[text], model=model).data[0].embedding
-            )
-        except Exception as exp:
-            logger.info(f"get_embedding failed, exp: {exp}, will retry.")
-            time.sleep(5)
-    if not embedding:
-        raise ValueError("get_embedding failed")
-    return embedding
+def get_embedding(text: str, model: Optional[str] = None) -> list[float]:
+    """embedding of the text from the default EmbeddingService, or a service of the model"""
+    return embedding_service(model).embed(text)
+
+
+def get_embeddings(texts: list[str], model: Optional[str] = None) -> list[list[float]]:
+    """embeddings of the texts, the ones not cached are requested in one batch"""
+    return embedding_service(model).embed_many(texts)
+
+
+async def aget_embeddings(texts: list[str], model: Optional[str] = None) -> list[list[float]]:
+    """`get_embeddings` off the event loop, the texts of the concurrently running roles share the provider calls"""
+    return await embedding_service(model).aembed_many(texts)
+
+
+def embedding_service(model: Optional[str] = None) -> EmbeddingService:
+    service = EmbeddingService.default()
+    if model and model != service.provider.model:
+        with _model_services_lock:
+            service = _model_services.get(model)
+            if service is None:
+                service = _model_services[model] = EmbeddingService.for_model(model)
+    return service
 
 
 def extract_first_json_dict(data_str: str) -> Union[None, dict]:
@@ -87,71 +96,9 @@ def extract_first_json_dict(data_str: str) -> Union[None, dict]:
 
 
 def path_finder_v2(a, start, end, collision_block_char) -> list[int]:
-    def make_step(m, k):
-        for i in range(len(m)):
-            for j in range(len(m[i])):
-                if m[i][j] == k:
-                    if i > 0 and m[i - 1][j] == 0 and a[i - 1][j] == 0:
-                        m[i - 1][j] = k + 1
-                    if j > 0 and m[i][j - 1] == 0 and a[i][j - 1] == 0:
-                        m[i][j - 1] = k + 1
-                    if i < len(m) - 1 and m[i + 1][j] == 0 and a[i + 1][j] == 0:
-                        m[i + 1][j] = k + 1
-                    if j < len(m[i]) - 1 and m[i][j + 1] == 0 and a[i][j + 1] == 0:
-                        m[i][j + 1] = k + 1
-
-    new_maze = []
-    for row in a:
-        new_row = []
-        for j in row:
-            if j == collision_block_char:
-                new_row += [1]
-            else:
-                new_row += [0]
-        new_maze += [new_row]
-    a = new_maze
-
-    m = []
-    for i in range(len(a)):
-        m.append([])
-        for j in range(len(a[i])):
-            m[-1].append(0)
-    i, j = start
-    m[i][j] = 1
-
-    k = 0
-    except_handle = 150
-    while m[end[0]][end[1]] == 0:
-        k += 1
-        make_step(m, k)
-
-        if except_handle == 0:
-            break
-        except_handle -= 1
-
-    i, j = end
-    k = m[i][j]
-    the_path = [(i, j)]
-    while k > 1:
-        if i > 0 and m[i - 1][j] == k - 1:
-            i, j = i - 1, j
-            the_path.append((i, j))
-            k -= 1
-        elif j > 0 and m[i][j - 1] == k - 1:
-            i, j = i, j - 1
-            the_path.append((i, j))
-            k -= 1
-        elif i < len(m) - 1 and m[i + 1][j] == k - 1:
-            i, j = i + 1, j
-            the_path.append((i, j))
-            k -= 1
-        elif j < len(m[i]) - 1 and m[i][j + 1] == k - 1:
-            i, j = i, j + 1
-            the_path.append((i, j))
-            k -= 1
-
-    the_path.reverse()
-    return the_path
+    """start, end and the returned path are (row, col)"""
+    planner = PathPlanner.for_maze(a, collision_block_char)
+    return planner.find_path(tuple(start), tuple(end))
 
 
 def path_finder(collision_maze: list, start: list[int], end: list[int], collision_block_char: str) -> list[int]:
@@ -6,7 +6,9 @@
 @File    : logs.py
 """
 
+import contextvars
 import sys
+from contextlib import contextmanager
 from datetime import datetime
 
 from loguru import logger as _logger
@@ -33,11 +35,26 @@ def define_log_level(print_level="INFO", logfile_level="DEBUG", name: str = None
 
 logger = define_log_level()
 
+_llm_stream_listeners = contextvars.ContextVar("llm_stream_listeners", default=())
+
 
 def log_llm_stream(msg):
+    for listener in _llm_stream_listeners.get():
+        listener(msg)
     _llm_stream_log(msg)
 
 
+@contextmanager
+def llm_stream_listener(func):
+    """Also pass the LLM stream chunks of the enclosed code to `func`. An exception raised by `func` aborts the
+    stream."""
+    token = _llm_stream_listeners.set(_llm_stream_listeners.get() + (func,))
+    try:
+        yield
+    finally:
+        _llm_stream_listeners.reset(token)
+
+
 def set_llm_stream_logfunc(func):
     global _llm_stream_log
     _llm_stream_log = func
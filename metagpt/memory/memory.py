@@ -7,29 +7,151 @@
 @Modified By: mashenquan, 2023-11-1. According to RFC 116: Updated the type of index key.
 """
 from collections import defaultdict
-from typing import DefaultDict, Iterable, Set
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
 
-from pydantic import BaseModel, Field, SerializeAsAny
+from pydantic import BaseModel, Field, PrivateAttr, SerializeAsAny
 
 from metagpt.const import IGNORED_MESSAGE_ID
 from metagpt.schema import Message
 from metagpt.utils.common import any_to_str, any_to_str_set
 
+# Length of the substrings of the keyword index, keywords shorter than it are searched by a scan
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i : i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
 
 class Memory(BaseModel):
-    """The most basic memory: super-memory"""
+    """The most basic memory: super-memory
+
+    Besides the serialized `storage` and `index` (by `cause_by`), messages are indexed in memory by (id, content) for
+    the duplicate checks of `add` and `find_news`, by `role` and by `sent_from`. With `keyword_index`, a substring
+    index of the contents also serves `try_remember` and `get_by_content`. Messages are not expected to change once
+    added; changes of `storage` made without the methods below are indexed on the next call.
+    """
 
     storage: list[SerializeAsAny[Message]] = []
     index: DefaultDict[str, list[SerializeAsAny[Message]]] = Field(default_factory=lambda: defaultdict(list))
     ignore_id: bool = False
+    keyword_index: bool = Field(default=False, exclude=True)
+
+    _owner: int = PrivateAttr(default=0)  # id of the memory the indexes belong to, copies rebuild them
+    _indexed: Optional[list] = PrivateAttr(default=None)  # the `storage` list the indexes below describe
+    _indexed_count: int = PrivateAttr(default=0)
+    _seq: int = PrivateAttr(default=0)
+    _serials: Dict[int, int] = PrivateAttr(default_factory=dict)  # id(message) -> insertion order
+    _by_key: DefaultDict[Tuple[str, str], List[Message]] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _by_role: DefaultDict[str, List[Message]] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _by_sent_from: DefaultDict[str, List[Message]] = PrivateAttr(default_factory=lambda: defaultdict(list))
+    _by_ngram: DefaultDict[str, Set[int]] = PrivateAttr(default_factory=lambda: defaultdict(set))
+    _by_serial: Dict[int, Message] = PrivateAttr(default_factory=dict)
+
+    def __eq__(self, other) -> bool:
+        """Compare the fields only, not the indexes built from them"""
+        if not isinstance(other, Memory):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+    @staticmethod
+    def _key(message: Message) -> Tuple[str, str]:
+        return getattr(message, "id", None), getattr(message, "content", None)
+
+    def _sync_index(self):
+        """Index the messages put in `storage` without `add`, from scratch if `storage` was rewritten."""
+        storage = self.storage
+        count = self._indexed_count
+        if storage is self._indexed and len(storage) == count and self._owner == id(self):
+            return
+        if (
+            self._owner != id(self)
+            or storage is not self._indexed
+            or len(storage) < count
+            or (count and self._serials.get(id(storage[count - 1])) is None)
+        ):
+            self._reset_index()
+            count = 0
+        for message in storage[count:]:
+            self._index_message(message)
+        self._indexed_count = len(storage)
+
+    def _reset_index(self):
+        self._owner = id(self)
+        self._indexed = self.storage
+        self._indexed_count = 0
+        self._seq = 0
+        self._serials = {}
+        self._by_key = defaultdict(list)
+        self._by_role = defaultdict(list)
+        self._by_sent_from = defaultdict(list)
+        self._by_ngram = defaultdict(set)
+        self._by_serial = {}
+
+    def _index_message(self, message: Message):
+        self._seq += 1
+        self._serials[id(message)] = self._seq
+        self._by_key[self._key(message)].append(message)
+        self._by_role[getattr(message, "role", None)].append(message)
+        self._by_sent_from[getattr(message, "sent_from", None)].append(message)
+        if self.keyword_index:
+            self._by_serial[self._seq] = message
+            for gram in _ngrams(getattr(message, "content", None) or ""):
+                self._by_ngram[gram].add(self._seq)
+
+    def _unindex_message(self, message: Message):
+        serial = self._serials.pop(id(message), None)
+        for bucket, key in (
+            (self._by_key, self._key(message)),
+            (self._by_role, getattr(message, "role", None)),
+            (self._by_sent_from, getattr(message, "sent_from", None)),
+        ):
+            items = bucket.get(key, [])
+            for i, m in enumerate(items):
+                if m is message:
+                    del items[i]
+                    break
+            if not items:
+                bucket.pop(key, None)
+        if serial in self._by_serial:
+            del self._by_serial[serial]
+            for gram in _ngrams(getattr(message, "content", None) or ""):
+                serials = self._by_ngram.get(gram)
+                if serials:
+                    serials.discard(serial)
+        self._indexed_count -= 1
+
+    def _find(self, message: Message) -> Optional[Message]:
+        """Return the stored message equal to `message`, None if there is none"""
+        for m in self._by_key.get(self._key(message), []):
+            if m == message:
+                return m
+        return None
+
+    def _search(self, keyword: str) -> list[Message]:
+        """Return the messages whose content contains `keyword`, in storage order"""
+        self._sync_index()
+        if not self.keyword_index or len(keyword) < NGRAM_SIZE:
+            return [message for message in self.storage if keyword in message.content]
+        grams = sorted(_ngrams(keyword), key=lambda g: len(self._by_ngram.get(g, ())))
+        candidates = set(self._by_ngram.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._by_ngram.get(gram, set())
+        messages = [self._by_serial[i] for i in sorted(candidates)]
+        return [message for message in messages if keyword in message.content]
 
     def add(self, message: Message):
         """Add a new message to storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
-        if message in self.storage:
+        self._sync_index()
+        if self._find(message) is not None:
             return
         self.storage.append(message)
+        self._index_message(message)
+        self._indexed_count += 1
         if message.cause_by:
             self.index[message.cause_by].append(message)
 
@@ -39,16 +161,24 @@ class Memory(BaseModel):
 
     def get_by_role(self, role: str) -> list[Message]:
         """Return all messages of a specified role"""
-        return [message for message in self.storage if message.role == role]
+        self._sync_index()
+        return list(self._by_role.get(role, []))
+
+    def get_by_sent_from(self, sent_from: str) -> list[Message]:
+        """Return all messages sent from a specified role"""
+        self._sync_index()
+        return list(self._by_sent_from.get(sent_from, []))
 
     def get_by_content(self, content: str) -> list[Message]:
         """Return all messages containing a specified content"""
-        return [message for message in self.storage if content in message.content]
+        return self._search(content)
 
     def delete_newest(self) -> "Message":
         """delete the newest message from the storage"""
+        self._sync_index()
         if len(self.storage) > 0:
             newest_msg = self.storage.pop()
+            self._unindex_message(newest_msg)
             if newest_msg.cause_by and newest_msg in self.index[newest_msg.cause_by]:
                 self.index[newest_msg.cause_by].remove(newest_msg)
         else:
@@ -59,7 +189,13 @@ class Memory(BaseModel):
         """Delete the specified message from storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
+        self._sync_index()
+        stored = self._find(message)
         self.storage.remove(message)
+        if stored is not None:
+            self._unindex_message(stored)
+        else:  # changed since it was added
+            self._reset_index()
         if message.cause_by and message in self.index[message.cause_by]:
             self.index[message.cause_by].remove(message)
 
@@ -67,6 +203,7 @@ class Memory(BaseModel):
         """Clear storage and index"""
         self.storage = []
         self.index = defaultdict(list)
+        self._reset_index()
 
     def count(self) -> int:
         """Return the number of messages in storage"""
@@ -74,7 +211,7 @@ class Memory(BaseModel):
 
     def try_remember(self, keyword: str) -> list[Message]:
         """Try to recall all messages containing a specified keyword"""
-        return [message for message in self.storage if keyword in message.content]
+        return self._search(keyword)
 
     def get(self, k=0) -> list[Message]:
         """Return the most recent k memories, return all when k=0"""
@@ -82,10 +219,17 @@ class Memory(BaseModel):
 
     def find_news(self, observed: list[Message], k=0) -> list[Message]:
         """find news (previously unseen messages) from the most recent k memories, from all memories when k=0"""
-        already_observed = self.get(k)
+        self._sync_index()
+        if k == 0 or k >= len(self.storage):
+            seen = lambda message: self._find(message) is not None  # noqa: E731
+        else:
+            recent = defaultdict(list)
+            for message in self.get(k):
+                recent[self._key(message)].append(message)
+            seen = lambda message: message in recent.get(self._key(message), [])  # noqa: E731
         news: list[Message] = []
         for i in observed:
-            if i in already_observed:
+            if seen(i):
                 continue
             news.append(i)
         return news
@@ -1,15 +1,48 @@
-
+import asyncio
 import os
-import base64
+import struct
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 pipe_metagpt_to_openhands_file = ""
 pipe_openhands_to_metagpt_file = ""
 
-data_block_size = (1024*20)
+# 消息帧格式（网络字节序）:
+#   magic(2 bytes) | codec(1 byte) | flags(1 byte) | length(4 bytes) | payload(length bytes)
+# 一条消息由一个或多个帧组成，除最后一帧外都带 FLAG_MORE；
+# 消息先整体压缩，再按 chunk_size 切分，读端拼接后再解压。
+FRAME_MAGIC = b"MG"
+FRAME_HEADER = struct.Struct("!2sBBI")
+FLAG_MORE = 0x01
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {None: CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+# 小于该长度的消息不压缩
+COMPRESS_MIN_SIZE = 16 * 1024
+# 单帧最大负载，大文件分块流式写入，不需要额外的整块缓冲
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_COMPRESSION = "zstd" if zstandard is not None else "zlib"
 
 gpipein = None
 gpipeout = None
 
+# 多个线程可能同时写同一个管道，按 fd 加锁保证一条消息的各帧不被交错
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+class PipeProtocolError(Exception):
+    """管道中读到的数据不是合法的消息帧"""
+
+
 def set_metagpt_to_openhands_file_pipe(pipe_file):
     global pipe_metagpt_to_openhands_file
     pipe_metagpt_to_openhands_file = pipe_file
@@ -22,7 +55,7 @@ def get_metagpt_to_openhands_file_pipe():
     return pipe_metagpt_to_openhands_file
 
 def get_openhands_to_metagpt_file_pipe():
-    return pipe_openhands_to_metagpt_file   
+    return pipe_openhands_to_metagpt_file
 
 def init_pipe_files():
     if os.path.exists(pipe_metagpt_to_openhands_file):
@@ -54,34 +87,175 @@ def set_pipes(pipeout, pipein):
     global gpipeout
     global gpipein
     pipeout = pipeout
-    pipein = pipein 
-
-
-def write_pipe_message_with_len(pipeout, message):
-    encoded_bytes = message.encode('utf-8')
-    encoded_text = base64.b64encode(encoded_bytes)
-    
-    #dataLen = len(encoded_text)
-    #dataLenStr = str(dataLen).rjust(32,' ').encode()
-    #dataWrite = os.write(pipeout, dataLenStr)
-    #while dataWrite < 32:
-    #    dataWrite += os.write(pipeout, dataLenStr[dataWrite:])
-    
-    encoded_text = encoded_text.rjust(data_block_size,b'\x00')
-    dataWrite = os.write(pipeout, encoded_text)
-    while dataWrite < data_block_size:
-        dataWrite += os.write(pipeout, encoded_text[dataWrite:]) 
+    pipein = pipein
+
+
+def _compress(data: bytes, compression) -> tuple:
+    """按配置压缩，返回 (codec, data)；压缩无收益时原样返回"""
+    if compression is None or len(data) < COMPRESS_MIN_SIZE:
+        return CODEC_NONE, data
+    if compression not in CODECS:
+        raise ValueError(f"Unsupported pipe compression: {compression}")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the `zstandard` package: `pip install zstandard`")
+        compressed = zstandard.ZstdCompressor().compress(data)
+    else:
+        compressed = zlib.compress(data)
+    if len(compressed) >= len(data):
+        return CODEC_NONE, data
+    return CODECS[compression], compressed
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("zstd compression needs the `zstandard` package: `pip install zstandard`")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise PipeProtocolError(f"Unknown codec {codec}")
+
+
+def encode_frames(message, compression=DEFAULT_COMPRESSION, chunk_size=DEFAULT_CHUNK_SIZE):
+    """将消息编码为帧，逐帧返回 (header, payload)，payload 为 memoryview 避免复制"""
+    data = message.encode("utf-8") if isinstance(message, str) else bytes(message)
+    codec, data = _compress(data, compression)
+    view = memoryview(data)
+    offset = 0
+    while True:
+        chunk = view[offset:offset + chunk_size]
+        offset += len(chunk)
+        flags = FLAG_MORE if offset < len(view) else 0
+        yield FRAME_HEADER.pack(FRAME_MAGIC, codec, flags, len(chunk)), chunk
+        if not flags:
+            break
+
+
+def parse_frame_header(header: bytes) -> tuple:
+    """解析帧头，返回 (codec, flags, length)"""
+    magic, codec, flags, length = FRAME_HEADER.unpack(header)
+    if magic != FRAME_MAGIC:
+        raise PipeProtocolError(f"Bad frame magic {magic!r}")
+    return codec, flags, length
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _read_exactly(fd, size) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = os.read(fd, size - len(buffer))
+        if not chunk:
+            raise EOFError(f"Pipe closed after {len(buffer)} of {size} bytes")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def _get_write_lock(fd):
+    with _write_locks_lock:
+        return _write_locks.setdefault(fd, threading.Lock())
+
+
+def write_pipe_message_with_len(pipeout, message, compression=DEFAULT_COMPRESSION, chunk_size=DEFAULT_CHUNK_SIZE):
+    """以长度前缀的帧写入一条消息，大消息分块写入"""
+    with _get_write_lock(pipeout):
+        for header, payload in encode_frames(message, compression=compression, chunk_size=chunk_size):
+            _write_all(pipeout, header)
+            _write_all(pipeout, payload)
+
 
 def read_pipe_message_with_len(pipein):
-    #dataLenBytes = os.read(pipein, 32)
-    #while len(dataLenBytes) < 32:
-    #    dataLenBytes += os.read(pipein, 32 - len(dataLenBytes))
-        
-    #dataLenStr = dataLenBytes.decode().strip()
-    #dataLen = int(dataLenStr)
-    dataCmd = os.read(pipein, data_block_size)
-
-    print("Received command in read_pipe_message_with_len: " + base64.b64decode(dataCmd).decode('utf-8'))
-    while len(dataCmd) < data_block_size:
-        dataCmd += os.read(pipein, data_block_size - len(dataCmd))
-    return base64.b64decode(dataCmd).decode('utf-8')
+    """读取一条完整的消息，所有帧到齐后才解码"""
+    chunks = []
+    while True:
+        codec, flags, length = parse_frame_header(_read_exactly(pipein, FRAME_HEADER.size))
+        chunks.append(_read_exactly(pipein, length))
+        if not flags & FLAG_MORE:
+            break
+    return _decompress(codec, b"".join(chunks)).decode("utf-8")
+
+
+class AsyncPipeWriter:
+    """FIFO 的 asyncio 写端，帧格式与 `write_pipe_message_with_len` 相同"""
+
+    def __init__(self, writer: asyncio.StreamWriter, compression=DEFAULT_COMPRESSION, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.writer = writer
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, pipe, **kwargs) -> "AsyncPipeWriter":
+        """打开 FIFO 写端，`pipe` 可以是路径或已打开的 fd"""
+        loop = asyncio.get_running_loop()
+        fd = os.open(pipe, os.O_RDWR) if isinstance(pipe, (str, os.PathLike)) else pipe
+        # StreamReaderProtocol 提供 drain() 的流控和 wait_closed()，写端不会用到它的 reader
+        reader = asyncio.StreamReader(loop=loop)
+        transport, protocol = await loop.connect_write_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader, loop=loop), os.fdopen(fd, "wb")
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        return cls(writer, **kwargs)
+
+    async def write_message(self, message):
+        async with self._lock:
+            for header, payload in encode_frames(message, compression=self.compression, chunk_size=self.chunk_size):
+                self.writer.write(header)
+                self.writer.write(payload)
+                await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class AsyncPipeReader:
+    """FIFO 的 asyncio 读端，帧格式与 `read_pipe_message_with_len` 相同"""
+
+    def __init__(self, reader: asyncio.StreamReader, transport=None):
+        self.reader = reader
+        self.transport = transport
+
+    @classmethod
+    async def open(cls, pipe, limit=DEFAULT_CHUNK_SIZE) -> "AsyncPipeReader":
+        """打开 FIFO 读端，`pipe` 可以是路径或已打开的 fd"""
+        loop = asyncio.get_running_loop()
+        fd = os.open(pipe, os.O_RDWR) if isinstance(pipe, (str, os.PathLike)) else pipe
+        reader = asyncio.StreamReader(limit=limit, loop=loop)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader, loop=loop), os.fdopen(fd, "rb")
+        )
+        return cls(reader, transport)
+
+    async def read_message(self) -> str:
+        chunks = []
+        try:
+            while True:
+                codec, flags, length = parse_frame_header(await self.reader.readexactly(FRAME_HEADER.size))
+                chunks.append(await self.reader.readexactly(length))
+                if not flags & FLAG_MORE:
+                    break
+        except asyncio.IncompleteReadError as e:
+            raise EOFError("Pipe closed in the middle of a message") from e
+        return _decompress(codec, b"".join(chunks)).decode("utf-8")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self.read_message()
+        except EOFError:
+            raise StopAsyncIteration
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
@@ -6,14 +6,10 @@ import typer
 
 from metagpt.const import CONFIG_ROOT
 from metagpt.utils.project_repo import ProjectRepo
-from metagpt.logs import logger
-import json
+from metagpt.utils.oh_action_bus import oh_action_bus, publish_oh_action
 
 app = typer.Typer(add_completion=False, pretty_exceptions_show_locals=False)
 
-def OH_ACTION_log_filter(record):
-    return "<OH_ACTION>" in record["message"]
-
 
 def generate_product(
         idea,
@@ -31,40 +27,41 @@ def generate_product(
         TestEngineer,
         Architect
     )
-    if logger_stream_obj:
-        logger.add(logger_stream_obj,filter=OH_ACTION_log_filter,level="ERROR")
     from metagpt.team import Team
     
     config = config.default(sid,sio, local, idea, llm_config)
+    with oh_action_bus.subscription(
+        logger_stream_obj, conversation_id=sid, compress_threshold=config.oh_action_compress_threshold
+    ):
 
-    config.update_project(project_name)
+        config.update_project(project_name)
 
-    ctx = Context(config=config)
+        ctx = Context(config=config)
 
-    company = Team(context=ctx)
-    company.hire(
-        [
-            ProductManager(),
-            TestEngineer(),
-            Architect()
-        ]
-    )
-    company.run_project(idea)
-    asyncio.run(company.run())
+        company = Team(context=ctx)
+        company.hire(
+            [
+                ProductManager(),
+                TestEngineer(),
+                Architect()
+            ]
+        )
+        company.run_project(idea)
+        asyncio.run(company.run())
 
-    oh_action_data = {}
-    content_info = {
-        "sub_content": f"Finish write design, wait for user confirm",
-        "role_task": f"1/1 Write architect design",
-        "agent_role": f"ARCHITECT",
-        "mission": config.user_intend
-    }
-    oh_action_data['action_type'] = "MESSAGE"
-    oh_action_data['content'] = content_info
-    oh_action_data['conversation_id'] = sid
-    logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data, ensure_ascii=False)}")
+        oh_action_data = {}
+        content_info = {
+            "sub_content": f"Finish write design, wait for user confirm",
+            "role_task": f"1/1 Write architect design",
+            "agent_role": f"ARCHITECT",
+            "mission": config.user_intend
+        }
+        oh_action_data['action_type'] = "MESSAGE"
+        oh_action_data['content'] = content_info
+        oh_action_data['conversation_id'] = sid
+        publish_oh_action(oh_action_data)
 
-    return ctx.repo
+        return ctx.repo
 
 if __name__ == "__main__":
     app()
@@ -7,9 +7,9 @@
 @Modified By: mashenquan, 2023/12/1. Fix bug: Unclosed connection caused by openai 0.x.
 """
 from openai import AsyncAzureOpenAI
-from openai._base_client import AsyncHttpxClientWrapper
 
 from metagpt.configs.llm_config import LLMType
+from metagpt.provider.llm_client_pool import LLM_CLIENT_POOL
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.provider.openai_api import OpenAILLM
 
@@ -34,9 +34,7 @@ class AzureOpenAILLM(OpenAILLM):
             azure_endpoint=self.config.base_url,
         )
 
-        # to use proxy, openai v1 needs http_client
-        proxy_params = self._get_proxy_params()
-        if proxy_params:
-            kwargs["http_client"] = AsyncHttpxClientWrapper(**proxy_params)
+        # the http client, proxy included, is shared by all the providers of the same endpoint
+        kwargs["http_client"] = LLM_CLIENT_POOL.get(self.config)
 
         return kwargs
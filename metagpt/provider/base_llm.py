@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import json
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from typing import Awaitable, Callable, Optional, Union
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
@@ -22,12 +22,14 @@ from tenacity import (
     wait_random_exponential,
 )
 
-from metagpt.configs.llm_config import LLMConfig
+from metagpt.configs.llm_config import LLMCacheMode, LLMConfig
 from metagpt.const import LLM_API_TIMEOUT, USE_CONFIG_TIMEOUT
-from metagpt.logs import logger
+from metagpt.logs import log_llm_stream, logger
+from metagpt.provider.llm_scheduler import LLM_SCHEDULER, estimate_tokens
 from metagpt.schema import Message
 from metagpt.utils.common import log_and_reraise
 from metagpt.utils.cost_manager import CostManager, Costs
+from metagpt.utils.llm_cache import LLMCacheMissError, get_llm_cache, llm_cache_key
 
 
 class BaseLLM(ABC):
@@ -149,7 +151,7 @@ class BaseLLM(ABC):
         if stream is None:
             stream = self.config.stream
         logger.debug(message)
-        rsp = await self.acompletion_text(message, stream=stream, timeout=self.get_timeout(timeout))
+        rsp = await self.acompletion_text_with_cache(message, stream=stream, timeout=self.get_timeout(timeout))
         return rsp
 
     def _extract_assistant_rsp(self, context):
@@ -161,7 +163,7 @@ class BaseLLM(ABC):
         for msg in msgs:
             umsg = self._user_msg(msg)
             context.append(umsg)
-            rsp_text = await self.acompletion_text(context, timeout=self.get_timeout(timeout))
+            rsp_text = await self.acompletion_text_with_cache(context, timeout=self.get_timeout(timeout))
             context.append(self._assistant_msg(rsp_text))
         return self._extract_assistant_rsp(context)
 
@@ -203,6 +205,72 @@ class BaseLLM(ABC):
         resp = await self._achat_completion(messages, timeout=self.get_timeout(timeout))
         return self.get_choice_text(resp)
 
+    async def acompletion_text_with_cache(
+        self, messages: list[dict], stream: bool = False, timeout: int = USE_CONFIG_TIMEOUT
+    ) -> str:
+        """`acompletion_text` served from the response cache according to `config.cache_mode`"""
+
+        def _replay(rsp: str):
+            # a cached response is still shown to the stream listeners of a streamed request
+            if stream:
+                log_llm_stream(rsp)
+                log_llm_stream("\n")
+
+        return await self._acached(
+            messages,
+            lambda: self._acompletion_text_scheduled(messages, stream=stream, timeout=timeout),
+            on_hit=_replay,
+        )
+
+    async def _acached(
+        self,
+        messages: list[dict],
+        call: Callable[[], Awaitable[str]],
+        tools: Optional[list] = None,
+        tool_choice=None,
+        on_hit: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """Return the cached response of the request, `call()` it according to `config.cache_mode` otherwise.
+
+        :param call: Send the request, return the response text to cache.
+        :param tools: The `tools` of the request, part of the cache key like `tool_choice`.
+        :param on_hit: Called with the response served from the cache.
+        """
+        cache = get_llm_cache(self.config)
+        if cache is None:
+            return await call()
+
+        mode = LLMCacheMode(self.config.cache_mode)
+        key = llm_cache_key(
+            self.model or self.config.model,
+            messages,
+            temperature=self.config.temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+        )
+        if mode in (LLMCacheMode.ON, LLMCacheMode.REPLAY):
+            rsp = cache.get(key)
+            if rsp is not None:
+                logger.debug(f"LLM response cache hit: {key}")
+                if on_hit:
+                    on_hit(rsp)
+                return rsp
+            if mode == LLMCacheMode.REPLAY:
+                raise LLMCacheMissError(f"No recorded LLM response for {key} in replay mode")
+        rsp = await call()
+        cache.set(key, rsp)
+        return rsp
+
+    async def _acompletion_text_scheduled(
+        self, messages: list[dict], stream: bool = False, timeout: int = USE_CONFIG_TIMEOUT
+    ) -> str:
+        """`acompletion_text` within the rate limits of the endpoint, see `metagpt.provider.llm_scheduler`"""
+        return await LLM_SCHEDULER.call(
+            self.config,
+            lambda: self.acompletion_text(messages, stream=stream, timeout=timeout),
+            tokens=estimate_tokens(messages),
+        )
+
     def get_choice_text(self, rsp: dict) -> str:
         """Required to provide the first text of choice"""
         return rsp.get("choices")[0]["message"]["content"]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : llm_client_pool.py
+@Desc    : Process-wide pool of the HTTP clients used by the OpenAI compatible providers.
+
+    Providers are still created per role / per context, so `cost_manager`, `system_prompt` and the other provider
+    state stay private. Only the underlying HTTP client is shared: one per effective endpoint
+    (api_type, base_url, api_key, proxy), with keep-alive connections, HTTP/2 when `h2` is installed and a bounded
+    number of connections per endpoint.
+
+    httpx connections belong to the event loop that opened them, and every `generate_*` call runs its own loop in a
+    worker thread, so the shared client keeps one transport per event loop. The code running on a loop, e.g.
+    `Team.run`, holds a `session` of the pool: the connections of the loop are closed when its last session ends,
+    so a Team finishing does not close the connections other Teams of the same loop are using.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from openai._base_client import AsyncHttpxClientWrapper
+
+from metagpt.configs.llm_config import LLMConfig
+
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+PoolKey = Tuple[str, str, str, str]
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """An httpx transport keeping a separate connection pool for each running event loop."""
+
+    def __init__(self, **transport_kwargs):
+        self.transport_kwargs = transport_kwargs
+        self._lock = threading.Lock()
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(**self.transport_kwargs)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._get_transport().handle_async_request(request)
+
+    async def aclose(self):
+        """Close the connections opened by the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+    @property
+    def loop_count(self) -> int:
+        return len(self._transports)
+
+
+class LLMClientPool:
+    """Share HTTP clients between the providers talking to the same endpoint.
+
+    :param max_connections: Upper bound of concurrent connections per endpoint and event loop, requests beyond it
+        wait for a free connection.
+    :param max_keepalive_connections: Idle connections kept open per endpoint and event loop.
+    :param keepalive_expiry: Seconds an idle connection is kept.
+    :param http2: Use HTTP/2, defaults to whether `h2` is installed.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: Optional[bool] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self._lock = threading.Lock()
+        self._clients: Dict[PoolKey, AsyncHttpxClientWrapper] = {}
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def key(config: LLMConfig) -> PoolKey:
+        return str(config.api_type), config.base_url or "", config.api_key or "", config.proxy or ""
+
+    def get(self, config: LLMConfig) -> AsyncHttpxClientWrapper:
+        """Return the shared HTTP client of the endpoint of `config`."""
+        key = self.key(config)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None or client.is_closed:
+                transport = LoopLocalTransport(
+                    http2=self.http2, limits=self.limits, proxy=config.proxy or None, retries=0
+                )
+                client = AsyncHttpxClientWrapper(transport=transport, timeout=config.timeout, follow_redirects=True)
+                self._clients[key] = client
+            return client
+
+    async def aclose(self):
+        """Close the connections the running event loop opened, call it before the loop ends."""
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            await client._transport.aclose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[LLMClientPool]:
+        """Use the pool on the running event loop, the loop's connections are closed when its last session ends."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._sessions[loop] = self._sessions.get(loop, 0) + 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                count = self._sessions.pop(loop) - 1
+                if count:
+                    self._sessions[loop] = count
+            if not count:
+                await self.aclose()
+
+    def clear(self):
+        """Forget all clients, the next `get` creates new ones."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+LLM_CLIENT_POOL = LLMClientPool()
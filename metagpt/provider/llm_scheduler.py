@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : llm_scheduler.py
+@Desc    : Process-wide, rate-limit aware scheduler of LLM requests.
+
+    Every request through `BaseLLM.aask` takes a slot from the limiter of its (provider, model):
+    - token buckets for requests and tokens per minute (`LLMConfig.rpm` / `LLMConfig.tpm`),
+    - an adaptive concurrency limit, halved on a 429 and grown back one by one on success (AIMD), capped by
+      `LLMConfig.max_concurrency`,
+    - `Retry-After` of a 429 blocks the endpoint until then, the request is retried afterwards,
+    - waiters are served by priority, see `LLMPriority` and `llm_priority`.
+
+    Conversations run their own event loops in worker threads, so the limiter state is guarded by a thread lock and
+    waiters are woken with `call_soon_threadsafe`.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.logs import logger
+
+T = TypeVar("T")
+
+MAX_RATE_LIMIT_RETRIES = 5
+MAX_BACKOFF = 60
+# Upper bound of the adaptive concurrency limit when `LLMConfig.max_concurrency` is not set
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class LLMPriority(IntEnum):
+    """Lower value, served first"""
+
+    INTERACTIVE = 0  # design stage, a user is waiting for it
+    DEFAULT = 1
+    BACKGROUND = 2  # code generation
+
+
+_llm_priority: contextvars.ContextVar[LLMPriority] = contextvars.ContextVar("llm_priority", default=LLMPriority.DEFAULT)
+
+
+@contextmanager
+def llm_priority(priority: LLMPriority):
+    """Run the LLM requests of the enclosed code, and of the tasks it creates, with `priority`"""
+    token = _llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        _llm_priority.reset(token)
+
+
+def current_llm_priority() -> LLMPriority:
+    return _llm_priority.get()
+
+
+class TokenBucket:
+    """A bucket refilled with `rate_per_minute` units per minute, holding at most a minute's worth."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available, 0 if they are."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    loop: asyncio.AbstractEventLoop = field(compare=False)
+    future: Optional[asyncio.Future] = field(default=None, compare=False)
+
+
+@dataclass
+class LimiterMetrics:
+    requests: int = 0
+    rate_limited: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0
+
+
+class EndpointLimiter:
+    """Requests, tokens and concurrency limits of one (provider, model)."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        # None until the first 429 unless configured
+        self.concurrency_limit: Optional[int] = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.metrics = LimiterMetrics()
+        self._successes = 0
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, tokens: int = 0, priority: LLMPriority = LLMPriority.DEFAULT) -> float:
+        """Wait for a slot, return the seconds waited."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority=int(priority), seq=next(self._seq), loop=loop)
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_grant(waiter, tokens, time.monotonic())
+                    if delay == 0:
+                        waited = time.monotonic() - start
+                        self.metrics.requests += 1
+                        self.metrics.total_wait += waited
+                        self.metrics.max_wait = max(self.metrics.max_wait, waited)
+                        self._wake_head()
+                        return waited
+                    waiter.future = loop.create_future()
+                try:
+                    await asyncio.wait_for(waiter.future, timeout=None if math.isinf(delay) else delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                self._wake_head()
+            raise
+
+    def _try_grant(self, waiter: _Waiter, tokens: int, now: float) -> float:
+        """Take a slot for `waiter` and return 0, or return the seconds to wait before trying again."""
+        if self._waiters[0] is not waiter:
+            return math.inf
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.concurrency_limit is not None and self.in_flight >= self.concurrency_limit:
+            return math.inf
+        delay = max(
+            self.requests.wait_time(1, now) if self.requests else 0,
+            self.tokens.wait_time(tokens, now) if self.tokens else 0,
+        )
+        if delay > 0:
+            return delay
+        if self.requests:
+            self.requests.consume(1)
+        if self.tokens:
+            self.tokens.consume(tokens)
+        heapq.heappop(self._waiters)
+        self.in_flight += 1
+        return 0
+
+    def _wake_head(self):
+        if not self._waiters:
+            return
+        head = self._waiters[0]
+        if head.future is not None and not head.future.done():
+            head.loop.call_soon_threadsafe(_set_future_result, head.future)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_head()
+
+    def on_success(self):
+        with self._lock:
+            if self.concurrency_limit is None or self.concurrency_limit >= self.max_concurrency:
+                return
+            self._successes += 1
+            if self._successes >= self.concurrency_limit:
+                self.concurrency_limit += 1
+                self._successes = 0
+                self._wake_head()
+
+    def on_rate_limited(self, retry_after: float):
+        with self._lock:
+            self.metrics.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            current = self.concurrency_limit or max(self.in_flight, 1)
+            self.concurrency_limit = max(1, current // 2)
+            self._successes = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._waiters),
+                "in_flight": self.in_flight,
+                "concurrency_limit": self.concurrency_limit,
+                "requests": self.metrics.requests,
+                "rate_limited": self.metrics.rate_limited,
+                "avg_wait": self.metrics.avg_wait,
+                "max_wait": self.metrics.max_wait,
+            }
+
+
+def _set_future_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def get_retry_after(e: Exception) -> Optional[float]:
+    """Return the `Retry-After` seconds of a 429 error, None if `e` is not a rate limit error."""
+    if getattr(e, "status_code", None) != 429:
+        return None
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0)
+        except ValueError:
+            continue  # an HTTP date, use the backoff
+    return 0
+
+
+def estimate_tokens(messages: list) -> int:
+    """A cheap estimate of the input tokens of `messages`, about 4 characters per token"""
+    return sum(len(str(i.get("content", ""))) for i in messages if isinstance(i, dict)) // 4 + 1
+
+
+class LLMScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], EndpointLimiter] = {}
+
+    @staticmethod
+    def key(config: LLMConfig) -> Tuple[str, str]:
+        return str(config.api_type), config.model or ""
+
+    def limiter(self, config: LLMConfig) -> EndpointLimiter:
+        """Return the limiter of (provider, model), created with the limits of the first config seen"""
+        key = self.key(config)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = EndpointLimiter(rpm=config.rpm, tpm=config.tpm, max_concurrency=config.max_concurrency)
+                self._limiters[key] = limiter
+            return limiter
+
+    @asynccontextmanager
+    async def slot(self, config: LLMConfig, tokens: int = 0, priority: Optional[LLMPriority] = None):
+        limiter = self.limiter(config)
+        await limiter.acquire(tokens, current_llm_priority() if priority is None else priority)
+        try:
+            yield limiter
+        finally:
+            limiter.release()
+
+    async def call(
+        self, config: LLMConfig, func: Callable[[], Awaitable[T]], tokens: int = 0, priority: Optional[LLMPriority] = None
+    ) -> T:
+        """Run `func` in a slot, retrying after `Retry-After` when it is rate limited."""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            async with self.slot(config, tokens=tokens, priority=priority) as limiter:
+                try:
+                    result = await func()
+                except Exception as e:
+                    retry_after = get_retry_after(e)
+                    if retry_after is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                        raise
+                    retry_after = retry_after or min(2**attempt, MAX_BACKOFF)
+                    logger.warning(f"{self.key(config)} rate limited, retry in {retry_after:.1f}s")
+                    limiter.on_rate_limited(retry_after)
+                    continue
+            limiter.on_success()
+            return result
+
+    def metrics(self) -> Dict[str, dict]:
+        """Queue depth, in-flight requests and wait times per (provider, model)"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {f"{k[0]}:{k[1]}": v.snapshot() for k, v in limiters.items()}
+
+
+LLM_SCHEDULER = LLMScheduler()
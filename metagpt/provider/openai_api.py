@@ -13,7 +13,6 @@ import re
 from typing import Optional, Union
 
 from openai import APIConnectionError, AsyncOpenAI, AsyncStream
-from openai._base_client import AsyncHttpxClientWrapper
 from openai.types import CompletionUsage
 from openai.types.chat import ChatCompletion, ChatCompletionChunk
 from tenacity import (
@@ -29,6 +28,7 @@ from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.logs import log_llm_stream, logger
 from metagpt.provider.base_llm import BaseLLM
 from metagpt.provider.constant import GENERAL_FUNCTION_SCHEMA
+from metagpt.provider.llm_client_pool import LLM_CLIENT_POOL
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.utils.common import CodeParser, decode_image, log_and_reraise
 from metagpt.utils.cost_manager import CostManager
@@ -68,13 +68,12 @@ class OpenAILLM(BaseLLM):
         self.aclient = AsyncOpenAI(**kwargs)
 
     def _make_client_kwargs(self) -> dict:
-        kwargs = {"api_key": self.config.api_key, "base_url": self.config.base_url}
-
-        # to use proxy, openai v1 needs http_client
-        if proxy_params := self._get_proxy_params():
-            kwargs["http_client"] = AsyncHttpxClientWrapper(**proxy_params)
-
-        return kwargs
+        # the http client, proxy included, is shared by all the providers of the same endpoint
+        return {
+            "api_key": self.config.api_key,
+            "base_url": self.config.base_url,
+            "http_client": LLM_CLIENT_POOL.get(self.config),
+        }
 
     def _get_proxy_params(self) -> dict:
         params = {}
@@ -189,8 +188,14 @@ class OpenAILLM(BaseLLM):
         if "tools" not in kwargs:
             configs = {"tools": [{"type": "function", "function": GENERAL_FUNCTION_SCHEMA}]}
             kwargs.update(configs)
-        rsp = await self._achat_completion_function(messages, **kwargs)
-        return self.get_choice_function_arguments(rsp)
+        messages = self.format_msg(messages)
+
+        async def _ask_code() -> str:
+            rsp = await self._achat_completion_function(messages, **kwargs)
+            return json.dumps(self.get_choice_function_arguments(rsp), ensure_ascii=False)
+
+        rsp = await self._acached(messages, _ask_code, tools=kwargs["tools"], tool_choice=kwargs.get("tool_choice"))
+        return json.loads(rsp)
 
     def _parse_arguments(self, arguments: str) -> dict:
         """parse arguments in openai function call"""
@@ -264,6 +269,10 @@ class OpenAILLM(BaseLLM):
         try:
             usage.prompt_tokens = count_input_tokens(messages, self.pricing_plan)
             usage.completion_tokens = count_output_tokens(rsp, self.pricing_plan)
+        except NotImplementedError:
+            # models without a tiktoken message format, e.g. the ones of other providers
+            usage.prompt_tokens = count_input_tokens(messages, self.pricing_plan, approximate=True)
+            usage.completion_tokens = count_output_tokens(rsp, self.pricing_plan, approximate=True)
         except Exception as e:
             logger.warning(f"usage calculation failed: {e}")
 
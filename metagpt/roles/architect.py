@@ -7,10 +7,13 @@
 """
 
 
+from typing import ClassVar
+
 from metagpt.actions import WritePRD
 from metagpt.actions.code_design_api import WriteCodeDesignAPI
 from metagpt.actions.write_testcase import WriteTestCase
 from metagpt.actions.design_api import WriteDesign
+from metagpt.provider.llm_scheduler import LLMPriority
 from metagpt.roles.role import Role
 
 
@@ -28,6 +31,7 @@ class Architect(Role):
 
     name: str = "Bob"
     profile: str = "Architect"
+    llm_priority: ClassVar[LLMPriority] = LLMPriority.INTERACTIVE
     goal: str = "design a concise, usable, complete software system"
     constraints: str = (
         "make sure the architecture is simple enough and use  appropriate open source "
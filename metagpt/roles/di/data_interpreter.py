@@ -85,14 +85,17 @@ class DataInterpreter(Role):
         code, _, _ = await self._write_and_exec_code()
         return Message(content=code, role="assistant", cause_by=WriteAnalysisCode)
 
+    async def _react(self) -> Message:
+        try:
+            return await super()._react()
+        finally:
+            await self.execute_code.terminate()  # return the kernel to the pool
+
     async def _plan_and_act(self) -> Message:
         try:
-            rsp = await super()._plan_and_act()
-            await self.execute_code.terminate()
-            return rsp
-        except Exception as e:
+            return await super()._plan_and_act()
+        finally:
             await self.execute_code.terminate()
-            raise e
 
     async def _act_on_task(self, current_task: Task) -> TaskResult:
         """Useful in 'plan_and_act' mode. Wrap the output in a TaskResult for review and confirmation."""
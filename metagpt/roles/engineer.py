@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 from collections import defaultdict
 from pathlib import Path
-from typing import Optional, Set, List
+from typing import ClassVar, Optional, Set, List
 import re
 from collections import deque
 from metagpt.actions import Action, WriteCode, WriteCodeReview, WriteTasks
@@ -34,6 +35,7 @@ from metagpt.const import (
     TESTCASE_FILENAME
 )
 from metagpt.logs import logger
+from metagpt.provider.llm_scheduler import LLMPriority
 from metagpt.roles import Role
 from metagpt.schema import (
     CodePlanAndChangeContext,
@@ -44,7 +46,9 @@ from metagpt.schema import (
     Message,
 
 )
+from metagpt.utils.async_helper import run_dag
 from metagpt.utils.common import any_to_name, any_to_str, any_to_str_set
+from metagpt.utils.file_repository import get_documents
 from metagpt.utils.project_setting import merge_json_string, get_project_setting
 from pathspec import PathSpec
 
@@ -73,6 +77,7 @@ class Engineer(Role):
 
     name: str = "Alex"
     profile: str = "Engineer"
+    llm_priority: ClassVar[LLMPriority] = LLMPriority.BACKGROUND
     goal: str = "write elegant, readable, extensible, efficient code"
     constraints: str = (
         "the code should conform to standards like google-style and be modular and maintainable. "
@@ -141,8 +146,15 @@ class Engineer(Role):
         return None
     
     async def _act_sp_with_cr(self, review=False) -> Set[str]:
-        changed_files = set()
-        for todo in self.code_todos:
+        """Write the code todos, the ones whose dependencies are written run concurrently.
+
+        The dependencies come from the file relation of the task doc, the same one `WriteCode.get_codes` uses to
+        include the dependent sources in the prompt. Results are kept in todo order.
+        """
+        save_lock = asyncio.Lock()
+
+        async def _write(index: int) -> CodingContext:
+            todo = self.code_todos[index]
             """
             # Select essential information from the historical data to reduce the length of the prompt (summarized from human experience):
             1. All from Architect
@@ -156,13 +168,24 @@ class Engineer(Role):
                 action = WriteCodeReview(i_context=coding_context, context=self.context, llm=self.llm)
                 self._init_action(action)
                 coding_context = await action.run()
-            
+
             dependencies = {coding_context.design_doc.root_relative_path, coding_context.task_doc.root_relative_path}
             if self.config.inc:
                 dependencies.add(coding_context.code_plan_and_change_doc.root_relative_path)
 
-            await self._save_coding_context(coding_context, dependencies)
+            # one writer at a time for the dependency file
+            async with save_lock:
+                await self._save_coding_context(coding_context, dependencies)
             logger.info(f"The tagget file to be written is {coding_context.filename}")
+            return coding_context
+
+        indexes = list(range(len(self.code_todos)))
+        coding_contexts = await run_dag(
+            indexes, self._code_todo_dependencies(), _write, max_concurrency=self.config.code_parallelism
+        )
+
+        changed_files = set()
+        for coding_context in coding_contexts:
             msg = Message(
                 content=coding_context.model_dump_json(),
                 instruct_content=coding_context,
@@ -176,6 +199,31 @@ class Engineer(Role):
             logger.info("Nothing has changed.")
         return changed_files
 
+    def _code_todo_dependencies(self) -> dict[int, set[int]]:
+        """Map each code todo to the earlier todos it depends on, directly or not, according to the file relation.
+
+        Only earlier todos count, the todos are topologically sorted by `_sort_tasks`, so cycles are broken the
+        same way the sequential order broke them.
+        """
+        if not self.code_todos:
+            return {}
+        task_doc = CodingContext.loads(self.code_todos[0].i_context.content).task_doc
+        relation = {}
+        if task_doc and task_doc.content:
+            relation = {x: y for x, y in (self._parse_relation(task_doc) or [])}
+        filenames = [todo.i_context.filename for todo in self.code_todos]
+
+        dependencies = {}
+        for index, filename in enumerate(filenames):
+            related, queue = set(), list(relation.get(filename, []))
+            while queue:
+                name = queue.pop(0)
+                if name not in related:
+                    related.add(name)
+                    queue.extend(relation.get(name, []))
+            dependencies[index] = {i for i in range(index) if filenames[i] in related}
+        return dependencies
+
     async def _act_write_code(self):
         changed_files = await self._act_sp_with_cr(review=self.use_code_review)
         return Message(
@@ -319,13 +367,20 @@ class Engineer(Role):
         task_doc = None
         design_doc = None
         code_plan_and_change_doc = await self._get_any_code_plan_and_change() if await self._is_fixbug() else None
-        for i in dependencies:
+        repos = {
+            TASK_FILE_REPO: self.project_repo.docs.task,
+            SYSTEM_DESIGN_FILE_REPO: self.project_repo.docs.system_design,
+            CODE_PLAN_AND_CHANGE_FILE_REPO: self.project_repo.docs.code_plan_and_change,
+        }
+        dependencies = [i for i in dependencies if str(i.parent.as_posix()) in repos]
+        docs = await get_documents([(repos[str(i.parent.as_posix())], i.name) for i in dependencies])
+        for i, doc in zip(dependencies, docs):
             if str(i.parent.as_posix()) == TASK_FILE_REPO:
-                task_doc = await self.project_repo.docs.task.get(i.name)
+                task_doc = doc
             elif str(i.parent.as_posix()) == SYSTEM_DESIGN_FILE_REPO:
-                design_doc = await self.project_repo.docs.system_design.get(i.name)
+                design_doc = doc
             elif str(i.parent.as_posix()) == CODE_PLAN_AND_CHANGE_FILE_REPO:
-                code_plan_and_change_doc = await self.project_repo.docs.code_plan_and_change.get(i.name)
+                code_plan_and_change_doc = doc
         if not task_doc or not design_doc:
             logger.error(f'Detected source code "{filename}" from an unknown origin.')
             raise ValueError(f'Detected source code "{filename}" from an unknown origin.')
@@ -347,16 +402,20 @@ class Engineer(Role):
 
     async def _bugfix_code_actions(self):
         changed_task_files = self.project_repo.docs.task.all_files
-        bugfix_doc = await self.project_repo.docs.get(BUGFIX_FILENAME)
-        code_design = await self.project_repo.docs.code_design.get(CODEDESIGN_FILENAME)
-        system_desgin = await self.project_repo.docs.system_design.get(DESIGN_FILENAME)
+        bugfix_doc, code_design, system_desgin, task_doc, prd_doc = await get_documents(
+            [
+                (self.project_repo.docs, BUGFIX_FILENAME),
+                (self.project_repo.docs.code_design, CODEDESIGN_FILENAME),
+                (self.project_repo.docs.system_design, DESIGN_FILENAME),
+                (self.project_repo.docs.task, TASK_FILENAME),
+                (self.project_repo.docs.prd, PRD_FILENAME),
+            ]
+        )
     
         design_doc = Document(content=merge_json_string(code_design.content, system_desgin.content), filename=DESIGN_FILENAME, root_path=code_design.root_path) 
         # project_setting = get_project_setting(self.config.project)
         # design_project_setting_doc = Document(content=merge_json_string(design_doc, project_setting), filename=filename, root_path=code_design.root_path) 
-        task_doc = await self.project_repo.docs.task.get(TASK_FILENAME)
         error_files = await self.get_json_value(bugfix_doc.content, ERROR_PRONE_FILES, [])
-        prd_doc = await self.project_repo.docs.prd.get(PRD_FILENAME)
         # error_files = await self.sort_error_prone_files(error_files)
         require_files = await self.get_json_value(bugfix_doc.content, REQUIRES_FILES, [])
         file_list = self.list_files_and_filter(self.context.repo.srcs.workdir)
@@ -395,15 +454,19 @@ class Engineer(Role):
 
     async def _bugfix_integration_code_actions(self):
         
-        bugfix_doc = await self.project_repo.docs.get(BUGFIX_FILENAME)
-        code_design = await self.project_repo.docs.code_design.get(CODEDESIGN_FILENAME)
-        system_desgin = await self.project_repo.docs.system_design.get(DESIGN_FILENAME)
+        bugfix_doc, code_design, system_desgin, task_doc, prd_doc = await get_documents(
+            [
+                (self.project_repo.docs, BUGFIX_FILENAME),
+                (self.project_repo.docs.code_design, CODEDESIGN_FILENAME),
+                (self.project_repo.docs.system_design, DESIGN_FILENAME),
+                (self.project_repo.docs.task, TASK_FILENAME),
+                (self.project_repo.docs.prd, PRD_FILENAME),
+            ]
+        )
         design_doc = Document(content=merge_json_string(code_design.content, system_desgin.content), filename=CODE_PLAN_FILENAME, root_path=code_design.root_path) 
         # project_setting = get_project_setting(self.config.project)
         # design_project_setting_doc = Document(content=merge_json_string(design_doc, project_setting), filename=filename, root_path=code_design.root_path) 
-        task_doc = await self.project_repo.docs.task.get(TASK_FILENAME)
         error_files = await self.get_json_value(bugfix_doc.content, ERROR_PRONE_FILES, [])
-        prd_doc = await self.project_repo.docs.prd.get(PRD_FILENAME)
         # error_files = await self.sort_error_prone_files(error_files)
         require_files = await self.get_json_value(bugfix_doc.content, REQUIRES_FILES, [])
         file_list = self.list_files_and_filter(self.context.repo.srcs.workdir)
@@ -447,15 +510,20 @@ class Engineer(Role):
         # Prepare file repos
         changed_files = Documents()
         # Recode caused by upstream changes.
-        code_design = await self.project_repo.docs.code_design.get(CODEDESIGN_FILENAME)
-        system_desgin = await self.project_repo.docs.system_design.get(DESIGN_FILENAME)
+        # Independent reads, a single batch request to OpenHands in non-local mode
+        code_design, system_desgin, task_doc, prd_doc, code_plan_and_change_doc, testcase_doc = await get_documents(
+            [
+                (self.project_repo.docs.code_design, CODEDESIGN_FILENAME),
+                (self.project_repo.docs.system_design, DESIGN_FILENAME),
+                (self.project_repo.docs.task, TASK_FILENAME),
+                (self.project_repo.docs.prd, PRD_FILENAME),
+                (self.project_repo.docs.code_plan_and_change, CODE_PLAN_FILENAME),
+                (self.project_repo.docs.testcase, TESTCASE_FILENAME),
+            ]
+        )
         design_doc = Document(content=merge_json_string(code_design.content, system_desgin.content), filename=DESIGN_FILENAME, root_path=code_design.root_path) 
         # project_setting = get_project_setting(self.config.project)
         # design_project_setting_doc = Document(content=merge_json_string(design_doc, project_setting), filename=filename, root_path=code_design.root_path) 
-        task_doc = await self.project_repo.docs.task.get(TASK_FILENAME)
-        prd_doc = await self.project_repo.docs.prd.get(PRD_FILENAME)
-        code_plan_and_change_doc = await self.project_repo.docs.code_plan_and_change.get(CODE_PLAN_FILENAME)
-        testcase_doc = await self.project_repo.docs.testcase.get(TESTCASE_FILENAME)
         file_relation = self._parse_relation(task_doc)
         file_list = self._parse_files(code_design)
         # task_list = self._parse_tasks(task_doc)
@@ -8,8 +8,11 @@
 """
 
 
+from typing import ClassVar
+
 from metagpt.actions import UserRequirement, WritePRD
 from metagpt.actions.prepare_documents import PrepareDocuments
+from metagpt.provider.llm_scheduler import LLMPriority
 from metagpt.roles.role import Role, RoleReactMode
 from metagpt.utils.common import any_to_name
 
@@ -27,6 +30,7 @@ class ProductManager(Role):
 
     name: str = "Alice"
     profile: str = "Product Manager"
+    llm_priority: ClassVar[LLMPriority] = LLMPriority.INTERACTIVE
     goal: str = "efficiently create a successful product that meets market demands and user expectations"
     constraints: str = "utilize the same language as the user requirements for seamless communication"
     todo_action: str = ""
@@ -24,7 +24,7 @@ from __future__ import annotations
 
 import json
 from enum import Enum
-from typing import TYPE_CHECKING, Iterable, Optional, Set, Type, Union
+from typing import TYPE_CHECKING, ClassVar, Iterable, Optional, Set, Type, Union
 
 from pydantic import BaseModel, ConfigDict, Field, SerializeAsAny, model_validator
 
@@ -35,6 +35,7 @@ from metagpt.context_mixin import ContextMixin
 from metagpt.logs import logger
 from metagpt.memory import Memory
 from metagpt.provider import HumanProvider
+from metagpt.provider.llm_scheduler import LLMPriority, llm_priority
 from metagpt.schema import Message, MessageQueue, SerializationMixin
 from metagpt.strategy.planner import Planner
 from metagpt.utils.common import any_to_name, any_to_str, role_raise_decorator
@@ -157,6 +158,8 @@ class Role(SerializationMixin, ContextMixin, BaseModel):
     # builtin variables
     recovered: bool = False  # to tag if a recovered role
     latest_observed_msg: Optional[Message] = None  # record the latest observed message when interrupted
+    # priority of the LLM requests of this role, see metagpt/provider/llm_scheduler.py
+    llm_priority: ClassVar[LLMPriority] = LLMPriority.DEFAULT
 
     __hash__ = object.__hash__  # support Role as hashable type in `Environment.members`
 
@@ -556,7 +559,8 @@ class Role(SerializationMixin, ContextMixin, BaseModel):
             logger.debug(f"{self._setting}: no news. waiting.")
             return
         self.use_flag = False
-        rsp = await self.react()
+        with llm_priority(self.llm_priority):
+            rsp = await self.react()
         self.use_flag = True
         self.cause_action = rsp.cause_by
         # Reset the next    action to be taken.
@@ -1,3 +1,6 @@
+from typing import ClassVar
+
+from metagpt.provider.llm_scheduler import LLMPriority
 from metagpt.roles import Role
 from metagpt.schema import Document, Message, SystemTestingContext, SystemTestingPlayWrightCodeContext, LaunchProjectTestingContext,ProjectIntegrationTestingContext
 from metagpt.actions.write_testcase import WriteTestCase
@@ -6,6 +9,7 @@ from metagpt.actions.write_prd import WritePRD
 class TestEngineer(Role):
     name: str = "TestEdward"
     profile: str = "TestEngineer"
+    llm_priority: ClassVar[LLMPriority] = LLMPriority.INTERACTIVE
     goal: str = "Create the test case based on PRD and frontend html files to test the functions of all software, and execute the test case after code change"
     constraints: str = (
         ""
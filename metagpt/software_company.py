@@ -10,17 +10,14 @@ import typer
 from metagpt.const import CONFIG_ROOT
 from metagpt.utils.project_repo import ProjectRepo
 from metagpt.logs import logger
-import json
+from metagpt.utils.oh_action_bus import oh_action_bus, publish_oh_action
 from metagpt.const import SERDESER_PATH
-from metagpt.utils.common import read_json_file
+from metagpt.utils.team_checkpoint import load_checkpoint
 from metagpt.utils.restore import find_role_with_true_use_flag
 from metagpt.schema import Message
 
 app = typer.Typer(add_completion=False, pretty_exceptions_show_locals=False)
 
-def OH_ACTION_log_filter(record):
-    return "<OH_ACTION>" in record["message"]
-
 def generate_repo(
     idea,
     investment=3.0,
@@ -54,8 +51,6 @@ def generate_repo(
         CodeArchitect
     )
 
-    if logger_stream_obj:
-        logger.add(logger_stream_obj,filter=OH_ACTION_log_filter,level="ERROR")
     from metagpt.team import Team
 
     if config.agentops_api_key != "":
@@ -63,82 +58,85 @@ def generate_repo(
 
     # if sid and sio:
     config = config.default(sid,sio, local, idea, simulate=simulate)
-
-    config.update_via_cli(project_path, project_name, inc, reqa_file, max_auto_summarize_code)
-    ctx = Context(config=config)
-    stg_path = SERDESER_PATH.joinpath(f"team/{sid}")
-    team_info_path = stg_path.joinpath("team.json")
-    restore = False
-    if stg_path.exists():
-        company = Team.deserialize(team_info_path, context=ctx)
-        serialized_data = read_json_file(team_info_path)
-        role_name, cause_by = find_role_with_true_use_flag(serialized_data)
-        message = Message(cause_by=cause_by, send_from=role_name)
-        restore = True   
-    else:
-        company = Team(context=ctx)
+    with oh_action_bus.subscription(
+        logger_stream_obj, conversation_id=sid, compress_threshold=config.oh_action_compress_threshold
+    ):
+
+        config.update_via_cli(project_path, project_name, inc, reqa_file, max_auto_summarize_code)
+        ctx = Context(config=config)
+        stg_path = SERDESER_PATH.joinpath(f"team/{sid}")
+        team_info_path = stg_path.joinpath("team.json")
+        restore = False
+        if stg_path.exists():
+            company = Team.deserialize(team_info_path, context=ctx)
+            serialized_data = load_checkpoint(team_info_path)
+            role_name, cause_by = find_role_with_true_use_flag(serialized_data)
+            message = Message(cause_by=cause_by, send_from=role_name)
+            restore = True   
+        else:
+            company = Team(context=ctx)
    
         
-    company.hire(
-        [
-            ProductManager(),
-            TestEngineer(),
-            Architect(),
-            CodeArchitect(),
-            ProjectManager(),
-            SystemQaTester(),
-            Engineer()
-        ]
-    )
-
-    '''
-    oh_action_data = {}
-    oh_action_data['action_type'] = "MESSAGE"
-    oh_action_data['content'] = f"There are a total of 7 roles, namely Product Manager, Test Engineer, Architect, CodeArchitect, Project Manager, System QA Tester, Engineer"
-    oh_action_data['conversation_id'] = sid
-    oh_action_data['agent_role'] = ""
-    oh_action_data['role_task'] = f"Start executing the task."
-    oh_action_data['mission'] = config.user_intend
-    logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
-    print(f"!!!!!workspace: {oh_action_data}")
-    '''
-
-    if not restore:
-
-        company.invest(investment,sid)
-        company.run_project(idea)
-
-        asyncio.run(company.run(n_round=n_round))
-
-    else:
-        message = Message(cause_by=cause_by, send_from=role_name)   
-        asyncio.run(company.run(with_message=message))
-
-    if config.agentops_api_key != "":
-        agentops.end_session("Success")
-
-    print(f"############company run finished")
-    logger.info(f"finish action.")
-    oh_action_data = {}
-    oh_action_data['action_type'] = "ACTION_FINISH"
-    oh_action_data['message'] = f"send finish action event."
-    oh_action_data['conversation_id'] = sid
-    logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
-
-    oh_action_data = {}
-    content_info = {
-        "sub_content": f"Finish mission",
-        "role_task": f"4/4 Launch Integrate test",
-        "agent_role": f"TEST_ENGINEER",
-        "mission": config.user_intend
-    }
-    oh_action_data['action_type'] = "MESSAGE"
-    oh_action_data['content'] = content_info
-    oh_action_data['conversation_id'] = sid
-    logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data, ensure_ascii=False)}")
-    #print(f"!!!!!workspace: {oh_action_data}")
-
-    return ctx.repo
+        company.hire(
+            [
+                ProductManager(),
+                TestEngineer(),
+                Architect(),
+                CodeArchitect(),
+                ProjectManager(),
+                SystemQaTester(),
+                Engineer()
+            ]
+        )
+
+        '''
+        oh_action_data = {}
+        oh_action_data['action_type'] = "MESSAGE"
+        oh_action_data['content'] = f"There are a total of 7 roles, namely Product Manager, Test Engineer, Architect, CodeArchitect, Project Manager, System QA Tester, Engineer"
+        oh_action_data['conversation_id'] = sid
+        oh_action_data['agent_role'] = ""
+        oh_action_data['role_task'] = f"Start executing the task."
+        oh_action_data['mission'] = config.user_intend
+        publish_oh_action(oh_action_data)
+        print(f"!!!!!workspace: {oh_action_data}")
+        '''
+
+        if not restore:
+
+            company.invest(investment,sid)
+            company.run_project(idea)
+
+            asyncio.run(company.run(n_round=n_round))
+
+        else:
+            message = Message(cause_by=cause_by, send_from=role_name)   
+            asyncio.run(company.run(with_message=message))
+
+        if config.agentops_api_key != "":
+            agentops.end_session("Success")
+
+        print(f"############company run finished")
+        logger.info(f"finish action.")
+        oh_action_data = {}
+        oh_action_data['action_type'] = "ACTION_FINISH"
+        oh_action_data['message'] = f"send finish action event."
+        oh_action_data['conversation_id'] = sid
+        publish_oh_action(oh_action_data)
+
+        oh_action_data = {}
+        content_info = {
+            "sub_content": f"Finish mission",
+            "role_task": f"4/4 Launch Integrate test",
+            "agent_role": f"TEST_ENGINEER",
+            "mission": config.user_intend
+        }
+        oh_action_data['action_type'] = "MESSAGE"
+        oh_action_data['content'] = content_info
+        oh_action_data['conversation_id'] = sid
+        publish_oh_action(oh_action_data)
+        #print(f"!!!!!workspace: {oh_action_data}")
+
+        return ctx.repo
 
 
 @app.command("", help="Start a new project.")
@@ -12,21 +12,21 @@ import warnings
 from pathlib import Path
 from typing import Any, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 import json
 from metagpt.actions import UserRequirement
 from metagpt.const import MESSAGE_ROUTE_TO_ALL, SERDESER_PATH
 from metagpt.context import Context
 from metagpt.environment import Environment
 from metagpt.logs import logger
+from metagpt.provider.llm_client_pool import LLM_CLIENT_POOL
 from metagpt.roles import Role
 from metagpt.schema import Message
 from metagpt.utils.common import (
     NoMoneyException,
-    read_json_file,
     serialize_decorator,
-    write_json_file,
 )
+from metagpt.utils.team_checkpoint import CHECKPOINT_KEY, TeamCheckpoint, load_checkpoint
 
 
 class Team(BaseModel):
@@ -41,6 +41,8 @@ class Team(BaseModel):
     investment: float = Field(default=10.0)
     idea: str = Field(default="")
 
+    _checkpoint: Optional[TeamCheckpoint] = PrivateAttr(default=None)
+
     def __init__(self, context: Context = None, **data: Any):
         super(Team, self).__init__(**data)
         ctx = context or Context()
@@ -56,15 +58,9 @@ class Team(BaseModel):
     def serialize(self, stg_path: Path = None):
         stg_path = SERDESER_PATH.joinpath("team") if stg_path is None else stg_path
         save_path = stg_path.joinpath(self.env.context.config.sid)
-        team_info_path = save_path.joinpath("team.json")
-        serialized_data = self.model_dump()
-        serialized_data["context"] = self.env.context.serialize()
-        last_role = ""
-        for role_name, role_value in serialized_data["env"]["roles"].items():
-            if role_value.get("use_flag", False):
-                last_role = role_name
-        serialized_data["context"]["last_role"] = last_role
-        write_json_file(team_info_path, serialized_data)
+        if self._checkpoint is None or self._checkpoint.path != save_path:
+            self._checkpoint = TeamCheckpoint(save_path)
+        self._checkpoint.save(self)
 
     @classmethod
     def deserialize(cls, team_info_path, context: Context = None) -> "Team":
@@ -76,10 +72,14 @@ class Team(BaseModel):
                 "recover storage meta file `team.json` not exist, " "not to recover and please start a new project."
             )
 
-        team_info: dict = read_json_file(team_info_path)
+        team_info: dict = load_checkpoint(team_info_path)
+        checkpoint = team_info.pop(CHECKPOINT_KEY, None)
         ctx = context or Context()
         ctx.lite_deserialize(team_info.pop("context", None))
         team = Team(**team_info, context=ctx)
+        if checkpoint:
+            team._checkpoint = TeamCheckpoint(Path(team_info_path).parent)
+            team._checkpoint.prime(team, generation=checkpoint["generation"], restored=True)
         return team
 
     def hire(self, roles: list[Role]):
@@ -145,13 +145,19 @@ class Team(BaseModel):
         """Run company until target round or no money"""
         if idea:
             self.run_project(idea=idea, send_to=send_to)
-        while True:
-            if not with_message:
-                if self.env.is_idle:
-                    logger.info("All roles are idle.")
-                    break
-            await self.env.run(with_message=with_message)
-            with_message = None
-            self.serialize()
+        try:
+            # the pooled connections of this loop are released once no other Team of the loop is running
+            async with LLM_CLIENT_POOL.session():
+                while True:
+                    if not with_message:
+                        if self.env.is_idle:
+                            logger.info("All roles are idle.")
+                            break
+                    await self.env.run(with_message=with_message)
+                    with_message = None
+                    self.serialize()
+        finally:
+            if self.env.context.git_repo:
+                self.env.context.git_repo.flush_dependency()
         self.env.archive(auto_archive)
         return self.env.history
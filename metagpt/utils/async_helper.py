@@ -1,6 +1,6 @@
 import asyncio
 import threading
-from typing import Any
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Sequence
 
 
 def run_coroutine_in_new_loop(coroutine) -> Any:
@@ -35,3 +35,39 @@ class NestAsyncio:
 
             nest_asyncio.apply()
             cls.is_applied = True
+
+
+async def run_dag(
+    nodes: Sequence[Hashable],
+    dependencies: Dict[Hashable, Iterable[Hashable]],
+    func: Callable[[Hashable], Awaitable[Any]],
+    max_concurrency: int = 1,
+) -> List[Any]:
+    """Run `func` on every node once all of its dependencies are done, at most `max_concurrency` at a time.
+
+    Dependencies on nodes not in `nodes` are ignored. Ready nodes start in the order of `nodes` and the results
+    are returned in that order. If a node fails, the pending ones are cancelled and the error is raised.
+    The dependencies must be acyclic.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    done = {node: asyncio.Event() for node in nodes}
+    tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def _run(node):
+        for dep in dependencies.get(node, ()):
+            if dep in done and dep != node:
+                await done[dep].wait()
+        async with semaphore:
+            result = await func(node)
+        done[node].set()
+        return result
+
+    for node in nodes:
+        tasks[node] = asyncio.create_task(_run(node))
+    try:
+        return await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : async_subprocess.py
+@Desc    : Run commands from async role code without blocking the event loop.
+
+    `RunCode` and the launch actions used to run their commands with `Popen(...).communicate()`, which blocks the
+    event loop shared by the other roles and conversations for the whole run: a test pass froze everything else.
+    `run_command` awaits an asyncio subprocess instead:
+    - at most `max_concurrency` commands run at a time in the process, across all the event loops,
+    - stdout and stderr are read as they come, passed to `on_output`, and only their last `max_output` bytes kept,
+    - a command past its timeout, or whose caller is cancelled, is killed with its whole process group.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Sequence, Tuple, Union
+
+from metagpt.logs import logger
+
+DEFAULT_MAX_OUTPUT = 1024 * 1024  # bytes kept per stream
+DEFAULT_MAX_CONCURRENCY = max(2, os.cpu_count() or 1)
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class CommandResult:
+    """The outcome of `run_command`."""
+
+    returncode: Optional[int]
+    stdout: str = ""
+    stderr: str = ""  # empty if merged into stdout
+    timed_out: bool = False
+    truncated: bool = False  # the beginning of an output was dropped
+
+
+class ProcessLimiter:
+    """A semaphore shared by the event loops of all the threads."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True  # the slot was handed over already
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:  # hand the slot over
+                    loop.call_soon_threadsafe(_set_result, future)
+                    return
+                except RuntimeError:  # its loop is closed
+                    continue
+            self.active -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _set_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_limiter = ProcessLimiter(DEFAULT_MAX_CONCURRENCY)
+
+
+def set_max_concurrency(limit: int):
+    """Set how many commands `run_command` runs at a time."""
+    _limiter.limit = max(1, limit)
+
+
+class _OutputBuffer:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.data = bytearray()
+        self.truncated = False
+
+    def append(self, chunk: bytes):
+        self.data += chunk
+        if len(self.data) > self.max_size:
+            del self.data[: len(self.data) - self.max_size]
+            self.truncated = True
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+async def _read_stream(stream, name: str, buffer: _OutputBuffer, on_output: Optional[Callable[[str, str], None]]):
+    while True:
+        chunk = await stream.read(_CHUNK_SIZE)
+        if not chunk:
+            return
+        buffer.append(chunk)
+        if on_output:
+            try:
+                on_output(name, chunk.decode("utf-8", errors="replace"))
+            except Exception as e:
+                logger.warning(f"Output callback failed: {e}")
+
+
+def _kill_group(process: asyncio.subprocess.Process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_command(
+    cmd: Union[str, Sequence[str]],
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    input: Union[str, bytes, None] = None,
+    timeout: Optional[float] = None,
+    merge_stderr: bool = False,
+    max_output: int = DEFAULT_MAX_OUTPUT,
+    on_output: Optional[Callable[[str, str], None]] = None,
+) -> CommandResult:
+    """Run a command in its own process group and return its outputs.
+
+    :param cmd: The program and its arguments, or a shell command line.
+    :param cwd: The working directory.
+    :param env: The environment variables, defaults to the ones of this process.
+    :param input: Written to the stdin of the command, e.g. a script for `["/bin/bash"]`.
+    :param timeout: Seconds before the process group is killed, None to wait as long as it takes.
+    :param merge_stderr: Read stderr with stdout, as `stderr=STDOUT`.
+    :param max_output: Bytes kept of each output, the beginning is dropped beyond it.
+    :param on_output: Called with `("stdout" | "stderr", text)` for every chunk read.
+    """
+    async with _limiter:
+        kwargs = dict(
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        if isinstance(cmd, str):
+            process = await asyncio.create_subprocess_shell(cmd, **kwargs)
+        else:
+            process = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+
+        stdout, stderr = _OutputBuffer(max_output), _OutputBuffer(max_output)
+        readers = [asyncio.create_task(_read_stream(process.stdout, "stdout", stdout, on_output))]
+        if not merge_stderr:
+            readers.append(asyncio.create_task(_read_stream(process.stderr, "stderr", stderr, on_output)))
+
+        async def _communicate():
+            if input is not None:
+                try:
+                    process.stdin.write(input.encode() if isinstance(input, str) else input)
+                    await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                process.stdin.close()
+            await asyncio.gather(*readers)
+            return await process.wait()
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(_communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.info(f"The command did not complete within {timeout}s, killed it: {cmd}")
+        finally:
+            if process.returncode is None or timed_out:
+                _kill_group(process)  # also the children holding the pipes
+                await process.wait()
+                for reader in readers:
+                    reader.cancel()
+                await asyncio.gather(*readers, return_exceptions=True)
+
+    return CommandResult(
+        returncode=process.returncode,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        timed_out=timed_out,
+        truncated=stdout.truncated or stderr.truncated,
+    )
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : code_sandbox.py
+@Desc    : Pool of pre-forked worker processes running untrusted Python functions with hard limits.
+
+    Generated code used to be run with `exec` in a thread of the caller: a runaway solution could not be killed, and
+    CPU-bound solutions serialized on the GIL. A `SandboxPool` runs a module-level function in one of `workers`
+    processes forked from a clean fork server, so evaluation scales with the cores.
+
+    - `timeout` is a wall-clock limit, from the moment the worker has loaded the function: a worker not answering in
+      time is killed and replaced.
+    - `memory_limit` caps the address space of every worker, a worker that dies is replaced as well.
+    - A worker is recycled after `max_tasks` functions, so what a function leaves behind does not outlive it.
+    - Results are cached by the hash of the function and its arguments, e.g. (solution, test); only completed runs
+      are cached, not timeouts or crashes.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import hashlib
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from metagpt.utils.async_subprocess import ProcessLimiter
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_MEMORY_LIMIT = 2 * 1024**3
+DEFAULT_MAX_TASKS = 100
+DEFAULT_CACHE_SIZE = 4096
+STARTUP_TIMEOUT = 60  # to receive a job, importing the module of its function
+
+OK = "ok"
+ERROR = "error"
+TIMEOUT = "timeout"
+CRASH = "crash"
+STARTED = "started"
+
+
+@dataclass
+class SandboxResult:
+    status: str  # OK, ERROR (the function raised), TIMEOUT or CRASH (the worker died, e.g. out of memory)
+    value: Any = None
+    error_type: str = ""
+    error: str = ""
+    traceback: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+def _worker_main(conn, memory_limit: Optional[int]):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent shuts the pool down
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        func, args = job
+        conn.send(STARTED)  # the wall clock of the job starts now
+        try:
+            reply = (OK, func(*args), "", "", "")
+        except BaseException as e:  # SystemExit of the function included
+            reply = (ERROR, None, type(e).__name__, str(e), traceback.format_exc())
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send((ERROR, None, type(e).__name__, f"Unpicklable result: {e}", ""))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit: Optional[int]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class SandboxPool:
+    """Run picklable module-level functions in pre-forked worker processes, see the module docstring."""
+
+    _default: Optional["SandboxPool"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+        max_tasks: int = DEFAULT_MAX_TASKS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_tasks = max_tasks
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if self._ctx.get_start_method() == "forkserver":
+            self._ctx.set_forkserver_preload([__name__])
+        self._limiter = ProcessLimiter(self.workers)
+        self._lock = threading.Lock()
+        self._idle: list[_Worker] = []
+        self._cache: OrderedDict[str, SandboxResult] = OrderedDict()
+        self._started = False
+        atexit.register(self.close)
+
+    @classmethod
+    def default(cls) -> "SandboxPool":
+        """Return the pool shared by the benchmarks and operators of the process."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def start(self):
+        """Fork the workers up front, the first call also starts the fork server."""
+        with self._lock:
+            self._started = True
+            missing = self.workers - len(self._idle)
+        workers = [_Worker(self._ctx, self.memory_limit) for _ in range(missing)]
+        with self._lock:
+            self._idle.extend(workers)
+
+    def close(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+            self._started = False
+        for worker in workers:
+            worker.stop()
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, cache: bool = True) -> SandboxResult:
+        """Run `func(*args)` in a worker, wait if all the workers are busy."""
+        key = self._key(func, args) if cache else ""
+        if key:
+            with self._lock:
+                result = self._cache.get(key)
+                if result is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return result
+
+        if not self._started:
+            await asyncio.to_thread(self.start)
+        async with self._limiter:
+            # forking, killing and joining workers block, they run off the event loop
+            worker = self._checkout() or await asyncio.to_thread(_Worker, self._ctx, self.memory_limit)
+            alive = False
+            try:
+                worker.conn.send((func, args))
+                if not await asyncio.to_thread(worker.conn.poll, STARTUP_TIMEOUT):
+                    raise EOFError
+                worker.conn.recv()
+                if await asyncio.to_thread(worker.conn.poll, timeout or self.timeout):
+                    result = SandboxResult(*worker.conn.recv())
+                    alive = True
+                else:
+                    result = SandboxResult(TIMEOUT, error_type="TimeoutError", error="Execution timed out")
+            except (EOFError, OSError):
+                await asyncio.to_thread(worker.process.join, 1)
+                result = SandboxResult(CRASH, error_type="WorkerDied", error=f"exit code {worker.process.exitcode}")
+            except (pickle.PicklingError, AttributeError, TypeError) as e:  # the job was not sent
+                alive = True
+                result = SandboxResult(ERROR, error_type=type(e).__name__, error=str(e))
+            finally:
+                await asyncio.to_thread(self._checkin, worker, alive)
+
+        if key and result.status in (OK, ERROR):
+            with self._lock:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _key(func: Callable, args: tuple) -> str:
+        try:
+            payload = pickle.dumps((func.__module__, func.__qualname__, args))
+        except Exception:
+            return ""
+        return hashlib.sha256(payload).hexdigest()
+
+    def _checkout(self) -> Optional[_Worker]:
+        """Return an idle worker, None if there is none left to fork a new one."""
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.conn.close()
+        return None
+
+    def _checkin(self, worker: _Worker, alive: bool):
+        worker.tasks += 1
+        if not alive:
+            worker.kill()
+            worker = _Worker(self._ctx, self.memory_limit)  # keep the pool pre-forked
+        elif worker.tasks >= self.max_tasks:
+            worker.stop()
+            worker = _Worker(self._ctx, self.memory_limit)
+        with self._lock:
+            if self._started and len(self._idle) < self.workers:
+                self._idle.append(worker)
+                return
+        worker.stop()
@@ -8,42 +8,172 @@
 """
 from __future__ import annotations
 
+import atexit
 import json
+import os
 import re
+import threading
+from collections import defaultdict
 from pathlib import Path
-from typing import Set
+from typing import Dict, Iterable, Optional, Set, Tuple
 
-from metagpt.utils.common import aread, awrite
+from metagpt.logs import logger
 from metagpt.utils.exceptions import handle_exception
 
+# Seconds a resident dependency file waits for more updates before writing them
+DEFAULT_FLUSH_DELAY = 1.0
+
 
 class DependencyFile:
     """A class representing a DependencyFile for managing dependencies.
 
+    The dependencies are kept in memory, with a reverse index for `get_dependents`. The file is only re-read when it
+    changed on disk since the last load or save, and is written atomically.
+
     :param workdir: The working directory path for the DependencyFile.
+    :param flush_delay: None to write on every persisted update, otherwise the seconds to wait for more updates before
+        writing them all at once (write-behind), see `resident`.
     """
 
-    def __init__(self, workdir: Path | str):
+    _resident: Dict[Path, "DependencyFile"] = {}
+    _resident_lock = threading.Lock()
+
+    def __init__(self, workdir: Path | str, flush_delay: Optional[float] = None):
         """Initialize a DependencyFile instance.
 
         :param workdir: The working directory path for the DependencyFile.
+        :param flush_delay: Write-behind delay in seconds, None to write immediately.
         """
         self._dependencies = {}
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
         self._filename = Path(workdir) / ".dependencies.json"
+        self._flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._stat: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the file last loaded or saved
+
+    @classmethod
+    def resident(cls, workdir: Path | str, flush_delay: float = DEFAULT_FLUSH_DELAY) -> "DependencyFile":
+        """Return the process-wide instance of `workdir`, shared by all the repositories opened on it.
+
+        Updates are written `flush_delay` seconds after the last one, by `flush`, or at exit.
+        """
+        key = Path(workdir).resolve()
+        with cls._resident_lock:
+            instance = cls._resident.get(key)
+            if instance is None:
+                instance = cls(workdir=workdir, flush_delay=flush_delay)
+                cls._resident[key] = instance
+            return instance
+
+    @classmethod
+    def release(cls, workdir: Path | str):
+        """Flush and forget the resident instance of `workdir`, e.g. before the directory is moved."""
+        with cls._resident_lock:
+            instance = cls._resident.pop(Path(workdir).resolve(), None)
+        if instance:
+            instance.flush_sync()
+
+    @classmethod
+    def flush_all(cls):
+        """Write the pending updates of all the resident instances."""
+        with cls._resident_lock:
+            instances = list(cls._resident.values())
+        for i in instances:
+            i.flush_sync()
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self._filename)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
     async def load(self):
-        """Load dependencies from the file asynchronously."""
-        if not self._filename.exists():
+        """Load dependencies from the file asynchronously.
+
+        Skipped if the file is unchanged since it was last loaded or saved, or if there are unsaved updates.
+        """
+        stat = self._file_stat()
+        if stat is None or stat == self._stat or self._dirty:
             return
-        json_data = await aread(self._filename)
+        json_data = self._filename.read_text(encoding="utf-8")
         json_data = re.sub(r"\\+", "/", json_data)  # Compatible with windows path
-        self._dependencies = json.loads(json_data)
+        dependencies = json.loads(json_data)
+        with self._lock:
+            self._dependencies = dependencies
+            self._dependents = defaultdict(set)
+            for key, values in dependencies.items():
+                for v in values:
+                    self._dependents[v].add(key)
+            self._stat = stat
 
     @handle_exception
     async def save(self):
         """Save dependencies to the file asynchronously."""
-        data = json.dumps(self._dependencies)
-        await awrite(filename=self._filename, data=data)
+        self._write()
+
+    def _write(self):
+        with self._lock:
+            self._cancel_timer()
+            data = json.dumps(self._dependencies)
+            self._filename.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._filename.with_name(f"{self._filename.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                tmp.write_text(data, encoding="utf-8")
+                os.replace(tmp, self._filename)
+            finally:
+                tmp.unlink(missing_ok=True)
+            self._dirty = False
+            self._stat = self._file_stat()
+
+    async def flush(self):
+        """Write the pending updates now."""
+        if self._dirty:
+            await self.save()
+
+    def flush_sync(self):
+        """Write the pending updates now, for callers outside the event loop."""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self._write()
+            except Exception as e:
+                logger.error(f"Failed to save {self._filename}: {e}")
+
+    def _schedule_flush(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self._flush_delay, self.flush_sync)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _key(self, filename: Path | str) -> str:
+        try:
+            return Path(filename).relative_to(self._filename.parent).as_posix()
+        except ValueError:
+            return Path(filename).as_posix()
+
+    def _set(self, key: str, relative_paths: Iterable[str]):
+        for i in self._dependencies.pop(key, []):
+            dependents = self._dependents.get(i)
+            if dependents:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[i]
+        relative_paths = list(relative_paths)
+        if relative_paths:
+            self._dependencies[key] = relative_paths
+            for i in relative_paths:
+                self._dependents[i].add(key)
 
     async def update(self, filename: Path | str, dependencies: Set[Path | str], persist=True):
         """Update dependencies for a file asynchronously.
@@ -52,30 +182,28 @@ class DependencyFile:
         :param dependencies: The set of dependencies.
         :param persist: Whether to persist the changes immediately.
         """
+        await self.update_many({filename: dependencies}, persist=persist)
+
+    async def update_many(self, dependencies: Dict[Path | str, Optional[Set[Path | str]]], persist=True):
+        """Update the dependencies of several files with a single write.
+
+        :param dependencies: The dependencies by filename, None or empty to remove the file's entry.
+        :param persist: Whether to persist the changes.
+        """
         if persist:
             await self.load()
 
-        root = self._filename.parent
-        try:
-            key = Path(filename).relative_to(root).as_posix()
-        except ValueError:
-            key = filename
-        key = str(key)
-        if dependencies:
-            relative_paths = []
-            for i in dependencies:
-                try:
-                    s = str(Path(i).relative_to(root).as_posix())
-                except ValueError:
-                    s = str(i)
-                relative_paths.append(s)
+        with self._lock:
+            for filename, deps in dependencies.items():
+                self._set(self._key(filename), [self._key(i) for i in deps or []])
+            self._dirty = True
 
-            self._dependencies[key] = relative_paths
-        elif key in self._dependencies:
-            del self._dependencies[key]
-
-        if persist:
+        if not persist:
+            return
+        if self._flush_delay is None:
             await self.save()
+        else:
+            self._schedule_flush()
 
     async def get(self, filename: Path | str, persist=True):
         """Get dependencies for a file asynchronously.
@@ -87,18 +215,39 @@ class DependencyFile:
         if persist:
             await self.load()
 
-        root = self._filename.parent
-        try:
-            key = Path(filename).relative_to(root).as_posix()
-        except ValueError:
-            key = Path(filename).as_posix()
-        return set(self._dependencies.get(str(key), {}))
+        with self._lock:
+            return set(self._dependencies.get(self._key(filename), {}))
+
+    async def get_dependents(self, filename: Path | str, persist=True) -> Set[str]:
+        """Get the files depending on a file.
+
+        :param filename: The filename or path.
+        :param persist: Whether to load dependencies from the file immediately.
+        :return: A set of the files listing `filename` as a dependency.
+        """
+        if persist:
+            await self.load()
+
+        with self._lock:
+            return set(self._dependents.get(self._key(filename), set()))
 
     def delete_file(self):
-        """Delete the dependency file."""
-        self._filename.unlink(missing_ok=True)
+        """Delete the dependency file, dropping the pending updates."""
+        with self._lock:
+            self._cancel_timer()
+            self._dirty = False
+            self._stat = None
+            self._filename.unlink(missing_ok=True)
+
+    @property
+    def filename(self) -> Path:
+        """The path of the dependency file."""
+        return self._filename
 
     @property
     def exists(self):
         """Check if the dependency file exists."""
         return self._filename.exists()
+
+
+atexit.register(DependencyFile.flush_all)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : env_cache.py
+@Desc    : Content-addressed cache of the dependency environments of the generated projects.
+
+    `LaunchProjectTest` used to create `venv_test` and to run `pip install` / `npm install` on every test pass. The
+    environments are now built once per content, keyed by the hash of
+    - `requirements.txt`, the extra packages and the interpreter version for a virtualenv,
+    - `package.json`, its lockfile and the node version for `node_modules`,
+    under `<cache_root>/venv/<key>` and `<cache_root>/node_modules/<key>`, and hardlinked into the project (copied if
+    the cache is on another filesystem). A fix -> retest loop that does not touch the dependencies reuses the project's
+    environment as is, a changed dependency file reuses any environment built before for the same content.
+
+    The scripts run in bash, locally or in the OpenHands runtime, so they are generated here and not run from Python.
+    Packages are also kept for the no-network setup: wheels in `<cache_root>/wheels`, tried first with `--no-index`,
+    and the npm cache in `<cache_root>/npm` with `--prefer-offline`.
+"""
+from __future__ import annotations
+
+import shlex
+from pathlib import Path
+from typing import Iterable
+
+from metagpt.const import DEFAULT_WORKSPACE_ROOT
+
+ENV_CACHE_ROOT = DEFAULT_WORKSPACE_ROOT / ".env_cache"
+PIP_INDEX_URL = "https://mirrors.tuna.tsinghua.edu.cn/pypi/web/simple"
+NPM_REGISTRY = "https://registry.npmmirror.com"
+
+# Hardlink `$ENV` to `$TARGET`, or copy it across filesystems
+_LINK = """
+rm -rf "$TARGET"
+cp -al "$ENV_DIR" "$TARGET" 2>/dev/null || { rm -rf "$TARGET"; cp -a "$ENV_DIR" "$TARGET"; }
+"""
+
+_VENV_SCRIPT = (
+    """
+export PIP_CACHE_DIR="$CACHE/pip"
+WHEELS="$CACHE/wheels"
+KEY=$( { cat "$REQ" 2>/dev/null; echo "$PACKAGES"; "$PY" --version 2>&1; } | sha256sum | cut -c1-16 )
+ENV="$CACHE/venv/$KEY"
+if [ -f "$VENV/.env_cache_key" ] && [ "$(cat "$VENV/.env_cache_key")" = "$KEY" ]; then
+  echo "Successfully installed: the dependencies of $REQ are up to date (environment $KEY)"
+else
+  mkdir -p "$CACHE/venv" "$WHEELS"
+  exec 9>"$ENV.lock"; flock 9 2>/dev/null
+  if [ -f "$ENV/.complete" ]; then
+    echo "Successfully installed: reused the cached environment $KEY for $REQ"
+  else
+    rm -rf "$ENV"
+    { virtualenv "$ENV" --python="$PY" || { rm -rf "$ENV"; "$PY" -m venv "$ENV"; }; } >/dev/null 2>&1
+    if "$ENV/bin/pip" install --no-index --find-links "$WHEELS" -r "$REQ" $PACKAGES >/dev/null 2>&1 \\
+        || "$ENV/bin/pip" install --find-links "$WHEELS" -r "$REQ" $PACKAGES -i "$INDEX_URL"; then
+      "$ENV/bin/pip" wheel -q --find-links "$WHEELS" -w "$WHEELS" -r "$REQ" $PACKAGES -i "$INDEX_URL" >/dev/null 2>&1
+      touch "$ENV/.complete"
+      echo "Successfully installed: built the environment $KEY for $REQ"
+    fi
+  fi
+  flock -u 9 2>/dev/null
+  if [ -f "$ENV/.complete" ]; then
+    ENV_DIR="$ENV"; TARGET="$VENV"
+"""
+    + _LINK
+    + """
+    grep -rlI "$ENV" "$VENV/bin" | xargs -r sed -i "s#$ENV#$VENV#g"
+    echo "$KEY" > "$VENV/.env_cache_key"
+  else
+    rm -rf "$ENV"
+  fi
+fi
+"""
+)
+
+_NODE_SCRIPT = (
+    """
+LOCKS="package-lock.json npm-shrinkwrap.json yarn.lock pnpm-lock.yaml .npmrc"
+KEY=$( { cat "$FRONT/package.json"; for f in $LOCKS; do cat "$FRONT/$f" 2>/dev/null; done; node --version; } \\
+  | sha256sum | cut -c1-16 )
+ENV="$CACHE/node_modules/$KEY"
+if [ -f "$FRONT/node_modules/.env_cache_key" ] && [ "$(cat "$FRONT/node_modules/.env_cache_key")" = "$KEY" ]; then
+  echo "up to date: node_modules of $FRONT (environment $KEY)"
+else
+  mkdir -p "$CACHE/node_modules"
+  exec 9>"$ENV.lock"; flock 9 2>/dev/null
+  if [ -f "$ENV/.complete" ]; then
+    echo "up to date: reused the cached node_modules $KEY"
+  else
+    rm -rf "$ENV"; mkdir -p "$ENV"
+    cp "$FRONT/package.json" "$ENV/"
+    for f in $LOCKS; do [ -f "$FRONT/$f" ] && cp "$FRONT/$f" "$ENV/"; done
+    ( cd "$ENV" && npm install --prefer-offline --cache "$CACHE/npm" --registry="$REGISTRY" ) \
+      && mkdir -p "$ENV/node_modules" && touch "$ENV/.complete"
+  fi
+  flock -u 9 2>/dev/null
+  if [ -f "$ENV/.complete" ]; then
+    ENV_DIR="$ENV/node_modules"; TARGET="$FRONT/node_modules"
+"""
+    + _LINK
+    + """
+    echo "$KEY" > "$FRONT/node_modules/.env_cache_key"
+  else
+    rm -rf "$ENV"
+  fi
+fi
+"""
+)
+
+
+def _script(variables: dict, body: str) -> str:
+    header = "\n".join(f"{k}={shlex.quote(str(v))}" for k, v in variables.items())
+    return f"bash -c {shlex.quote(header + body)}"
+
+
+def venv_install_command(
+    venv_path: Path | str,
+    requirements_file: Path | str,
+    cache_root: Path | str = ENV_CACHE_ROOT,
+    python: str = "python3.11",
+    packages: Iterable[str] = ("playwright",),
+    index_url: str = PIP_INDEX_URL,
+) -> str:
+    """Return the shell command materializing the virtualenv of `requirements_file` at `venv_path`.
+
+    :param venv_path: The virtualenv of the project, e.g. `<project>/venv_test`.
+    :param requirements_file: The requirements of the project.
+    :param cache_root: The cache directory, as seen by the shell running the command.
+    :param python: The interpreter of the virtualenv.
+    :param packages: Packages installed besides the requirements.
+    :param index_url: The pip index, used when the cached wheels are not enough.
+    """
+    variables = {
+        "CACHE": cache_root,
+        "VENV": venv_path,
+        "REQ": requirements_file,
+        "PY": python,
+        "PACKAGES": " ".join(packages),
+        "INDEX_URL": index_url,
+    }
+    return _script(variables, _VENV_SCRIPT)
+
+
+def node_modules_install_command(
+    frontend_path: Path | str, cache_root: Path | str = ENV_CACHE_ROOT, registry: str = NPM_REGISTRY
+) -> str:
+    """Return the shell command materializing the `node_modules` of the `package.json` in `frontend_path`.
+
+    :param frontend_path: The directory of `package.json`.
+    :param cache_root: The cache directory, as seen by the shell running the command.
+    :param registry: The npm registry, used when the npm cache is not enough.
+    """
+    return _script({"CACHE": cache_root, "FRONT": frontend_path, "REGISTRY": registry}, _NODE_SCRIPT)
@@ -8,18 +8,29 @@
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.schema import Document
 from metagpt.utils.common import aread, awrite
 from metagpt.utils.json_to_markdown import json_to_markdown
 from metagpt.pipe_files import get_pipein,read_pipe_message_with_len
-from eazytec_send import set_doc_for_recv
+from eazytec_send import get_docs_for_recv, new_request_id, set_doc_for_recv
+
+FILE_READ_BATCH_TIMEOUT = 30  # once the connection has answered a FILE_READ_BATCH
+FILE_READ_BATCH_PROBE_TIMEOUT = 3  # until then, OpenHands may not know FILE_READ_BATCH
+FILE_READ_BATCH_RETRY_INTERVAL = 600  # seconds a connection that did not answer reads one file at a time
+# conversation id -> True once its OpenHands answered a FILE_READ_BATCH, or the `time.monotonic()` until which it
+# reads one file at a time
+_batch_read_support: Dict[str, bool | float] = {}
+
 
 def extract_file_path(sid: None, file_path: str) -> str:
 
@@ -83,7 +94,7 @@ class FileRepository:
         oh_action_data['file_path'] = extract_file_path(sid, str(pathname))
         oh_action_data['file_content'] = content
         oh_action_data['conversation_id'] = sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+        publish_oh_action(oh_action_data)
 
         if((role_task=="") or (sid == "") or (current_role == "") or (user_intend=="")):
             print(f"#########file save erorr.")
@@ -98,10 +109,11 @@ class FileRepository:
         oh_action_data['action_type'] = "MESSAGE"
         oh_action_data['content'] = content_info
         oh_action_data['conversation_id'] = sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data,ensure_ascii=False)}")
+        publish_oh_action(oh_action_data)
         #print(f"!!!!!workspace: {oh_action_data}")
 
         await awrite(filename=str(pathname), data=content)
+        self._git_repo.record_change(pathname)
 
         if dependencies is not None:
             dependency_file = await self._git_repo.get_dependency()
@@ -110,6 +122,65 @@ class FileRepository:
 
         return Document(root_path=str(self._relative_path), filename=str(filename), content=content)
 
+    async def save_many(
+        self,
+        files: List[Tuple[Path | str, str]],
+        dependencies: List[str] = None,
+        current_role: str = "",
+        role_task: str = "",
+        sid: str = "",
+        user_intend: str = "",
+    ) -> List[Document]:
+        """Save several files at once and update their dependencies.
+
+        OpenHands receives one FILE_SAVE_BATCH action and one MESSAGE for the whole batch.
+
+        :param files: List of (filename, content) pairs.
+        :param dependencies: List of dependency filenames or paths shared by all files.
+        """
+        if not files:
+            return []
+        pathnames = []
+        batch = []
+        for filename, content in files:
+            pathname = self.workdir / filename
+            pathname.parent.mkdir(parents=True, exist_ok=True)
+            content = content if content else ""
+            pathnames.append((filename, pathname, content))
+            batch.append({"file_path": extract_file_path(sid, str(pathname)), "file_content": content})
+
+        oh_action_data = {}
+        oh_action_data['message'] = f"save to: " + ", ".join(i["file_path"] for i in batch)
+        oh_action_data['action_type'] = "FILE_SAVE_BATCH"
+        oh_action_data['files'] = batch
+        oh_action_data['conversation_id'] = sid
+        publish_oh_action(oh_action_data)
+
+        content_info = {
+            "sub_content": f"Finish writing {', '.join(str(i[0]) for i in pathnames)}",
+            "role_task": role_task,
+            "agent_role": current_role,
+            "mission": user_intend
+        }
+        oh_action_data = {}
+        oh_action_data['action_type'] = "MESSAGE"
+        oh_action_data['content'] = content_info
+        oh_action_data['conversation_id'] = sid
+        publish_oh_action(oh_action_data)
+
+        await asyncio.gather(*[awrite(filename=str(pathname), data=content) for _, pathname, content in pathnames])
+        for _, pathname, _ in pathnames:
+            self._git_repo.record_change(pathname)
+
+        if dependencies is not None:
+            dependency_file = await self._git_repo.get_dependency()
+            await dependency_file.update_many({pathname: set(dependencies) for _, pathname, _ in pathnames})
+
+        return [
+            Document(root_path=str(self._relative_path), filename=str(filename), content=content)
+            for filename, _, content in pathnames
+        ]
+
     async def get_dependency(self, filename: Path | str) -> Set[str]:
         """Get the dependencies of a file.
 
@@ -145,7 +216,7 @@ class FileRepository:
         #oh_action_data['file_path'] = "/workspace/"+str(filename)
         # logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
 
-        file_str = read_pipe_message_with_len(get_pipein())
+        file_str = await asyncio.to_thread(read_pipe_message_with_len, get_pipein())
         file_str = file_str.strip()
 
         if file_str == "NOTFOUND":
@@ -178,30 +249,45 @@ class FileRepository:
             oh_action_data['action_type'] = "FILE_READ"
             oh_action_data['file_path'] = extract_file_path(self._git_repo.sid, str(path_name))
             oh_action_data['conversation_id'] = self._git_repo.sid
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            oh_action_data['request_id'] = new_request_id()
+            publish_oh_action(oh_action_data)
 
-            set_doc_for_recv(self._git_repo.sio, self._git_repo.sid, doc)
+            try:
+                await set_doc_for_recv(
+                    self._git_repo.sio, self._git_repo.sid, doc,
+                    request_id=oh_action_data['request_id'], timeout=self._git_repo.reply_timeout
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"No reply to FILE_READ {oh_action_data['file_path']} within {self._git_repo.reply_timeout}s"
+                ) from None
 
         return doc
 
+    async def get_many(self, filenames: List[Path | str], timeout: Optional[float] = None) -> List[Optional[Document]]:
+        """Read the content of several files at once, see `get_documents`.
+
+        :param filenames: The filenames or paths within the repository.
+        :param timeout: Seconds to wait for the reply of the batch request before reading one file at a time, None for
+            the default of the connection.
+        :return: The documents in the order of `filenames`, None for files that do not exist.
+        """
+        return await get_documents([(self, filename) for filename in filenames], timeout=timeout)
+
     async def get_all(self, filter_ignored=True) -> List[Document]:
         """Get the content of all files in the repository.
 
         :return: List of Document instances representing files.
         """
-        docs = []
         if filter_ignored:
-            for f in self.all_files:
-                doc = await self.get(f)
-                docs.append(doc)
+            filenames = self.all_files
         else:
+            filenames = []
             for root, dirs, files in os.walk(str(self.workdir)):
                 for file in files:
                     file_path = Path(root) / file
-                    relative_path = file_path.relative_to(self.workdir)
-                    doc = await self.get(relative_path)
-                    docs.append(doc)
-        return docs
+                    filenames.append(file_path.relative_to(self.workdir))
+        return await self.get_many(filenames)
 
     @property
     def workdir(self):
@@ -312,7 +398,69 @@ class FileRepository:
         if not pathname.exists():
             return
         pathname.unlink(missing_ok=True)
+        self._git_repo.record_change(pathname, deleted=True)
 
         dependency_file = await self._git_repo.get_dependency()
         await dependency_file.update(filename=pathname, dependencies=None)
         # logger.info(f"remove dependency key: {str(pathname)}")
+
+
+async def get_documents(
+    requests: List[Tuple[FileRepository, Path | str]], timeout: Optional[float] = None
+) -> List[Optional[Document]]:
+    """Read files of the FileRepositories of one git repository at once.
+
+    In non-local mode all files are requested from OpenHands with a single FILE_READ_BATCH action, whose reply maps
+    each file path to its content, so replies cannot be mixed up whatever their order. If no reply arrives in time,
+    e.g. OpenHands does not know FILE_READ_BATCH, the files are read with one FILE_READ after the other, and so are
+    the batches of the same conversation for the next `FILE_READ_BATCH_RETRY_INTERVAL` seconds. Until a conversation
+    has answered a batch, the wait is only `FILE_READ_BATCH_PROBE_TIMEOUT`.
+
+    :param requests: The (file repository, filename within it) pairs to read.
+    :param timeout: Seconds to wait for the reply of the batch request, None for the default of the conversation.
+    :return: The documents in the order of `requests`, None for files that do not exist.
+    """
+    docs = []
+    for repo, filename in requests:
+        is_file = (repo.workdir / filename).is_file()
+        docs.append(Document(root_path=str(repo.root_path), filename=str(filename)) if is_file else None)
+    existing = [(repo, doc) for (repo, _), doc in zip(requests, docs) if doc]
+    if not existing:
+        return docs
+
+    if existing[0][0].local:
+        contents = await asyncio.gather(*[aread(repo.workdir / doc.filename) for repo, doc in existing])
+        for (_, doc), content in zip(existing, contents):
+            doc.content = content
+        return docs
+
+    git_repo = existing[0][0]._git_repo
+    support = _batch_read_support.get(git_repo.sid)
+    if support is True or support is None or support <= time.monotonic():
+        if timeout is None:
+            timeout = FILE_READ_BATCH_TIMEOUT if support is True else FILE_READ_BATCH_PROBE_TIMEOUT
+        file_paths = [extract_file_path(git_repo.sid, str(repo.workdir / doc.filename)) for repo, doc in existing]
+        oh_action_data = {}
+        oh_action_data['message'] = f"read: " + ", ".join(file_paths)
+        oh_action_data['action_type'] = "FILE_READ_BATCH"
+        oh_action_data['file_paths'] = file_paths
+        oh_action_data['conversation_id'] = git_repo.sid
+        oh_action_data['request_id'] = new_request_id()
+        publish_oh_action(oh_action_data)
+        try:
+            files = await get_docs_for_recv(
+                git_repo.sio, git_repo.sid, request_id=oh_action_data['request_id'], timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"No reply to FILE_READ_BATCH within {timeout}s, reading the files one at a time")
+            _batch_read_support[git_repo.sid] = time.monotonic() + FILE_READ_BATCH_RETRY_INTERVAL
+        else:
+            _batch_read_support[git_repo.sid] = True
+            for (_, doc), file_path in zip(existing, file_paths):
+                doc.content = (files.get(file_path) or "").strip()
+            return docs
+
+    for repo, doc in existing:
+        read = await repo.get(doc.filename)
+        doc.content = read.content if read else ""
+    return docs
@@ -8,20 +8,30 @@
 """
 from __future__ import annotations
 
+import hashlib
+import os
 import shutil
+import threading
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
-import json
+from typing import Callable, Dict, Iterable, List, Optional
 
 from git.repo import Repo
 from git.repo.fun import is_git_dir
 from gitignore_parser import parse_gitignore
 
 from metagpt.logs import logger
+from metagpt.utils.oh_action_bus import publish_oh_action
 from metagpt.utils.dependency_file import DependencyFile
 from metagpt.utils.file_repository import FileRepository
 from metagpt.utils.file_repository import extract_file_path
+from eazytec_send import DEFAULT_REPLY_TIMEOUT
+
+try:
+    from inotify_simple import INotify
+    from inotify_simple import flags as inotify_flags
+except ImportError:
+    INotify = None
 
 """
 def extract_file_path(file_path: str) -> str:
@@ -44,6 +54,183 @@ class ChangeType(Enum):
     UNTRACTED = "U"  # File is untracked (not added to version control)
 
 
+def git_blob_sha(data: bytes) -> str:
+    """Return the object id git gives to a file of `data`."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class ChangeJournal:
+    """The changed files of a working tree, kept up to date in-process instead of scanned with `git status`.
+
+    The journal is seeded by one git scan (`resync`), then fed by `record` for every file saved or deleted through a
+    `FileRepository`, and by `staged` for the changes added to the index. A change is classified against the blob ids
+    of the index, so saving a file back to its committed content is not a change, like for git.
+
+    Files written behind its back, such as the mermaid renderings, are only seen after a `GitRepository.resync`, which
+    `GitRepository.archive` does before committing, or by `GitRepository.watch` on Linux with `inotify_simple`
+    installed.
+    """
+
+    _resident: Dict[Path, "ChangeJournal"] = {}
+    _resident_lock = threading.Lock()
+
+    def __init__(self, workdir: Path | str):
+        self.workdir = Path(workdir)
+        self.is_ignored: Callable[[str], bool] = lambda path: False
+        self.watcher: Optional[_ChangeWatcher] = None
+        self._lock = threading.RLock()
+        self._changes: Optional[Dict[str, ChangeType]] = None  # None until seeded
+        self._tracked: Dict[str, str] = {}  # blob ids of the index
+
+    @classmethod
+    def resident(cls, workdir: Path | str) -> "ChangeJournal":
+        """Return the process-wide journal of `workdir`, shared by all the repositories opened on it."""
+        key = Path(workdir).resolve()
+        with cls._resident_lock:
+            instance = cls._resident.get(key)
+            if instance is None:
+                instance = cls(workdir=key)
+                cls._resident[key] = instance
+            return instance
+
+    @classmethod
+    def release(cls, workdir: Path | str):
+        """Forget the journal of `workdir` and stop its watcher."""
+        with cls._resident_lock:
+            instance = cls._resident.pop(Path(workdir).resolve(), None)
+        if instance and instance.watcher:
+            instance.watcher.stop()
+
+    @classmethod
+    def move(cls, workdir: Path | str, new_workdir: Path | str):
+        """Keep the journal of `workdir` for the same tree moved to `new_workdir`, its paths are relative."""
+        with cls._resident_lock:
+            instance = cls._resident.pop(Path(workdir).resolve(), None)
+            if instance is None:
+                return
+            instance.workdir = Path(new_workdir).resolve()
+            cls._resident[instance.workdir] = instance
+        if instance.watcher:
+            instance.watcher.stop()
+            instance.watcher = None
+
+    @property
+    def synced(self) -> bool:
+        return self._changes is not None
+
+    def resync(self, repository: Repo):
+        """Replace the journal with a full scan of the working tree."""
+        changes = {i: ChangeType.UNTRACTED for i in repository.untracked_files}
+        changes.update({f.a_path: ChangeType(f.change_type) for f in repository.index.diff(None)})
+        tracked = {path: entry.hexsha for (path, _), entry in repository.index.entries.items()}
+        with self._lock:
+            self._changes = changes
+            self._tracked = tracked
+
+    def relative(self, filename: Path | str) -> Optional[str]:
+        try:
+            return Path(filename).resolve().relative_to(self.workdir).as_posix()
+        except ValueError:
+            return None
+
+    def record(self, filename: Path | str, deleted: bool = False):
+        """Record that `filename`, absolute or relative to the working tree, was written, or deleted."""
+        path = self.relative(self.workdir / filename)
+        if path is None or path == ".git" or path.startswith(".git/"):
+            return
+        with self._lock:
+            if self._changes is None:  # the first query scans
+                return
+            pathname = self.workdir / path
+            if deleted or not pathname.is_file():
+                if path in self._tracked:
+                    self._changes[path] = ChangeType.DELETED
+                else:
+                    self._changes.pop(path, None)
+                return
+            blob = self._tracked.get(path)
+            if blob is None:
+                if not self.is_ignored(str(pathname)):
+                    self._changes[path] = ChangeType.UNTRACTED
+            elif blob == git_blob_sha(pathname.read_bytes()):
+                self._changes.pop(path, None)
+            else:
+                self._changes[path] = ChangeType.MODIFIED
+
+    def record_removed_tree(self, directory: Path | str):
+        """Record that the files under `directory` were deleted, or moved away."""
+        prefix = f"{self.relative(self.workdir / directory)}/"
+        with self._lock:
+            paths = [i for i in set(self._tracked) | set(self._changes or {}) if i.startswith(prefix)]
+        for i in paths:
+            self.record(i, deleted=True)
+
+    def staged(self, added: Dict[str, str], removed: Iterable[str]):
+        """Record the paths added to the index with their blob ids, and the paths removed from it."""
+        with self._lock:
+            for path, blob in added.items():
+                self._tracked[path] = blob
+                if self._changes is not None:
+                    self._changes.pop(path, None)
+            for path in removed:
+                self._tracked.pop(path, None)
+                if self._changes is not None:
+                    self._changes.pop(path, None)
+
+    def changed_files(self) -> Dict[str, ChangeType]:
+        with self._lock:
+            return dict(self._changes or {})
+
+
+class _ChangeWatcher(threading.Thread):
+    """Feed a `ChangeJournal` with the inotify events of its working tree."""
+
+    def __init__(self, journal: ChangeJournal):
+        super().__init__(name=f"git-watch-{journal.workdir.name}", daemon=True)
+        self.journal = journal
+        self.mask = (
+            inotify_flags.CLOSE_WRITE
+            | inotify_flags.CREATE
+            | inotify_flags.DELETE
+            | inotify_flags.MOVED_FROM
+            | inotify_flags.MOVED_TO
+        )
+        self._inotify = INotify()
+        self._directories: Dict[int, Path] = {}
+        self._stopped = threading.Event()
+        self._add_tree(journal.workdir, record=False)
+
+    def _add_tree(self, directory: Path, record: bool = True):
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [i for i in dirs if i != ".git" and not self.journal.is_ignored(os.path.join(root, i))]
+            try:
+                self._directories[self._inotify.add_watch(root, self.mask)] = Path(root)
+            except OSError as e:
+                logger.warning(f"Failed to watch {root}: {e}")
+            if record:
+                for i in files:
+                    self.journal.record(Path(root) / i)
+
+    def run(self):
+        while not self._stopped.is_set():
+            for event in self._inotify.read(timeout=500):
+                directory = self._directories.get(event.wd)
+                if directory is None or not event.name:
+                    continue
+                pathname = directory / event.name
+                gone = event.mask & (inotify_flags.DELETE | inotify_flags.MOVED_FROM)
+                if not event.mask & inotify_flags.ISDIR:
+                    self.journal.record(pathname, deleted=bool(gone))
+                elif not gone and not self.journal.is_ignored(str(pathname)):
+                    self._add_tree(pathname)
+                elif gone:
+                    self.journal.record_removed_tree(pathname)
+        self._inotify.close()
+
+    def stop(self):
+        self._stopped.set()
+
+
 class GitRepository:
     """A class representing a Git repository.
 
@@ -54,11 +241,12 @@ class GitRepository:
         _repository (Repo): The GitPython `Repo` object representing the Git repository.
     """
 
-    def __init__(self, local_path=None, auto_init=True, sid: str="", sio=None, local: bool = False, current_role: str="", role_task: str="", user_intend=""):
+    def __init__(self, local_path=None, auto_init=True, sid: str="", sio=None, local: bool = False, current_role: str="", role_task: str="", user_intend="", reply_timeout: float = DEFAULT_REPLY_TIMEOUT):
         """Initialize a GitRepository instance.
 
         :param local_path: The local path to the Git repository.
         :param auto_init: If True, automatically initializes a new Git repository if the provided path is not a Git repository.
+        :param reply_timeout: Seconds to wait for OpenHands to send a file back in non-local mode.
         """
         self._repository = None
         self._dependency = None
@@ -70,6 +258,7 @@ class GitRepository:
         self.user_intend = user_intend
 
         self.local = local
+        self.reply_timeout = reply_timeout
         if local_path:
             self.open(local_path=local_path, auto_init=auto_init)
 
@@ -112,8 +301,13 @@ class GitRepository:
         if not self.is_valid or not files:
             return
 
-        for k, v in files.items():
-            self._repository.index.remove(k) if v is ChangeType.DELETED else self._repository.index.add([k])
+        removed = [k for k, v in files.items() if v is ChangeType.DELETED]
+        added = [k for k, v in files.items() if v is not ChangeType.DELETED]
+        index = self._repository.index
+        if removed:
+            index.remove(removed)
+        entries = index.add(added) if added else []
+        self._journal().staged(added={i.path: i.hexsha for i in entries}, removed=removed)
 
     def commit(self, comments):
         """Commit the staged changes with the given comments.
@@ -123,9 +317,19 @@ class GitRepository:
         if self.is_valid:
             self._repository.index.commit(comments)
 
+    def flush_dependency(self):
+        """Write the pending updates of the dependency file, so that it is part of the next commit."""
+        if self._dependency:
+            self._dependency.flush_sync()
+
     def delete_repository(self):
         """Delete the entire repository directory."""
         if self.is_valid:
+            if self._dependency:
+                self._dependency.delete_file()
+                DependencyFile.release(self.workdir)
+                self._dependency = None
+            ChangeJournal.release(self.workdir)
             try:
                 shutil.rmtree(self._repository.working_dir)
             except Exception as e:
@@ -135,12 +339,49 @@ class GitRepository:
     def changed_files(self) -> Dict[str, str]:
         """Return a dictionary of changed files and their change types.
 
+        Served from the change journal, the working tree is only scanned by the first query and by `resync`.
+
         :return: A dictionary where keys are file paths and values are change types.
         """
-        files = {i: ChangeType.UNTRACTED for i in self._repository.untracked_files}
-        changed_files = {f.a_path: ChangeType(f.change_type) for f in self._repository.index.diff(None)}
-        files.update(changed_files)
-        return files
+        journal = self._journal()
+        if not journal.synced:
+            journal.resync(self._repository)
+        return journal.changed_files()
+
+    def _journal(self) -> ChangeJournal:
+        journal = ChangeJournal.resident(self.workdir)
+        journal.is_ignored = self._gitignore_rules or journal.is_ignored
+        return journal
+
+    def record_change(self, filename: Path | str, deleted: bool = False):
+        """Record in the change journal that `filename` was written, or deleted.
+
+        :param filename: The absolute path, or the path relative to the working directory.
+        :param deleted: True if the file was deleted.
+        """
+        if self.is_valid:
+            self._journal().record(filename, deleted=deleted)
+
+    def resync(self):
+        """Rebuild the change journal with a git scan, to pick up the files written outside of `FileRepository`."""
+        if self.is_valid:
+            self._journal().resync(self._repository)
+
+    def watch(self) -> bool:
+        """Reconcile the change journal with the inotify events of the working tree.
+
+        :return: False if inotify is not available, `inotify_simple` is an optional dependency.
+        """
+        if not self.is_valid or INotify is None:
+            return False
+        journal = self._journal()
+        with ChangeJournal._resident_lock:
+            if journal.watcher is None:
+                journal.watcher = _ChangeWatcher(journal)
+                journal.watcher.start()
+        if not journal.synced:
+            journal.resync(self._repository)
+        return True
 
     @staticmethod
     def is_git_dir(local_path):
@@ -182,10 +423,15 @@ class GitRepository:
     def archive(self, comments="Archive"):
         """Archive the current state of the Git repository.
 
+        The working tree is scanned once, so the files written outside of `FileRepository` are committed as well.
+
         :param comments: Comments for the archive commit.
         """
-        logger.info(f"Archive: {list(self.changed_files.keys())}")
-        self.add_change(self.changed_files)
+        self.flush_dependency()
+        self.resync()
+        changed_files = self.changed_files
+        logger.info(f"Archive: {list(changed_files.keys())}")
+        self.add_change(changed_files)
         self.commit(comments)
 
     def new_file_repository(self, relative_path: Path | str = ".") -> FileRepository:
@@ -203,7 +449,7 @@ class GitRepository:
             oh_action_data['message'] = f"create File Repo: "+ extract_file_path(self.sid, f"str(directory_name)")
             oh_action_data['action_type'] = "FILE_REPO"
             oh_action_data['file_path'] = extract_file_path(self.sid, f"str(directory_name)")
-            logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+            publish_oh_action(oh_action_data)
 
         except ValueError:
             path = relative_path
@@ -216,7 +462,7 @@ class GitRepository:
         :return: An instance of DependencyFile.
         """
         if not self._dependency:
-            self._dependency = DependencyFile(workdir=self.workdir)
+            self._dependency = DependencyFile.resident(workdir=self.workdir)
         return self._dependency
 
     def rename_root(self, new_dir_name):
@@ -244,6 +490,9 @@ class GitRepository:
         if new_path.exists():  # Recheck for windows os
             logger.warning(f"Failed to delete directory {str(new_path)}")
             return
+        DependencyFile.release(self.workdir)
+        self._dependency = None
+        old_path = self.workdir
         try:
             shutil.move(src=str(self.workdir), dst=str(new_path))
         except Exception as e:
@@ -260,10 +509,11 @@ class GitRepository:
         oh_action_data['old_path'] = extract_file_path(self.sid, f"{str(self.workdir)}")
         oh_action_data['new_path'] = extract_file_path(self.sid, f"{str(new_path)}")
         oh_action_data['conversation_id'] = self.sid
-        logger.error(f"<OH_ACTION> json_data:{json.dumps(oh_action_data)}")
+        publish_oh_action(oh_action_data)
 
         self._repository = Repo(new_path)
         self._gitignore_rules = parse_gitignore(full_path=str(new_path / ".gitignore"))
+        ChangeJournal.move(old_path, new_path)
 
     def get_files(self, relative_path: Path | str, root_relative_path: Path | str = None, filter_ignored=True) -> List:
         """
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : kernel_pool.py
+@Desc    : Pool of pre-started Jupyter kernels for `ExecuteNbCode`.
+
+    `ExecuteNbCode.build` used to start a kernel for every new executor, and `reset` to shut it down, sleep and start
+    another one: seconds per task, and per node of the SELA searches. A `KernelPool` keeps `size` kernels started in
+    the background with the usual data science packages already imported, so a checkout only connects a client.
+
+    - A returned kernel is scrubbed (namespace, figures, working directory) and reused, up to `max_uses` times, then
+      recycled: what the scrub does not reset, such as `sys.modules` or `os.environ`, does not outlive it.
+    - At most `max_kernels` kernels are checked out at a time in the process, the next checkouts wait for a return,
+      up to `checkout_timeout`: an executor that is never terminated fails the next checkouts instead of hanging them.
+    - `memory_limit` caps the address space of every kernel, and a kernel returned above it is recycled.
+
+    The kernel processes are shared by all the event loops, their clients are created by the loop checking out.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional, Sequence
+
+from jupyter_client.asynchronous import AsyncKernelClient
+from jupyter_client.manager import AsyncKernelManager
+
+from metagpt.logs import logger
+from metagpt.utils.async_subprocess import ProcessLimiter
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_KERNELS = 16
+DEFAULT_MAX_USES = 20
+DEFAULT_CHECKOUT_TIMEOUT = 600
+DEFAULT_PRELOAD = ("numpy", "pandas", "sklearn")
+
+_PRELOAD_CODE = """
+import importlib
+for _name in {modules!r}:
+    try:
+        importlib.import_module(_name)
+    except ImportError:
+        pass
+"""
+
+_MEMORY_LIMIT_CODE = """
+import resource
+resource.setrlimit(resource.RLIMIT_AS, ({limit}, {limit}))
+"""
+
+_SCRUB_CODE = """
+import sys as _sys
+if "matplotlib.pyplot" in _sys.modules:
+    _sys.modules["matplotlib.pyplot"].close("all")
+__import__("os").chdir({cwd!r})
+get_ipython().run_line_magic("reset", "-f")
+__import__("gc").collect()
+"""
+
+
+@dataclass
+class PooledKernel:
+    """A kernel of a `KernelPool`, with the client of its current checkout."""
+
+    km: AsyncKernelManager
+    cwd: str
+    uses: int = 0
+    client: Optional[AsyncKernelClient] = None
+
+
+class KernelPool:
+    """Pre-started Jupyter kernels checked out by the notebook executors.
+
+    :param size: Idle kernels kept started.
+    :param max_kernels: Kernels checked out at a time.
+    :param max_uses: Checkouts of a kernel before it is recycled.
+    :param preload: Modules imported by every kernel when it starts.
+    :param memory_limit: Bytes of address space of every kernel, None for no limit.
+    :param kernel_name: The kernel spec.
+    :param timeout: Seconds allowed to start a kernel and to run the preload or the scrub code.
+    :param checkout_timeout: Seconds a checkout waits for a kernel to be returned, None to wait forever.
+    """
+
+    _default: Optional["KernelPool"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        max_kernels: int = DEFAULT_MAX_KERNELS,
+        max_uses: int = DEFAULT_MAX_USES,
+        preload: Sequence[str] = DEFAULT_PRELOAD,
+        memory_limit: Optional[int] = None,
+        kernel_name: str = "python3",
+        timeout: float = 60,
+        checkout_timeout: Optional[float] = DEFAULT_CHECKOUT_TIMEOUT,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.preload = tuple(preload)
+        self.memory_limit = memory_limit
+        self.kernel_name = kernel_name
+        self.timeout = timeout
+        self.checkout_timeout = checkout_timeout
+        self._limiter = ProcessLimiter(max_kernels)
+        self._lock = threading.Lock()
+        self._idle: Deque[PooledKernel] = deque()
+        self._starting = 0
+        self._closed = False
+        self._fill_tasks = set()
+        atexit.register(self._kill_idle)
+
+    @classmethod
+    def default(cls) -> "KernelPool":
+        """Return the pool shared by the executors of the process."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def checkout(self) -> PooledKernel:
+        """Return a started kernel with a connected client, wait if `max_kernels` are checked out.
+
+        :raises TimeoutError: No kernel was returned within `checkout_timeout`.
+        """
+        try:
+            await asyncio.wait_for(self._limiter.acquire(), timeout=self.checkout_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"No kernel returned within {self.checkout_timeout}s, {self._limiter.limit} kernels are checked out: "
+                "is an ExecuteNbCode not terminated?"
+            ) from None
+        try:
+            kernel = await self._pop_alive() or await self._start()
+            kernel.uses += 1
+            try:
+                kernel.client = await self._connect(kernel.km)
+            except BaseException:
+                await self._shutdown(kernel)
+                raise
+        except BaseException:
+            self._limiter.release()
+            raise
+        self._schedule_fill()
+        return kernel
+
+    async def checkin(self, kernel: PooledKernel, recycle: bool = False):
+        """Scrub and keep a checked out kernel, or shut it down if `recycle`, worn out or not needed."""
+        try:
+            keep = (
+                not recycle
+                and not self._closed
+                and kernel.uses < self.max_uses
+                and self.idle < self.size
+                and await kernel.km.is_alive()
+                and not self._over_memory(kernel)
+            )
+            if keep and kernel.client is not None:
+                try:
+                    await self._execute(kernel.client, _SCRUB_CODE.format(cwd=kernel.cwd))
+                except Exception as e:
+                    logger.warning(f"Failed to scrub the kernel, recycling it: {e}")
+                    keep = False
+            if kernel.client is not None:
+                kernel.client.stop_channels()
+                kernel.client = None
+            if keep:
+                with self._lock:
+                    self._idle.append(kernel)
+            else:
+                await self._shutdown(kernel)
+        finally:
+            self._limiter.release()
+        self._schedule_fill()
+
+    async def fill(self):
+        """Start the idle kernels missing."""
+        with self._lock:
+            count = max(0, self.size - len(self._idle) - self._starting)
+            self._starting += count
+        await asyncio.gather(*[self._fill_one() for _ in range(count)])
+
+    async def close(self):
+        """Shut down the idle kernels, the checked out ones are shut down when returned."""
+        self._closed = True
+        with self._lock:
+            kernels, self._idle = list(self._idle), deque()
+        for kernel in kernels:
+            await self._shutdown(kernel)
+
+    def _schedule_fill(self):
+        if not self._closed and self.idle + self._starting < self.size:
+            task = asyncio.get_running_loop().create_task(self.fill())
+            self._fill_tasks.add(task)
+            task.add_done_callback(self._fill_tasks.discard)
+
+    async def _fill_one(self):
+        try:
+            kernel = await self._start()
+        except Exception as e:
+            logger.warning(f"Failed to start a pooled kernel: {e}")
+            return
+        finally:
+            with self._lock:
+                self._starting -= 1
+        with self._lock:
+            keep = not self._closed and len(self._idle) < self.size  # or the kernels returned meanwhile will do
+            if keep:
+                self._idle.append(kernel)
+        if not keep:
+            await self._shutdown(kernel)
+
+    async def _pop_alive(self) -> Optional[PooledKernel]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                kernel = self._idle.popleft()
+            if await kernel.km.is_alive():
+                return kernel
+            await self._shutdown(kernel)
+
+    async def _start(self) -> PooledKernel:
+        kernel = PooledKernel(km=AsyncKernelManager(kernel_name=self.kernel_name), cwd=os.getcwd())
+        try:
+            await asyncio.wait_for(kernel.km.start_kernel(), timeout=self.timeout)
+            client = await self._connect(kernel.km)
+            try:
+                code = _PRELOAD_CODE.format(modules=self.preload)
+                if self.memory_limit:
+                    code += _MEMORY_LIMIT_CODE.format(limit=int(self.memory_limit))
+                await self._execute(client, code)
+                await self._execute(client, _SCRUB_CODE.format(cwd=kernel.cwd))
+            finally:
+                client.stop_channels()
+        except BaseException:
+            await self._shutdown(kernel)
+            raise
+        return kernel
+
+    async def _connect(self, km: AsyncKernelManager) -> AsyncKernelClient:
+        client = km.client()
+        client.start_channels()
+        try:
+            await client.wait_for_ready(timeout=self.timeout)
+        except BaseException:
+            client.stop_channels()
+            raise
+        client.allow_stdin = False
+        return client
+
+    async def _execute(self, client: AsyncKernelClient, code: str):
+        reply = await client.execute_interactive(
+            code, store_history=False, output_hook=lambda msg: None, timeout=self.timeout
+        )
+        if reply["content"]["status"] != "ok":
+            raise RuntimeError(f"{reply['content'].get('ename')}: {reply['content'].get('evalue')}")
+
+    def _over_memory(self, kernel: PooledKernel) -> bool:
+        pid = getattr(kernel.km.provisioner, "pid", None)
+        if not self.memory_limit or psutil is None or pid is None:
+            return False
+        try:
+            return psutil.Process(pid).memory_info().rss > self.memory_limit
+        except psutil.Error:
+            return True
+
+    @staticmethod
+    async def _shutdown(kernel: PooledKernel):
+        try:
+            if kernel.km.has_kernel:
+                await kernel.km.shutdown_kernel(now=True)  # cleans up the resources too
+            else:
+                await kernel.km.cleanup_resources()
+        except Exception as e:
+            logger.warning(f"Failed to shut down a pooled kernel: {e}")
+
+    def _kill_idle(self):
+        with self._lock:
+            kernels, self._idle = list(self._idle), deque()
+        for kernel in kernels:
+            process = getattr(kernel.km.provisioner, "process", None)
+            if process is not None:
+                process.kill()
+            kernel.km.cleanup_connection_file()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : llm_cache.py
+@Desc    : Content-addressed cache of LLM responses.
+
+    Responses are keyed by a hash of (model, messages, temperature, tools, tool_choice). Rerunning a project with identical
+    prompts, e.g. after `RE_GENERATE` or a crash in `generate_codes`, is then served from the cache instead of the
+    network. The mode is set by `LLMConfig.cache_mode`:
+
+    - `off`: no cache.
+    - `on`: read through, a miss calls the LLM and stores the response.
+    - `record`: always call the LLM and store the response.
+    - `replay`: strict, a miss raises `LLMCacheMissError` instead of calling the LLM.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from metagpt.configs.llm_config import LLMCacheMode, LLMConfig
+from metagpt.const import DEFAULT_WORKSPACE_ROOT
+
+
+class LLMCacheMissError(Exception):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def llm_cache_key(
+    model: Optional[str], messages: list, temperature: Optional[float] = None, tools=None, tool_choice=None
+) -> str:
+    """Return the cache key of a request, the sha256 of its canonical json."""
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "tools": tools,
+        "tool_choice": tool_choice,
+    }
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class BaseLLMCache:
+    """Size-bounded LRU cache with an optional TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+
+class MemoryLLMCache(BaseLLMCache):
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[0], time.time()):
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteLLMCache(BaseLLMCache):
+    """On-disk cache shared by the runs using the same file."""
+
+    def __init__(self, path: str | Path, max_entries: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+_caches: Dict[Tuple, BaseLLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(config: LLMConfig) -> Optional[BaseLLMCache]:
+    """Return the process-wide cache configured by `config`, None if caching is off. Configs differing in
+    `cache_max_entries` or `cache_ttl` get separate caches."""
+    if LLMCacheMode(config.cache_mode) == LLMCacheMode.OFF:
+        return None
+    if config.cache_backend == "sqlite":
+        path = Path(config.cache_path) if config.cache_path else DEFAULT_WORKSPACE_ROOT / ".llm_cache.sqlite3"
+        key = ("sqlite", str(path.resolve()), config.cache_max_entries, config.cache_ttl)
+    else:
+        path = None
+        key = ("memory", config.cache_max_entries, config.cache_ttl)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            if path is not None:
+                cache = SQLiteLLMCache(path, max_entries=config.cache_max_entries, ttl=config.cache_ttl)
+            else:
+                cache = MemoryLLMCache(max_entries=config.cache_max_entries, ttl=config.cache_ttl)
+            _caches[key] = cache
+        return cache
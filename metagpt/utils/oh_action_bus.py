@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : oh_action_bus.py
+@Desc    : In-process event bus for the actions sent to OpenHands (OH_ACTION).
+
+    Actions used to be written with `logger.error("<OH_ACTION> json_data:...")`, picked up by a loguru filter and
+    parsed back out of the log line. Publishing goes through the bus instead: every action is serialized once and
+    handed to the sinks subscribed for its conversation.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+from metagpt.logs import logger
+
+OH_ACTION_PREFIX = "<OH_ACTION> json_data:"
+
+# With a compress threshold set on a sink, `file_content` larger than it is sent to the sink zlib-compressed and
+# base64-encoded. It is off by default: only enable it (`oh_action_compress_threshold` in config2.yaml) if the
+# receiving OpenHands decodes `file_content_encoding`, e.g. with `decode_file_content`.
+COMPRESSED_ENCODING = "zlib+base64"
+
+
+class OHAction(BaseModel):
+    """An action for OpenHands, such as FILE_SAVE, FILE_READ, CMD_RUN or MESSAGE.
+
+    Besides `action_type` and `conversation_id`, any action specific field is allowed.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    action_type: str
+    conversation_id: Optional[str] = None
+
+    def to_payload(self, compress_threshold: Optional[int] = None) -> str:
+        """Serialize the action, compressing a large `file_content` if `compress_threshold` is set."""
+        data = self.model_dump(exclude_unset=True)
+        content = data.get("file_content")
+        if compress_threshold is not None and isinstance(content, str) and len(content) > compress_threshold:
+            data["file_content"] = base64.b64encode(zlib.compress(content.encode("utf-8"))).decode("ascii")
+            data["file_content_encoding"] = COMPRESSED_ENCODING
+        return json.dumps(data, ensure_ascii=False)
+
+
+def decode_file_content(data: Dict[str, Any]) -> str:
+    """Return the plain `file_content` of a deserialized action payload."""
+    content = data.get("file_content", "")
+    if data.get("file_content_encoding") == COMPRESSED_ENCODING:
+        return zlib.decompress(base64.b64decode(content)).decode("utf-8")
+    return content
+
+
+class OHActionSink:
+    """Base class of the bus sinks."""
+
+    compress_threshold: Optional[int] = None  # see `OHAction.to_payload`
+
+    def send(self, action: OHAction, payload: str):
+        raise NotImplementedError
+
+
+class StreamSink(OHActionSink):
+    """Adapter for legacy stream objects that only implement `write(message)` of an OH_ACTION log line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def send(self, action: OHAction, payload: str):
+        self.stream.write(f"{OH_ACTION_PREFIX}{payload}")
+
+
+class RedisSink(OHActionSink):
+    """Publish actions of one conversation to a redis channel."""
+
+    def __init__(self, client, channel: str, conversation_id: str):
+        self.client = client
+        self.channel = channel
+        self.conversation_id = conversation_id
+
+    def send(self, action: OHAction, payload: str):
+        response_data = {
+            "conversation_id": self.conversation_id,
+            "message": f"{OH_ACTION_PREFIX}{payload}",
+            "type": "action",
+        }
+        self.client.publish(self.channel, json.dumps(response_data, ensure_ascii=False))
+
+
+class FifoSink(OHActionSink):
+    """Write actions to the FIFO pipe shared with OpenHands, see `metagpt.pipe_files`."""
+
+    def __init__(self, pipeout: int):
+        self.pipeout = pipeout
+
+    def send(self, action: OHAction, payload: str):
+        from metagpt.pipe_files import write_pipe_message_with_len
+
+        write_pipe_message_with_len(self.pipeout, f"{OH_ACTION_PREFIX}{payload}")
+
+
+class MemorySink(OHActionSink):
+    """Keep published actions in memory, for tests."""
+
+    def __init__(self):
+        self.actions: List[OHAction] = []
+        self.payloads: List[str] = []
+
+    def send(self, action: OHAction, payload: str):
+        self.actions.append(action)
+        self.payloads.append(payload)
+
+    def of_type(self, action_type: str) -> List[OHAction]:
+        return [i for i in self.actions if i.action_type == action_type]
+
+
+class OHActionBus:
+    """Route OH actions to the sinks subscribed for their conversation.
+
+    A sink subscribed with `conversation_id=None` receives every action; otherwise it only receives the actions
+    carrying that `conversation_id`. Publishing is thread-safe, `generate_*` runs in worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sinks: Dict[Optional[str], List[OHActionSink]] = {}
+
+    def subscribe(
+        self, sink, conversation_id: Optional[str] = None, compress_threshold: Optional[int] = None
+    ) -> OHActionSink:
+        """Subscribe `sink` to a conversation. A sink object is only subscribed once per conversation.
+
+        :param sink: An `OHActionSink`, or a legacy stream object with a `write(message)` method.
+        :param compress_threshold: Compress the larger `file_content` sent to the sink, None to send it as is.
+        :return: The subscribed sink, to be passed to `unsubscribe`.
+        """
+        with self._lock:
+            sinks = self._sinks.setdefault(conversation_id, [])
+            for i in sinks:
+                if i is sink or (isinstance(i, StreamSink) and i.stream is sink):
+                    return i
+            if not isinstance(sink, OHActionSink):
+                sink = StreamSink(sink)
+            if compress_threshold is not None:
+                sink.compress_threshold = compress_threshold
+            self._sinks[conversation_id] = sinks + [sink]
+            return sink
+
+    @contextmanager
+    def subscription(
+        self, sink, conversation_id: Optional[str] = None, compress_threshold: Optional[int] = None
+    ) -> Iterator[Optional[OHActionSink]]:
+        """Subscribe `sink` for the enclosed code, see `subscribe`. Nothing is subscribed if `sink` is None."""
+        if sink is None:
+            yield None
+            return
+        sink = self.subscribe(sink, conversation_id=conversation_id, compress_threshold=compress_threshold)
+        try:
+            yield sink
+        finally:
+            self.unsubscribe(sink, conversation_id=conversation_id)
+
+    def unsubscribe(self, sink, conversation_id: Optional[str] = None):
+        with self._lock:
+            sinks = self._sinks.get(conversation_id, [])
+            self._sinks[conversation_id] = [
+                i for i in sinks if not (i is sink or (isinstance(i, StreamSink) and i.stream is sink))
+            ]
+
+    def publish(self, action: OHAction | Dict[str, Any]) -> Optional[str]:
+        """Serialize `action` once per compress threshold and send it to the matching sinks.
+
+        :return: The payload sent to the first matching sink, or None if no sink is subscribed.
+        """
+        if not isinstance(action, OHAction):
+            action = OHAction(**action)
+        with self._lock:
+            targets: Tuple[OHActionSink, ...] = tuple(self._sinks.get(None, ()))
+            if action.conversation_id is not None:
+                targets += tuple(self._sinks.get(action.conversation_id, ()))
+        if not targets:
+            return None
+        payloads: Dict[Optional[int], str] = {}
+        for sink in targets:
+            threshold = sink.compress_threshold
+            if threshold not in payloads:
+                payloads[threshold] = action.to_payload(threshold)
+            try:
+                sink.send(action, payloads[threshold])
+            except Exception as e:
+                logger.warning(f"OH action sink {type(sink).__name__} failed: {e}")
+        return payloads[targets[0].compress_threshold]
+
+
+oh_action_bus = OHActionBus()
+
+
+def publish_oh_action(oh_action_data: OHAction | Dict[str, Any]) -> Optional[str]:
+    """Publish an action on the process-wide bus."""
+    return oh_action_bus.publish(oh_action_data)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : service_launcher.py
+@Desc    : Launch the servers of a generated project as managed subprocesses, wait until they accept connections.
+
+    `LaunchIntegrationTest` used to start uvicorn and `npm run dev` behind `timeout` wrappers and to wait for them
+    with fixed sleeps, so a test pass took the sleeps even for a server up in a second, and a slow server was tested
+    before it listened. A `ServiceGroup` starts every server in its own process group, probes its readiness (a TCP
+    connect, or any HTTP response) with an exponential backoff, keeps the tail of its console output in a bounded
+    buffer, and kills the process groups when the group exits, whatever happened in between.
+
+    The OpenHands runtime runs the servers itself, `wait_ready_command` is the shell counterpart of the probe.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shlex
+import signal
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import aiohttp
+
+from metagpt.logs import logger
+
+DEFAULT_READY_TIMEOUT = 60
+DEFAULT_LOG_LINES = 2000
+
+
+class ServiceNotReadyError(RuntimeError):
+    """Raised when a service exits or does not answer its probe before the timeout."""
+
+
+class ManagedService:
+    """A server started by a `ServiceGroup`.
+
+    :param name: The name of the service, for the logs.
+    :param cmd: The bash script starting the server in the foreground.
+    :param port: The port probed with a TCP connect, if `url` is not given.
+    :param url: The url probed with an HTTP GET, any response status means ready.
+    :param host: The host of the port.
+    :param max_lines: The console output lines kept.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cmd: str,
+        port: Optional[int] = None,
+        url: str = "",
+        host: str = "localhost",
+        max_lines: int = DEFAULT_LOG_LINES,
+    ):
+        self.name = name
+        self.cmd = cmd
+        self.port = port
+        self.url = url
+        self.host = host
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.lines)
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None):
+        self.process = await asyncio.create_subprocess_exec(
+            "/bin/bash",
+            "-c",
+            self.cmd,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,  # its own process group, see `stop`
+        )
+        self._reader = asyncio.create_task(self._read_output())
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+    async def _read_output(self):
+        async for line in self.process.stdout:
+            line = line.decode(errors="replace").strip()
+            if line:
+                self.lines.append(line)
+
+    async def probe(self) -> bool:
+        """Return whether the server accepts connections."""
+        if self.url:
+            try:
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2)) as session:
+                    async with session.get(self.url, allow_redirects=False):
+                        return True
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                return False
+        if self.port is None:
+            return self.running
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout=2)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        writer.close()
+        return True
+
+    async def wait_ready(self, timeout: float = DEFAULT_READY_TIMEOUT, initial_delay: float = 0.1, max_delay: float = 2):
+        """Probe the server with an exponential backoff until it is ready, raise `ServiceNotReadyError` if it exits or
+        the timeout expires first."""
+        start = time.monotonic()
+        deadline = start + timeout
+        delay = initial_delay
+        while True:
+            if not self.running:
+                raise ServiceNotReadyError(f"{self.name} exited with {self.process.returncode}:\n{self.output}")
+            if await self.probe():
+                logger.info(f"{self.name} is ready after {time.monotonic() - start:.1f}s")
+                return
+            if time.monotonic() + delay > deadline:
+                raise ServiceNotReadyError(f"{self.name} is not ready after {timeout}s:\n{self.output}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    async def stop(self, grace: float = 5):
+        """Terminate the process group of the server, kill it after `grace` seconds."""
+        if self.process is None:
+            return
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(self.process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=grace)
+                break
+            except asyncio.TimeoutError:
+                continue
+        await self.process.wait()
+        if self._reader:
+            # The pipe closes with the last process of the group holding it
+            try:
+                await asyncio.wait_for(self._reader, timeout=grace)
+            except asyncio.TimeoutError:
+                self._reader.cancel()
+        logger.info(f"Stopped {self.name} ({self.process.returncode})")
+
+
+class ServiceGroup:
+    """Servers started together and stopped in the reverse order when the group exits.
+
+    Usage:
+        async with ServiceGroup() as services:
+            backend = await services.start("backend", "uvicorn main:app --port 8000", port=8000)
+            ...
+    """
+
+    def __init__(self, grace: float = 5):
+        self.grace = grace
+        self.services: Dict[str, ManagedService] = {}
+
+    async def start(
+        self,
+        name: str,
+        cmd: str,
+        port: Optional[int] = None,
+        url: str = "",
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        max_lines: int = DEFAULT_LOG_LINES,
+    ) -> ManagedService:
+        service = ManagedService(name=name, cmd=cmd, port=port, url=url, max_lines=max_lines)
+        self.services[name] = service
+        await service.start(cwd=cwd, env=env)
+        return service
+
+    async def stop(self):
+        for service in reversed(list(self.services.values())):
+            await service.stop(grace=self.grace)
+
+    async def __aenter__(self) -> "ServiceGroup":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def env_port(name: str) -> Optional[int]:
+    """Return the port in the environment variable `name`, e.g. `APP_PORT_2`."""
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() else None
+
+
+def wait_ready_command(port: int | str, host: str = "localhost", timeout: int = DEFAULT_READY_TIMEOUT) -> str:
+    """Return the shell command waiting with an exponential backoff until `host:port` accepts connections.
+
+    :param port: The port, or a shell expression of it such as `$APP_PORT_2`.
+    """
+    script = f"""
+PORT="{port}"; HOST={shlex.quote(host)}; DEADLINE=$(( SECONDS + {int(timeout)} )); DELAY=0.1
+until (exec 3<>"/dev/tcp/$HOST/$PORT") 2>/dev/null; do
+  if [ "$SECONDS" -ge "$DEADLINE" ]; then echo "not ready: $HOST:$PORT after {int(timeout)}s"; exit 1; fi
+  sleep "$DELAY"
+  DELAY=$(awk -v d="$DELAY" 'BEGIN {{ d *= 2; print (d > 2 ? 2 : d) }}')
+done
+echo "ready: $HOST:$PORT after ${{SECONDS}}s"
+"""
+    return f"bash -c {shlex.quote(script)}"
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : stream_output_parser.py
+@Desc    : Incremental parser of the structured output of an `ActionNode` fill, fed with the LLM stream chunks.
+
+    `ActionNode._aask_v1` used to wait for the whole reply before parsing it. With `LLMConfig.stream`, the chunks are
+    fed to a `StreamingOutputParser` as they arrive (see `metagpt.logs.llm_stream_listener`):
+    - `json`: the `[CONTENT]{...}[/CONTENT]` object is scanned for its top-level key/value pairs,
+    - `markdown`: the `## key` blocks are split as `OutputParser.parse_data_with_mapping` does.
+
+    Every completed field is validated against the output class and published to the `partial_output_listener`s, e.g.
+    to show the PRD fields in the front-end while the rest is generated. A reply that can no longer be parsed into the
+    output class, such as a field of the wrong type, raises `StreamingParseError` at once: the attempt is abandoned
+    without waiting for the rest of the reply, and `_aask_v1` retries after its usual `wait_random_exponential` backoff.
+
+    The full reply is still parsed and repaired as before once it is complete, this parser only looks ahead.
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from metagpt.logs import logger
+from metagpt.utils.common import OutputParser
+
+# A json reply with neither a `[CONTENT]` tag nor a `{` in its first characters is not going to be parsed
+DEFAULT_MAX_PREAMBLE = 4096
+
+_JSON_TOKENS = re.compile(r'["\\{}\[\],]')
+
+
+class StreamingParseError(ValueError):
+    """Raised while streaming when the reply cannot be parsed into the output class anymore."""
+
+
+@dataclass
+class PartialOutput:
+    """A field of an `ActionNode` output completed while streaming."""
+
+    node: str
+    key: str
+    value: Any
+    fields: Dict[str, Any] = field(default_factory=dict)  # all the fields completed so far
+
+
+_partial_output_listeners: contextvars.ContextVar[Tuple[Callable[[PartialOutput], None], ...]] = contextvars.ContextVar(
+    "partial_output_listeners", default=()
+)
+
+
+@contextmanager
+def partial_output_listener(func: Callable[[PartialOutput], None]):
+    """Pass the fields completed by the `ActionNode` fills of the enclosed code, and of the tasks it creates, to
+    `func`"""
+    token = _partial_output_listeners.set(_partial_output_listeners.get() + (func,))
+    try:
+        yield
+    finally:
+        _partial_output_listeners.reset(token)
+
+
+@lru_cache(maxsize=1024)
+def _field_adapter(output_class: Type[BaseModel], key: str) -> TypeAdapter:
+    return TypeAdapter(output_class.model_fields[key].annotation)
+
+
+class StreamingOutputParser:
+    """Parse the reply of an `ActionNode` fill chunk by chunk.
+
+    :param output_class: The output class of the fill, its fields are validated as they complete.
+    :param schema: `json` or `markdown`, the format of the reply.
+    :param mapping: The output data mapping of the fill, used by the markdown parser.
+    :param node: The key of the node, for the listeners.
+    :param max_preamble: Characters of a json reply allowed before its `[CONTENT]` tag or object starts, None for no
+        limit. Once the tag is seen, the object may start after any amount of text.
+    """
+
+    def __init__(
+        self,
+        output_class: Type[BaseModel],
+        schema: str = "json",
+        mapping: Optional[dict] = None,
+        node: str = "",
+        max_preamble: Optional[int] = DEFAULT_MAX_PREAMBLE,
+    ):
+        self.output_class = output_class
+        self.schema = schema
+        self.mapping = mapping or {}
+        self.node = node
+        self.max_preamble = max_preamble
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._keys = {k.lower(): k for k in output_class.model_fields}  # the repair fixes the case of the keys
+        self._buffer = ""
+        self._start: Optional[int] = None  # where the object / blocks start
+        self._tag = -1  # where the `[CONTENT]` tag of a json reply is
+        self._pos = 0  # scanned up to here
+        # json scanner
+        self._depth = 0
+        self._in_string = False
+        self._escaped = -1  # index of the escaped character
+        self._pair_start = 0
+        self._unparsed = 0  # pairs not parsable without the repair
+
+    def feed(self, chunk: str):
+        """Parse a chunk of the reply, raise `StreamingParseError` if the reply is hopeless."""
+        if self.done or not chunk:
+            return
+        self._buffer += chunk
+        if self.schema == "json":
+            self._feed_json()
+        else:
+            self._feed_markdown()
+
+    def _feed_json(self):
+        if self._start is None:
+            self._start = self._find_json_start()
+            if self._start is None:
+                if self._tag < 0 and self.max_preamble is not None and len(self._buffer) > self.max_preamble:
+                    raise StreamingParseError(f"No json object in the first {self.max_preamble} characters")
+                return
+            self._pos = self._start
+
+        buffer = self._buffer
+        for match in _JSON_TOKENS.finditer(buffer, self._pos):
+            token, i = match.group(), match.start()
+            if self._in_string:
+                if i == self._escaped:
+                    continue
+                if token == "\\":
+                    self._escaped = i + 1
+                elif token == '"':
+                    self._in_string = False
+                continue
+            if token == '"':
+                self._in_string = True
+            elif token in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._pair_start = i + 1
+            elif token in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_pair(buffer[self._pair_start : i])
+                    self._complete_object()
+                    return
+            elif token == "," and self._depth == 1:
+                self._complete_pair(buffer[self._pair_start : i])
+                self._pair_start = i + 1
+        self._pos = len(buffer)
+
+    def _find_json_start(self) -> Optional[int]:
+        if self._tag < 0:
+            self._tag = self._buffer.find("[CONTENT]")
+        if self._tag >= 0:
+            start = self._buffer.find("{", self._tag)
+            return start if start >= 0 else None
+        stripped = self._buffer.lstrip()
+        if stripped.startswith("{"):
+            return len(self._buffer) - len(stripped)
+        return None
+
+    def _complete_pair(self, text: str):
+        if not text.strip():
+            return
+        try:
+            pair = json.loads("{" + text + "}", strict=False)
+        except json.JSONDecodeError:
+            self._unparsed += 1  # left to the repair of the full reply
+            return
+        for key, value in pair.items():
+            self._complete_field(key, value)
+
+    def _complete_object(self):
+        self.done = True
+        if self._unparsed:
+            return
+        missing = [k for k, v in self.output_class.model_fields.items() if v.is_required() and k not in self.fields]
+        if missing:
+            raise StreamingParseError(f"Missing fields {missing} in {self.node}")
+
+    def _feed_markdown(self):
+        if self._start is None:
+            tag = self._buffer.find("[CONTENT]")
+            if tag < 0:
+                return
+            self._start = self._pos = tag + len("[CONTENT]")
+
+        buffer = self._buffer
+        end = buffer.find("[/CONTENT]", max(self._pos - len("[/CONTENT]"), self._start))
+        limit = end if end >= 0 else len(buffer)
+        while True:
+            i = buffer.find("##", max(self._pos - 1, self._start), limit)
+            if i < 0:
+                break
+            self._complete_block(buffer[self._start : i])
+            self._start = self._pos = i + 2
+        if end >= 0:
+            self._complete_block(buffer[self._start : end])
+            self.done = True
+            return
+        self._pos = len(buffer)
+
+    def _complete_block(self, text: str):
+        if not text.strip():
+            return
+        try:
+            parsed = OutputParser.parse_data_with_mapping(f"##{text}", self.mapping)
+        except Exception:
+            return  # left to the parser of the full reply
+        for key, value in parsed.items():
+            self._complete_field(key, value)
+
+    def _complete_field(self, key: str, value: Any):
+        key = self._keys.get(key.lower()) if isinstance(key, str) else None
+        if key is None:
+            return
+        try:
+            value = _field_adapter(self.output_class, key).validate_python(value)
+        except ValidationError as e:
+            raise StreamingParseError(f"Invalid field {key} of {self.node}: {e}") from e
+        self.fields[key] = value
+        event = PartialOutput(node=self.node, key=key, value=value, fields=dict(self.fields))
+        for listener in _partial_output_listeners.get():
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Partial output listener failed: {e}")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : team_checkpoint.py
+@Desc    : Incremental checkpoints of a `Team`.
+
+    A checkpoint directory holds
+    - `team.json`: a full snapshot, the same data as before plus a unique `_checkpoint` generation,
+    - `team.journal.jsonl`: one line per `Team.serialize` since the snapshot, holding only what changed: the new
+      messages of each role's memories, and the role / env / team / context fields whose dump changed.
+
+    The journal is compacted into a new snapshot every `compact_every` records or when it outgrows the snapshot.
+    Journal lines of another generation, e.g. left by a crash during a compaction, and a truncated last line are
+    ignored on load.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic_core import to_jsonable_python
+
+from metagpt.logs import logger
+
+JOURNAL_FILENAME = "team.journal.jsonl"
+CHECKPOINT_KEY = "_checkpoint"
+DEFAULT_COMPACT_EVERY = 50
+MEMORY_FIELDS = ("memory", "working_memory")
+_ROLE_FIELDS_EXCLUDE = {"rc": {name: {"storage", "index"} for name in MEMORY_FIELDS}}
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=to_jsonable_python)
+
+
+def _jsonable(data):
+    return json.loads(_dumps(data))
+
+
+def _digest(data) -> str:
+    return hashlib.blake2b(_dumps(data).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _team_context(team) -> dict:
+    context = team.env.context.serialize()
+    last_role = ""
+    for role_name, role in team.env.roles.items():
+        if getattr(role, "use_flag", False):
+            last_role = role_name
+    context["last_role"] = last_role
+    return context
+
+
+def _memory_index(storage: List[dict]) -> Dict[str, List[dict]]:
+    index = defaultdict(list)
+    for message in storage:
+        if message.get("cause_by"):
+            index[message["cause_by"]].append(message)
+    return dict(index)
+
+
+@dataclass
+class _MemoryMark:
+    """How much of a memory is checkpointed, to detect appends from rewrites"""
+
+    count: int = 0
+    last_id: Optional[str] = None
+
+
+@dataclass
+class _RoleMark:
+    fields: str = ""
+    memories: Dict[str, _MemoryMark] = field(default_factory=dict)
+
+
+class TeamCheckpoint:
+    """Write the checkpoints of a team to `path` (the directory of `team.json`).
+
+    :param path: The checkpoint directory.
+    :param compact_every: Journal records written before the next full snapshot.
+    """
+
+    def __init__(self, path: Path | str, compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.generation = ""
+        self._records = 0
+        self._snapshot_size = 0
+        self._journal_size = 0
+        self._digests: Dict[str, str] = {}
+        self._roles: Dict[str, _RoleMark] = {}
+        self._primed = False
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.path / "team.json"
+
+    @property
+    def journal_path(self) -> Path:
+        return self.path / JOURNAL_FILENAME
+
+    def save(self, team):
+        """Checkpoint `team`, appending to the journal or writing a new snapshot."""
+        if (
+            not self._primed
+            or self._records >= self.compact_every
+            or self._journal_size > self._snapshot_size
+            or not self.snapshot_path.exists()
+        ):
+            self.compact(team)
+            return
+        record = self._delta(team)
+        if len(record) == 1:  # nothing but the generation
+            return
+        line = (_dumps(record) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as writer:
+            writer.write(line)
+        self._records += 1
+        self._journal_size += len(line)
+
+    def compact(self, team):
+        """Write a full snapshot of `team` and start an empty journal."""
+        self.generation = uuid.uuid4().hex
+        data = team.model_dump()
+        data["context"] = _team_context(team)
+        data[CHECKPOINT_KEY] = {"generation": self.generation}
+        raw = json.dumps(data, ensure_ascii=False, indent=4, default=to_jsonable_python)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_name(f"team.json.{os.getpid()}.tmp")
+        tmp.write_text(raw, encoding="utf-8")
+        os.replace(tmp, self.snapshot_path)
+        self.journal_path.write_bytes(b"")
+
+        self._snapshot_size = len(raw)
+        self._records = 0
+        self._journal_size = 0
+        self.prime(team, generation=self.generation)
+
+    def prime(self, team, generation: str, restored: bool = False):
+        """Mark the current state of `team` as checkpointed in `generation`.
+
+        :param restored: `team` was loaded from the checkpoint. Its fields may differ from the checkpointed ones, e.g.
+            a new `sid`, so they are all recorded by the next save. Memories are appended to as usual.
+        """
+        self.generation = generation
+        self._digests = {}
+        if not restored:
+            self._digests = {
+                "team": _digest(team.model_dump(exclude={"env"})),
+                "env": _digest(team.env.model_dump(exclude={"roles"})),
+                "context": _digest(_team_context(team)),
+            }
+        self._roles = {}
+        for name, role in team.env.roles.items():
+            self._roles[name] = self._role_mark(role)
+            if restored:
+                self._roles[name].fields = ""
+        if not self._snapshot_size and self.snapshot_path.exists():
+            self._snapshot_size = self.snapshot_path.stat().st_size
+            self._journal_size = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+        self._primed = True
+
+    @staticmethod
+    def _role_mark(role) -> _RoleMark:
+        mark = _RoleMark(fields=_digest(role.model_dump(exclude=_ROLE_FIELDS_EXCLUDE)))
+        for name in MEMORY_FIELDS:
+            storage = getattr(role.rc, name).storage
+            mark.memories[name] = _MemoryMark(count=len(storage), last_id=storage[-1].id if storage else None)
+        return mark
+
+    def _delta(self, team) -> dict:
+        record = {"generation": self.generation}
+        for key, data in (
+            ("team", team.model_dump(exclude={"env"})),
+            ("env", team.env.model_dump(exclude={"roles"})),
+            ("context", _team_context(team)),
+        ):
+            digest = _digest(data)
+            if digest != self._digests.get(key):
+                record[key] = _jsonable(data)
+                self._digests[key] = digest
+
+        roles = {}
+        for name, role in team.env.roles.items():
+            delta = self._role_delta(name, role)
+            if delta:
+                roles[name] = delta
+        if set(self._roles) - set(team.env.roles):
+            record["roles_removed"] = sorted(set(self._roles) - set(team.env.roles))
+            for name in record["roles_removed"]:
+                self._roles.pop(name)
+        if roles:
+            record["roles"] = roles
+        return record
+
+    def _role_delta(self, name: str, role) -> dict:
+        mark = self._roles.get(name)
+        if mark is None:
+            self._roles[name] = self._role_mark(role)
+            return {"full": _jsonable(role.model_dump())}
+
+        delta = {}
+        fields = role.model_dump(exclude=_ROLE_FIELDS_EXCLUDE)
+        digest = _digest(fields)
+        if digest != mark.fields:
+            delta["fields"] = _jsonable(fields)
+            mark.fields = digest
+        for memory_name in MEMORY_FIELDS:
+            storage = getattr(role.rc, memory_name).storage
+            memory_mark = mark.memories[memory_name]
+            appended = (
+                len(storage) >= memory_mark.count
+                and (memory_mark.count == 0 or storage[memory_mark.count - 1].id == memory_mark.last_id)
+            )
+            if appended and len(storage) > memory_mark.count:
+                delta[memory_name] = [_jsonable(i.model_dump()) for i in storage[memory_mark.count :]]
+            elif not appended:
+                delta[f"{memory_name}_reset"] = [_jsonable(i.model_dump()) for i in storage]
+            memory_mark.count = len(storage)
+            memory_mark.last_id = storage[-1].id if storage else None
+        return delta
+
+
+def _apply_record(data: dict, record: dict):
+    if "team" in record:
+        data.update(record["team"])
+    env = data.setdefault("env", {})
+    if "env" in record:
+        env.update(record["env"])
+    if "context" in record:
+        data["context"] = record["context"]
+
+    roles = env.setdefault("roles", {})
+    for name in record.get("roles_removed", []):
+        roles.pop(name, None)
+    for name, delta in record.get("roles", {}).items():
+        if "full" in delta:
+            roles[name] = delta["full"]
+            continue
+        role = roles.setdefault(name, {})
+        if "fields" in delta:
+            previous = role.get("rc", {})
+            role.clear()
+            role.update(delta["fields"])
+            for memory_name in MEMORY_FIELDS:
+                memory = role.setdefault("rc", {}).setdefault(memory_name, {})
+                old = previous.get(memory_name, {})
+                memory["storage"] = old.get("storage", [])
+                memory["index"] = old.get("index", {})
+        for memory_name in MEMORY_FIELDS:
+            memory = role.setdefault("rc", {}).setdefault(memory_name, {})
+            if f"{memory_name}_reset" in delta:
+                memory["storage"] = delta[f"{memory_name}_reset"]
+                memory["index"] = _memory_index(memory["storage"])
+            for message in delta.get(memory_name, []):
+                memory.setdefault("storage", []).append(message)
+                if message.get("cause_by"):
+                    memory.setdefault("index", {}).setdefault(message["cause_by"], []).append(message)
+
+
+def load_checkpoint(team_info_path: Path | str) -> dict:
+    """Return the team data of the checkpoint at `team_info_path`, the snapshot with its journal replayed.
+
+    A plain `team.json` without journal is returned as is.
+    """
+    team_info_path = Path(team_info_path)
+    data = json.loads(team_info_path.read_text(encoding="utf-8"))
+    journal_path = team_info_path.with_name(JOURNAL_FILENAME)
+    generation = data.get(CHECKPOINT_KEY, {}).get("generation")
+    if generation is None or not journal_path.exists():
+        return data
+
+    with open(journal_path, "r", encoding="utf-8") as reader:
+        for line in reader:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignore the truncated record of {journal_path}")
+                break
+            if record.get("generation") == generation:
+                _apply_record(data, record)
+    return data
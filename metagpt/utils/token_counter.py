@@ -10,6 +10,12 @@ ref3: https://github.com/Significant-Gravitas/Auto-GPT/blob/master/autogpt/llm/t
 ref4: https://github.com/hwchase17/langchain/blob/master/langchain/chat_models/openai.py
 ref5: https://ai.google.dev/models/gemini
 """
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
 import anthropic
 import tiktoken
 from openai.types import CompletionUsage
@@ -380,21 +386,112 @@ SPARK_TOKENS = {
 }
 
 
-def count_input_tokens(messages, model="gpt-3.5-turbo-0125"):
-    """Return the number of tokens used by a list of messages."""
+# Texts at least this long have their token counts cached by content hash, e.g. repeated system prompts and documents
+TOKEN_COUNT_CACHE_MIN_LENGTH = 64
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Return the tiktoken encoding of `model`, memoized per model."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.info(f"Warning: model {model} not found in tiktoken. Using cl100k_base encoding.")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=1)
+def _anthropic_client() -> anthropic.Client:
+    return anthropic.Client()
+
+
+class TokenCountCache:
+    """LRU cache of token counts keyed by (encoding, hash of the text)."""
+
+    def __init__(self, maxsize: int = TOKEN_COUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encoding_name: str, text: str):
+        return encoding_name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get(self, key) -> Optional[int]:
+        with self._lock:
+            count = self._data.get(key)
+            if count is not None:
+                self._data.move_to_end(key)
+            return count
+
+    def set(self, key, count: int):
+        with self._lock:
+            self._data[key] = count
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+TOKEN_COUNT_CACHE = TokenCountCache()
+
+
+def approximate_tokens(text: str) -> int:
+    """A fast estimate without a tokenizer: about 4 ASCII characters per token, 1 token per other character."""
+    non_ascii = sum(1 for c in text if ord(c) > 127) if not text.isascii() else 0
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+def count_tokens_batch(texts: list[str], model: str = "gpt-3.5-turbo-0125", approximate: bool = False) -> list[int]:
+    """Return the number of tokens of each text, encoding all uncached texts in one call."""
+    if approximate:
+        return [approximate_tokens(i) for i in texts]
+    encoding = get_encoding(model)
+    counts = [0] * len(texts)
+    misses, miss_indexes, miss_keys = [], [], []
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        if len(text) < TOKEN_COUNT_CACHE_MIN_LENGTH:
+            misses.append(text)
+            miss_indexes.append(i)
+            miss_keys.append(None)
+            continue
+        key = TOKEN_COUNT_CACHE.key(encoding.name, text)
+        count = TOKEN_COUNT_CACHE.get(key)
+        if count is None:
+            misses.append(text)
+            miss_indexes.append(i)
+            miss_keys.append(key)
+        else:
+            counts[i] = count
+    if misses:
+        encoded = encoding.encode_batch(misses) if len(misses) > 1 else [encoding.encode(misses[0])]
+        for i, key, tokens in zip(miss_indexes, miss_keys, encoded):
+            counts[i] = len(tokens)
+            if key is not None:
+                TOKEN_COUNT_CACHE.set(key, counts[i])
+    return counts
+
+
+def count_input_tokens(messages, model="gpt-3.5-turbo-0125", approximate: bool = False):
+    """Return the number of tokens used by a list of messages.
+
+    With `approximate`, tokens are estimated without a tokenizer, which also works for models of unknown message
+    format.
+    """
     if "claude" in model:
         # rough estimation for models newer than claude-2.1
-        vo = anthropic.Client()
+        vo = _anthropic_client()
         num_tokens = 0
         for message in messages:
             for key, value in message.items():
                 num_tokens += vo.count_tokens(str(value))
         return num_tokens
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.info(f"Warning: model {model} not found in tiktoken. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -431,10 +528,10 @@ def count_input_tokens(messages, model="gpt-3.5-turbo-0125"):
         tokens_per_name = -1  # if there's a name, the role is omitted
     elif "gpt-3.5-turbo" == model:
         logger.info("Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0125.")
-        return count_input_tokens(messages, model="gpt-3.5-turbo-0125")
+        return count_input_tokens(messages, model="gpt-3.5-turbo-0125", approximate=approximate)
     elif "gpt-4" == model:
         logger.info("Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
-        return count_input_tokens(messages, model="gpt-4-0613")
+        return count_input_tokens(messages, model="gpt-4-0613", approximate=approximate)
     elif "open-llm-model" == model:
         """
         For self-hosted open_llm api, they include lots of different models. The message tokens calculation is
@@ -442,6 +539,9 @@ def count_input_tokens(messages, model="gpt-3.5-turbo-0125"):
         """
         tokens_per_message = 0  # ignore conversation message template prefix
         tokens_per_name = 0
+    elif approximate:
+        tokens_per_message = 3
+        tokens_per_name = 1
     else:
         raise NotImplementedError(
             f"num_tokens_from_messages() is not implemented for model {model}. "
@@ -449,6 +549,7 @@ def count_input_tokens(messages, model="gpt-3.5-turbo-0125"):
             f"for information on how messages are converted to tokens."
         )
     num_tokens = 0
+    contents = []
     for message in messages:
         num_tokens += tokens_per_message
         for key, value in message.items():
@@ -458,34 +559,31 @@ def count_input_tokens(messages, model="gpt-3.5-turbo-0125"):
                 for item in value:
                     if isinstance(item, dict) and item.get("type") in ["text"]:
                         content = item.get("text", "")
-            num_tokens += len(encoding.encode(content))
+            contents.append(content)
             if key == "name":
                 num_tokens += tokens_per_name
+    num_tokens += sum(count_tokens_batch(contents, model, approximate=approximate))
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
     return num_tokens
 
 
-def count_output_tokens(string: str, model: str) -> int:
+def count_output_tokens(string: str, model: str, approximate: bool = False) -> int:
     """
     Returns the number of tokens in a text string.
 
     Args:
         string (str): The text string.
         model (str): The name of the encoding to use. (e.g., "gpt-3.5-turbo")
+        approximate (bool): Estimate without a tokenizer.
 
     Returns:
         int: The number of tokens in the text string.
     """
     if "claude" in model:
-        vo = anthropic.Client()
+        vo = _anthropic_client()
         num_tokens = vo.count_tokens(string)
         return num_tokens
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.info(f"Warning: model {model} not found in tiktoken. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(string))
+    return count_tokens_batch([string], model, approximate=approximate)[0]
 
 
 def get_max_completion_tokens(messages: list[dict], model: str, default: int) -> int:
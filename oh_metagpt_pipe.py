@@ -1,11 +1,12 @@
 
 from metagpt.software_company import generate_repo
 from metagpt.utils.project_repo import ProjectRepo
+from metagpt.utils.oh_action_bus import FifoSink, oh_action_bus
 import os
 from time import sleep
 import base64
 
-from metagpt.pipe_files import get_pipes, set_pipes, write_pipe_message_with_len, read_pipe_message_with_len,init_pipe_files,get_pipeout,set_pipein
+from metagpt.pipe_files import get_pipes, set_pipes, read_pipe_message_with_len,init_pipe_files,get_pipeout,set_pipein
 from metagpt.pipe_files import get_metagpt_to_openhands_file_pipe,get_openhands_to_metagpt_file_pipe,set_metagpt_to_openhands_file_pipe,set_openhands_to_metagpt_file_pipe
 
 set_metagpt_to_openhands_file_pipe("/tmp/metagpt_to_openhands_pipe")
@@ -13,12 +14,7 @@ set_openhands_to_metagpt_file_pipe("/tmp/openhands_to_metagpt_pipe")
 init_pipe_files()
 #pipeout = get_pipeout()
 
-class MetaGPTWrite:
-    def write(self, message):
-        if message is not None and len(message) > 0 and message.find("<OH_ACTION>") != -1:
-            write_pipe_message_with_len(get_pipeout(),message)
-
-stream_object = MetaGPTWrite()
+oh_action_bus.subscribe(FifoSink(get_pipeout()))
 
 def cleanup_pipe_file():
     """清理管道文件并处理异常"""
@@ -47,7 +43,7 @@ while True:
                 project_name = cmd_str[idx_for_launch+len("LaunchProject: "):]
                 print("Launching project: " + project_name)
                 try:
-                    generate_repo(project_name, logger_stream_obj = stream_object)    
+                    generate_repo(project_name)    
                 finally:
                     cleanup_pipe_file()
             else:
@@ -10,15 +10,23 @@ from typing import List, Optional, Tuple
 
 import pytest
 from pydantic import BaseModel, Field, ValidationError
+from tenacity import wait_none
 
 from metagpt.actions import Action
-from metagpt.actions.action_node import ActionNode, ReviewMode, ReviseMode
+from metagpt.actions.action_node import (
+    SCHEMA_CACHE,
+    ActionNode,
+    ReviewMode,
+    ReviseMode,
+)
 from metagpt.environment import Environment
 from metagpt.llm import LLM
+from metagpt.logs import log_llm_stream
 from metagpt.roles import Role
 from metagpt.schema import Message
 from metagpt.team import Team
 from metagpt.utils.common import encode_image
+from metagpt.utils.stream_output_parser import partial_output_listener
 
 
 @pytest.mark.asyncio
@@ -316,5 +324,72 @@ def test_optional():
     assert t1
 
 
+def test_schema_cache():
+    node = ActionNode.from_children(
+        "Plan",
+        [
+            ActionNode(key="Task list", expected_type=List[str], instruction="tasks", example=["a.py"]),
+            ActionNode(key="Plan", expected_type=str, instruction="plan", example="do it"),
+        ],
+    )
+    SCHEMA_CACHE.clear()
+    cls = node.create_class()
+    instruction = node.compile_instruction()
+    example = node.compile_example(tag="CONTENT")
+    misses = SCHEMA_CACHE.misses
+
+    assert node.create_class() is cls
+    assert node._create_children_class() is cls
+    assert node.compile_instruction() == instruction
+    assert node.compile_example(tag="CONTENT") == example
+    assert node.get_field_names() == cls.model_fields.keys()
+    assert SCHEMA_CACHE.misses == misses
+
+    # a changed schema is not served from the cache
+    node.get_child("Plan").instruction = "the plan"
+    assert "the plan" in node.compile_instruction()
+    assert node.create_class(exclude=["Plan"]).model_fields.keys() == {"Task list"}
+    node.add_child(ActionNode(key="Risk", expected_type=str, instruction="risk", example=""))
+    assert "Risk" in node.create_class().model_fields
+
+
+class StreamLLM:
+    """Streams the replies chunk by chunk, one reply per call"""
+
+    def __init__(self, replies: List[str]):
+        self.replies = replies
+        self.chunks = 0
+
+    async def aask(self, *args, **kwargs) -> str:
+        reply = self.replies.pop(0)
+        for i in range(0, len(reply), 8):
+            log_llm_stream(reply[i : i + 8])
+            self.chunks += 1
+        return reply
+
+
+@pytest.mark.asyncio
+async def test_action_node_streaming_fill(mocker):
+    mocker.patch.object(ActionNode._aask_v1.retry, "wait", wait_none())
+    node = ActionNode.from_children(
+        "Plan",
+        [
+            ActionNode(key="Task list", expected_type=List[str], instruction="tasks", example=["a.py"]),
+            ActionNode(key="Plan", expected_type=str, instruction="plan", example="do it"),
+        ],
+    )
+    hopeless = '[CONTENT]\n{"Task list": "a.py", "Plan": "' + "x" * 1000 + '"}\n[/CONTENT]'
+    good = '[CONTENT]\n{"Task list": ["a.py"], "Plan": "do it"}\n[/CONTENT]'
+    llm = StreamLLM([hopeless, good])
+    node.set_llm(llm)
+    events = []
+    with partial_output_listener(events.append):
+        await node.fill(context="", llm=llm, schema="json")
+
+    assert node.instruct_content.model_dump() == {"Task list": ["a.py"], "Plan": "do it"}
+    assert llm.chunks < len(hopeless) // 8  # the hopeless reply was cut short
+    assert [i.key for i in events] == ["Task list", "Plan"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
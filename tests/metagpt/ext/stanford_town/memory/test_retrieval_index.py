@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of RetrievalIndex
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from metagpt.ext.stanford_town.memory.agent_memory import AgentMemory
+from metagpt.ext.stanford_town.memory.retrieve import agent_retrieve, new_agent_retrieve
+
+DIM = 16
+NOW = datetime(2023, 2, 13, 12)
+
+
+def embedding(text: str) -> list[float]:
+    return np.random.default_rng(abs(hash(text)) % 2**32).normal(size=DIM).tolist()
+
+
+def build_memory(count: int) -> AgentMemory:
+    memory = AgentMemory()
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        created = NOW - timedelta(days=int(rng.integers(0, 30)), hours=int(rng.integers(0, 24)))
+        key = "is idle" if i % 7 == 0 else f"event {i}"
+        add = memory.add_thought if i % 3 == 0 else (memory.add_chat if i % 11 == 0 else memory.add_event)
+        add(created, None, "s", "p", "o", key, [], int(rng.integers(1, 10)), (key, embedding(key)), [])
+    return memory
+
+
+def reference_retrieve(memory: AgentMemory, query: str, k: int) -> list[str]:
+    """the scoring of GA, one memory at a time"""
+
+    def normalize(values):
+        low, high = min(values), max(values)
+        return [0.5] * len(values) if high == low else [(v - low) / (high - low) for v in values]
+
+    nodes = [i for i in memory.event_list + memory.thought_list if "idle" not in i.embedding_key]
+    q = np.array(embedding(query))
+    relevance = []
+    for node in nodes:
+        e = np.array(memory.embeddings[node.embedding_key])
+        relevance.append(float(e @ q / (np.linalg.norm(e) * np.linalg.norm(q))))
+    importance = normalize([i.poignancy for i in nodes])
+    recency = normalize([0.99 ** (NOW - i.created).days for i in nodes])
+    relevance = normalize(relevance)
+    scores = {n.memory_id: importance[i] + recency[i] + relevance[i] for i, n in enumerate(nodes)}
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def test_retrieval_index(mocker):
+    mocker.patch("metagpt.ext.stanford_town.memory.retrieve.get_embedding", side_effect=embedding)
+    mocker.patch(
+        "metagpt.ext.stanford_town.memory.retrieve.get_embeddings", side_effect=lambda texts: list(map(embedding, texts))
+    )
+    memory = build_memory(600)  # past the initial capacity
+    assert memory.retrieval_index.size == len(memory.storage)
+
+    focal_points = ["who do I love?", "the party"]
+    role = SimpleNamespace(memory=memory, scratch=SimpleNamespace(curr_time=NOW, recency_decay=0.99))
+    retrieved = new_agent_retrieve(role, focal_points, 10)
+    for focal_pt in focal_points:
+        assert [i.memory_id for i in retrieved[focal_pt]] == reference_retrieve(memory, focal_pt, 10)
+        assert all(i.last_accessed == NOW for i in retrieved[focal_pt])
+        assert all(i.memory_type in ("event", "thought") and "idle" not in i.embedding_key for i in retrieved[focal_pt])
+
+    nodes = memory.event_list[:5]
+    result = agent_retrieve(memory, NOW, 0.99, "the party", nodes, 3)
+    assert len(result) == 3 and set(result) <= {i.memory_id for i in nodes}
+
+    # new memories are indexed on the next retrieval, copies get their own index
+    memory.add_event(NOW, None, "s", "p", "o", "new", [], 10, ("new", embedding("new")), [])
+    assert memory.retrieval_index.size == len(memory.storage)
+    copy = memory.model_copy()
+    assert copy.retrieval_index is not memory.retrieval_index
+    assert new_agent_retrieve(role, []) == {}
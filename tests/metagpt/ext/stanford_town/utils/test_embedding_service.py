@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of EmbeddingService
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EmbeddingProvider,
+    EmbeddingService,
+    LocalEmbeddingProvider,
+)
+from metagpt.ext.stanford_town.utils.utils import (
+    aget_embeddings,
+    get_embedding,
+    get_embeddings,
+)
+
+
+class CountingProvider(LocalEmbeddingProvider):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.batches = []
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        return super().embed(texts)
+
+
+def test_embedding_service(tmp_path):
+    provider = CountingProvider()
+    service = EmbeddingService(provider, cache_size=5, batch_window=0.2)
+    idle = service.embed("Isabella is idle")
+    assert idle == LocalEmbeddingProvider(dim=64).embed(["Isabella is idle"])[0]
+    assert np.dot(idle, service.embed("Klaus is idle")) > np.dot(idle, service.embed("bed is being used"))
+    assert service.embed("") == service.embed("this is blank")
+
+    # concurrent misses share one provider call, repeated texts are requested once
+    provider.batches.clear()
+    texts = ["a", "b", "a", "c", "Isabella is idle"]
+    with ThreadPoolExecutor(len(texts)) as executor:
+        embeddings = list(executor.map(service.embed, texts))
+    assert [sorted(i) for i in provider.batches] == [["a", "b", "c"]]
+    assert embeddings[0] == embeddings[2] and service.provider_calls == 5
+    assert service.key_of("Klaus is idle") not in service._cache  # the least recently used
+
+    # the LRU cache is saved and loaded
+    service.save(tmp_path / "embedding_cache.json")
+    loaded = EmbeddingService(CountingProvider())
+    loaded.load(tmp_path / "embedding_cache.json")
+    assert loaded.embed_many(["b", "c", "Isabella is idle"]) == [embeddings[1], embeddings[3], idle]
+    assert loaded.provider.batches == []
+
+    # only the entries of the given texts, e.g. the memories of one agent
+    service.save(tmp_path / "agent_cache.json", texts=["b", "Isabella is idle", "never embedded"])
+    loaded = EmbeddingService(CountingProvider())
+    loaded.load(tmp_path / "agent_cache.json")
+    assert sorted(loaded._cache) == sorted([service.key_of("b"), service.key_of("Isabella is idle")])
+
+
+def test_get_embedding():
+    service = EmbeddingService.for_model("local")
+    EmbeddingService.set_default(service)
+    try:
+        assert get_embedding("the party\non Valentine's day") == get_embedding("the party on Valentine's day")
+        assert len(get_embeddings(["x", "y"])) == 2 and service.provider_calls == 2
+        assert get_embeddings([]) == []
+    finally:
+        EmbeddingService.set_default(None)
+
+    class FailingProvider(LocalEmbeddingProvider):
+        def embed(self, texts: list[str]) -> list[list[float]]:
+            raise ValueError("get_embedding failed")
+
+    with pytest.raises(ValueError):
+        EmbeddingService(FailingProvider()).embed("x")
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
+
+
+@pytest.mark.asyncio
+async def test_aget_embeddings():
+    provider = CountingProvider()
+    service = EmbeddingService(provider, batch_window=0.2)
+    EmbeddingService.set_default(service)
+    try:
+        # the roles running concurrently on the event loop share one provider call
+        rsps = await asyncio.gather(aget_embeddings(["a", "b"]), aget_embeddings(["b", "c"]), aget_embeddings(["d"]))
+    finally:
+        EmbeddingService.set_default(None)
+    assert [sorted(i) for i in provider.batches] == [["a", "b", "c", "d"]]
+    assert rsps[0][1] == rsps[1][0] == service.embed("b")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of PathPlanner
+
+from metagpt.ext.stanford_town.utils.const import collision_block_id
+from metagpt.ext.stanford_town.utils.path_planner import PathPlanner
+from metagpt.ext.stanford_town.utils.utils import path_finder
+
+B = collision_block_id
+
+
+def test_path_finder():
+    maze = [
+        ["0", "0", "0", "0"],
+        ["0", B, B, "0"],
+        ["0", "0", B, "0"],
+        [B, "0", "0", "0"],
+    ]
+    # path_finder works on (x, y)
+    assert path_finder(maze, [0, 0], [1, 3], B) == [(0, 0), (0, 1), (0, 2), (1, 2), (1, 3)]
+    assert path_finder(maze, [2, 2], [2, 2], B) == [(2, 2)]
+    assert path_finder(maze, [0, 0], [1, 1], B) == [(1, 1)]  # unreachable
+    assert PathPlanner.for_maze(maze, B) is PathPlanner.for_maze(maze, B)
+
+    maze[2][1] = B
+    PathPlanner.invalidate(maze)
+    path = path_finder(maze, [0, 0], [1, 3], B)
+    assert len(path) == 9 and (1, 2) not in path  # around by the right
+
+
+def test_long_path():
+    maze = [["0"] * 140 for _ in range(100)]
+    for i in range(1, 100, 2):  # a serpentine corridor, far longer than 150 steps
+        gap = 139 if i % 4 == 1 else 0
+        maze[i] = [B if j != gap else "0" for j in range(140)]
+    planner = PathPlanner(maze, B)
+    path = planner.find_path((0, 0), (98, 0))
+    assert len(path) > 5000
+    assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+    assert all(maze[i][j] != B for i, j in path)
+
+    for j in range(planner.cache_size + 1):
+        planner.find_path((2, j), (98, 0))
+    assert len(planner._fields) == planner.cache_size
@@ -55,3 +55,58 @@ def test_memory():
     memory.clear()
     assert memory.count() == 0
     assert len(memory.index) == 0
+
+
+def test_memory_indexes():
+    memory = Memory()
+    messages = [Message(content=f"message {i}", role=f"user{i % 2}", sent_from=f"role{i % 3}") for i in range(10)]
+    memory.add_batch(messages)
+    memory.add(messages[3].model_copy())  # an equal message is not added twice
+    assert memory.count() == 10
+
+    assert memory.get_by_role("user1") == messages[1::2]
+    assert memory.get_by_sent_from("role0") == messages[0::3]
+
+    new = Message(content="new message")
+    assert memory.find_news([messages[0], new, messages[9]]) == [new]
+    assert memory.find_news([messages[0], new, messages[9]], k=2) == [messages[0], new]
+
+    memory.delete(messages[4])
+    assert memory.get_by_role("user0") == [messages[i] for i in (0, 2, 6, 8)]
+    assert memory.find_news([messages[4]]) == [messages[4]]
+
+    # messages put in storage directly are indexed on the next call
+    memory.storage.append(new)
+    assert memory.get_by_role("user") == [new]
+    memory.storage = messages[:2]
+    assert memory.get_by_role("user1") == [messages[1]]
+
+    copied = memory.model_copy(deep=True)
+    copied.delete_newest()
+    assert copied.get_by_role("user1") == []
+    assert memory.get_by_role("user1") == [messages[1]]
+
+
+def test_memory_ignore_id():
+    memory = Memory(ignore_id=True)
+    memory.add(Message(content="a"))
+    memory.add(Message(content="a"))
+    memory.add(Message(content="b"))
+    assert memory.count() == 2
+    news = memory.find_news([Message(id="0", content="a"), Message(id="0", content="c")])
+    assert [i.content for i in news] == ["c"]
+
+
+def test_memory_keyword_index():
+    contents = ["write a snake game", "snake", "2048 game", "sn", "the snack bar", ""]
+    scan, indexed = Memory(), Memory(keyword_index=True)
+    for content in contents:
+        scan.add(Message(content=content))
+        indexed.add(Message(content=content))
+    indexed.delete_newest()
+    scan.delete_newest()
+
+    for keyword in ["snake", "nak", "sn", "game", "snake game", "missing", "s"]:
+        assert [m.content for m in indexed.try_remember(keyword)] == [m.content for m in scan.try_remember(keyword)]
+        assert [m.content for m in indexed.get_by_content(keyword)] == [m.content for m in scan.get_by_content(keyword)]
+    assert "keyword_index" not in indexed.model_dump()
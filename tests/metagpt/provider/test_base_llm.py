@@ -9,8 +9,10 @@
 import pytest
 
 from metagpt.configs.llm_config import LLMConfig
+from metagpt.logs import llm_stream_listener
 from metagpt.provider.base_llm import BaseLLM
 from metagpt.schema import Message
+from metagpt.utils.llm_cache import LLMCacheMissError
 from tests.metagpt.provider.mock_llm_config import mock_llm_config
 from tests.metagpt.provider.req_resp_const import (
     default_resp_cont,
@@ -104,3 +106,55 @@ async def test_async_base_llm():
 
     # resp = await base_llm.aask_code([prompt])
     # assert resp == default_resp_cont
+
+
+@pytest.mark.asyncio
+async def test_base_llm_response_cache(tmp_path):
+    class CountingLLM(MockBaseLLM):
+        calls = 0
+
+        async def acompletion_text(self, messages: list[dict], stream=False, timeout=3) -> str:
+            self.calls += 1
+            return f"{default_resp_cont} {self.calls}"
+
+    path = str(tmp_path / "llm_cache.sqlite3")
+    record = CountingLLM(
+        mock_llm_config.model_copy(update={"cache_mode": "record", "cache_backend": "sqlite", "cache_path": path})
+    )
+    assert await record.aask(prompt) == f"{default_resp_cont} 1"
+    assert await record.aask(prompt) == f"{default_resp_cont} 2"
+
+    replay = CountingLLM(record.config.model_copy(update={"cache_mode": "replay"}))
+    assert await replay.aask(prompt) == f"{default_resp_cont} 2"
+    assert replay.calls == 0
+    with pytest.raises(LLMCacheMissError):
+        await replay.aask("another prompt")
+
+    read_through = CountingLLM(record.config.model_copy(update={"cache_mode": "on"}))
+    assert await read_through.aask("another prompt") == f"{default_resp_cont} 1"
+    assert await read_through.aask("another prompt") == f"{default_resp_cont} 1"
+    assert read_through.calls == 1
+
+    chunks = []
+    with llm_stream_listener(chunks.append):
+        assert await read_through.aask("another prompt", stream=True) == f"{default_resp_cont} 1"
+        assert await read_through.aask("another prompt", stream=False) == f"{default_resp_cont} 1"
+    assert chunks == [f"{default_resp_cont} 1", "\n"]
+    assert read_through.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_base_llm_response_cache_tools():
+    llm = MockBaseLLM(mock_llm_config.model_copy(update={"cache_mode": "on", "cache_max_entries": 8}))
+    messages = [{"role": "user", "content": prompt}]
+    calls = []
+
+    async def _call():
+        calls.append(1)
+        return str(len(calls))
+
+    tools = [{"type": "function", "function": {"name": "f"}}]
+    assert await llm._acached(messages, _call, tools=tools) == "1"
+    assert await llm._acached(messages, _call, tools=tools) == "1"
+    assert await llm._acached(messages, _call, tools=tools, tool_choice="auto") == "2"
+    assert await llm._acached(messages, _call) == "3"
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_llm_client_pool.py
+@Desc: Unit tests for llm_client_pool.py
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from metagpt.context import Context
+from metagpt.provider.llm_client_pool import LLMClientPool, LoopLocalTransport
+from tests.metagpt.provider.mock_llm_config import (
+    mock_llm_config,
+    mock_llm_config_proxy,
+)
+
+
+def test_llm_client_pool_key():
+    pool = LLMClientPool()
+    client = pool.get(mock_llm_config)
+    assert pool.get(mock_llm_config.model_copy()) is client
+    assert pool.get(mock_llm_config_proxy) is not client
+    assert pool.get(mock_llm_config.model_copy(update={"api_key": "other_key"})) is not client
+    assert len(pool) == 3
+
+    pool.clear()
+    assert pool.get(mock_llm_config) is not client
+
+
+def test_loop_local_transport():
+    transport = LoopLocalTransport(limits=httpx.Limits(max_connections=2))
+
+    async def _get():
+        first = transport._get_transport()
+        assert transport._get_transport() is first
+        return first
+
+    first = asyncio.run(_get())
+    second = asyncio.run(_get())
+    assert first is not second
+
+    async def _close():
+        transport._get_transport()
+        count = transport.loop_count
+        await transport.aclose()
+        return count - transport.loop_count
+
+    assert asyncio.run(_close()) == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_client_pool_request():
+    pool = LLMClientPool()
+    client = pool.get(mock_llm_config)
+    transport = client._transport
+    assert isinstance(transport, LoopLocalTransport)
+    assert transport.transport_kwargs["limits"] == pool.limits
+
+    transport._transports[asyncio.get_running_loop()] = httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"url": str(request.url)})
+    )
+    response = await client.get("http://mock/v1/models")
+    assert response.json() == {"url": "http://mock/v1/models"}
+
+    await pool.aclose()
+    assert transport.loop_count == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_client_pool_session():
+    pool = LLMClientPool()
+    transport = pool.get(mock_llm_config)._transport
+
+    async with pool.session():
+        async with pool.session():
+            transport._get_transport()
+        assert transport.loop_count == 1
+    assert transport.loop_count == 0
+
+    with pytest.raises(ValueError):
+        async with pool.session():
+            transport._get_transport()
+            raise ValueError("failed")
+    assert transport.loop_count == 0
+
+
+def test_context_llm_reuse():
+    ctx = Context()
+    llm = ctx.llm()
+    assert ctx.llm() is llm
+    assert llm.cost_manager is ctx.cost_manager
+
+    ctx.config.llm = ctx.config.llm.model_copy(update={"model": "another-model"})
+    assert ctx.llm() is not llm
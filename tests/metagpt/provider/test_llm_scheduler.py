@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_llm_scheduler.py
+@Desc: Unit tests for llm_scheduler.py
+"""
+import asyncio
+
+import pytest
+
+from metagpt.provider.llm_scheduler import (
+    EndpointLimiter,
+    LLMPriority,
+    LLMScheduler,
+    TokenBucket,
+    current_llm_priority,
+    get_retry_after,
+    llm_priority,
+)
+from tests.metagpt.provider.mock_llm_config import mock_llm_config
+
+
+class MockRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate_per_minute=60)
+    now = bucket.updated_at
+    assert bucket.wait_time(60, now) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1)
+    assert bucket.wait_time(1, now + 1) == 0
+    assert bucket.wait_time(600, now + 1) == pytest.approx(59)
+
+
+def test_get_retry_after():
+    assert get_retry_after(ValueError()) is None
+    assert get_retry_after(MockRateLimitError({"retry-after": "2"})) == 2
+    assert get_retry_after(MockRateLimitError({"retry-after-ms": "500"})) == 0.5
+    assert get_retry_after(MockRateLimitError({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+
+
+def test_llm_priority():
+    assert current_llm_priority() == LLMPriority.DEFAULT
+    with llm_priority(LLMPriority.BACKGROUND):
+        assert current_llm_priority() == LLMPriority.BACKGROUND
+    assert current_llm_priority() == LLMPriority.DEFAULT
+
+
+@pytest.mark.asyncio
+async def test_limiter_priority():
+    limiter = EndpointLimiter(max_concurrency=1)
+    order = []
+
+    async def _request(name, priority):
+        await limiter.acquire(priority=priority)
+        order.append(name)
+        limiter.release()
+
+    await limiter.acquire()
+    tasks = [asyncio.create_task(_request("background", LLMPriority.BACKGROUND))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(_request("interactive", LLMPriority.INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 2
+
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == ["interactive", "background"]
+    assert limiter.snapshot()["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancel():
+    limiter = EndpointLimiter(max_concurrency=1)
+    await limiter.acquire()
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter.queue_depth == 0
+    limiter.release()
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retry_after():
+    scheduler = LLMScheduler()
+    calls = []
+
+    async def _func():
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) == 1:
+            raise MockRateLimitError({"retry-after-ms": "100"})
+        return "ok"
+
+    assert await scheduler.call(mock_llm_config, _func) == "ok"
+    assert calls[1] - calls[0] >= 0.09
+
+    metrics = scheduler.metrics()
+    assert len(metrics) == 1
+    endpoint = list(metrics.values())[0]
+    assert endpoint["rate_limited"] == 1
+    assert endpoint["concurrency_limit"] == 2  # halved to 1 by the 429, grown by the success
+    assert endpoint["in_flight"] == 0
+    assert endpoint["queue_depth"] == 0
+
+    with pytest.raises(ValueError):
+        await scheduler.call(mock_llm_config, lambda: asyncio.sleep(0, result=int("x")))
+
+
+@pytest.mark.asyncio
+async def test_scheduler_adaptive_concurrency():
+    limiter = EndpointLimiter(max_concurrency=4)
+    limiter.on_rate_limited(0)
+    assert limiter.concurrency_limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.concurrency_limit == 3
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.concurrency_limit == 4
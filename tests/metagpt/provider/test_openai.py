@@ -97,7 +97,7 @@ class TestOpenAI:
         kwargs = instance._make_client_kwargs()
         assert kwargs["api_key"] == "mock_api_key"
         assert kwargs["base_url"] == "mock_base_url"
-        assert "http_client" not in kwargs
+        assert kwargs["http_client"] is OpenAILLM(mock_llm_config)._make_client_kwargs()["http_client"]
 
     def test_make_client_kwargs_with_proxy(self):
         instance = OpenAILLM(mock_llm_config_proxy)
@@ -164,3 +164,18 @@ async def test_openai_acompletion(mocker):
     assert resp.usage == usage
 
     await llm_general_chat_funcs_test(llm, prompt, messages, resp_cont)
+
+
+@pytest.mark.asyncio
+async def test_openai_aask_code_cache(mocker, tool_calls_rsp):
+    mock = mocker.patch.object(OpenAILLM, "_achat_completion_function", return_value=tool_calls_rsp[0])
+    llm = OpenAILLM(mock_llm_config.model_copy(update={"cache_mode": "on", "cache_max_entries": 4}))
+
+    code = await llm.aask_code(messages)
+    assert "hello world" in code["code"]
+    assert await llm.aask_code(messages) == code
+    assert mock.call_count == 1
+
+    tools = [{"type": "function", "function": {"name": "execute"}}]
+    assert await llm.aask_code(messages, tools=tools) == code
+    assert mock.call_count == 2
@@ -1,5 +1,6 @@
 import pytest
 
+from metagpt.actions.di.execute_nb_code import ExecuteNbCode
 from metagpt.logs import logger
 from metagpt.roles.di.data_interpreter import DataInterpreter
 
@@ -32,3 +33,14 @@ async def test_interpreter_react_mode(mocker):
     rsp = await di.run(requirement)
     logger.info(rsp)
     assert len(rsp.content) > 0
+
+
+@pytest.mark.asyncio
+async def test_interpreter_react_mode_returns_kernel(mocker):
+    mocker.patch.object(DataInterpreter, "_write_and_exec_code", side_effect=ValueError("failed"))
+    terminate = mocker.patch.object(ExecuteNbCode, "terminate")
+
+    di = DataInterpreter(react_mode="react")
+    with pytest.raises(Exception):
+        await di.run("Print hello world")
+    terminate.assert_awaited_once()
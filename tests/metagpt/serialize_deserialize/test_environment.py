@@ -25,10 +25,12 @@ def test_env_serdeser(context):
     ser_env_dict = env.model_dump()
     assert "roles" in ser_env_dict
     assert len(ser_env_dict["roles"]) == 0
+    assert "history" not in ser_env_dict  # debug only, not checkpointed
+    assert len(env.history) == 25
 
     new_env = Environment(**ser_env_dict, context=context)
     assert len(new_env.roles) == 0
-    assert len(new_env.history) == 25
+    assert new_env.history == ""
 
 
 def test_environment_serdeser(context):
@@ -60,5 +60,35 @@ async def test_publish_and_process_message(env: Environment):
     assert len(env.history) > 10
 
 
+def test_publish_message_routing(env: Environment):
+    alice = Role(name="Alice", profile="product manager")
+    bob = Role(name="Bob", profile="engineer")
+    env.add_roles([alice, bob])
+
+    env.publish_message(Message(content="to bob", send_to={"Bob"}))
+    assert [m.content for m in bob.rc.msg_buffer.pop_all()] == ["to bob"]
+    assert alice.rc.msg_buffer.empty()
+
+    env.publish_message(Message(content="to all"))
+    assert [m.content for m in alice.rc.msg_buffer.pop_all()] == ["to all"]
+    assert [m.content for m in bob.rc.msg_buffer.pop_all()] == ["to all"]
+
+    bob.set_addresses({"reviewer"})
+    env.publish_message(Message(content="to reviewer", send_to={"reviewer", "Bob", "nobody"}))
+    assert [m.content for m in bob.rc.msg_buffer.pop_all()] == ["to reviewer"]
+    env.publish_message(Message(content="to old address", send_to={"Bob"}))
+    assert bob.rc.msg_buffer.empty()
+
+
+def test_history_bounded(tmp_path):
+    env = Environment(history_size=3, history_path=tmp_path / "history.log")
+    for i in range(5):
+        env.publish_message(Message(content=f"message {i}"))
+    assert "message 1" not in env.history
+    assert env.history.count("message") == 3
+    assert (tmp_path / "history.log").read_text().count("message") == 5
+    assert "history" not in env.model_dump()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_pipe_files.py
+@Desc: Unit tests for pipe_files.py
+"""
+import os
+import threading
+
+import pytest
+
+from metagpt.pipe_files import (
+    FRAME_HEADER,
+    AsyncPipeReader,
+    AsyncPipeWriter,
+    PipeProtocolError,
+    encode_frames,
+    read_pipe_message_with_len,
+    write_pipe_message_with_len,
+)
+
+
+@pytest.fixture
+def pipe():
+    pipein, pipeout = os.pipe()
+    yield pipein, pipeout
+    for fd in (pipein, pipeout):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+@pytest.mark.parametrize(
+    ("message", "compression"),
+    [
+        ("LaunchProject: 2048", "zlib"),
+        ('<OH_ACTION> json_data:{"file_content": "中文"}', None),
+        ("def f():\n    return 1\n" * 20000, "zlib"),
+        ("def f():\n    return 1\n" * 20000, None),
+    ],
+)
+def test_pipe_message_roundtrip(pipe, message, compression):
+    pipein, pipeout = pipe
+    received = []
+    reader = threading.Thread(target=lambda: received.append(read_pipe_message_with_len(pipein)))
+    reader.start()
+    write_pipe_message_with_len(pipeout, message, compression=compression, chunk_size=64 * 1024)
+    reader.join(timeout=10)
+    assert received == [message]
+
+
+def test_encode_frames():
+    small = list(encode_frames("hello"))
+    assert len(small) == 1
+    header, payload = small[0]
+    assert len(header) == FRAME_HEADER.size
+    assert bytes(payload) == b"hello"
+
+    large = list(encode_frames("x" * 1000, compression=None, chunk_size=300))
+    assert [len(i[1]) for i in large] == [300, 300, 300, 100]
+
+
+def test_pipe_bad_frame(pipe):
+    pipein, pipeout = pipe
+    os.write(pipeout, b"\x00" * FRAME_HEADER.size)
+    with pytest.raises(PipeProtocolError):
+        read_pipe_message_with_len(pipein)
+
+
+def test_pipe_closed(pipe):
+    pipein, pipeout = pipe
+    os.write(pipeout, b"MG")
+    os.close(pipeout)
+    with pytest.raises(EOFError):
+        read_pipe_message_with_len(pipein)
+
+
+@pytest.mark.asyncio
+async def test_async_pipe(pipe):
+    pipein, pipeout = pipe
+    reader = await AsyncPipeReader.open(pipein)
+    writer = await AsyncPipeWriter.open(pipeout, chunk_size=4096)
+    messages = ["first", "print('hello')\n" * 10000]
+
+    for message in messages:
+        await writer.write_message(message)
+    await writer.close()
+
+    assert [i async for i in reader] == messages
+    reader.close()
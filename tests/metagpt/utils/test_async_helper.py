@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_async_helper.py
+@Desc: Unit tests for async_helper.py
+"""
+import asyncio
+
+import pytest
+
+from metagpt.utils.async_helper import run_dag
+
+
+@pytest.mark.asyncio
+async def test_run_dag():
+    started, finished = [], []
+    running = 0
+    max_running = 0
+
+    async def _func(node):
+        nonlocal running, max_running
+        started.append(node)
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        finished.append(node)
+        return node.upper()
+
+    nodes = ["a", "b", "c", "d", "e"]
+    dependencies = {"c": ["a"], "d": ["a", "b"], "e": ["d", "missing"]}
+    results = await run_dag(nodes, dependencies, _func, max_concurrency=2)
+
+    assert results == ["A", "B", "C", "D", "E"]
+    assert max_running == 2
+    assert started[:2] == ["a", "b"]
+    assert finished.index("a") < started.index("c")
+    assert finished.index("b") < started.index("d")
+    assert finished.index("d") < started.index("e")
+
+
+@pytest.mark.asyncio
+async def test_run_dag_error():
+    finished = []
+
+    async def _func(node):
+        if node == "a":
+            raise ValueError(node)
+        await asyncio.sleep(0.01)
+        finished.append(node)
+
+    with pytest.raises(ValueError):
+        await run_dag(["a", "b", "c"], {"b": ["a"]}, _func, max_concurrency=3)
+    assert "b" not in finished
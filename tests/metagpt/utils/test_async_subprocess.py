@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_async_subprocess.py
+@Desc    : Unit tests for async_subprocess.py
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from metagpt.utils import async_subprocess
+from metagpt.utils.async_subprocess import ProcessLimiter, run_command
+
+
+def alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"  # not a zombie left to init
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.asyncio
+async def test_run_command():
+    result = await run_command(["python", "-c", "import sys; print('out'); print('err', file=sys.stderr); exit(2)"])
+    assert (result.returncode, result.stdout.strip(), result.stderr.strip()) == (2, "out", "err")
+
+    result = await run_command(["/bin/bash"], input="cd /tmp\npwd >&2\n", merge_stderr=True)
+    assert result.stdout.strip() == "/tmp"
+    assert result.stderr == ""
+
+    chunks = []
+    result = await run_command("yes | head -c 100000", max_output=1000, on_output=lambda *i: chunks.append(i))
+    assert len(result.stdout) == 1000 and result.truncated
+    assert sum(len(i[1]) for i in chunks) == 100000
+
+
+@pytest.mark.asyncio
+async def test_run_command_timeout(tmp_path):
+    pid_file = tmp_path / "pid"
+    start = time.monotonic()
+    # the background child holds the pipes, it is killed with the group
+    result = await run_command(f"sleep 30 & echo $! > {pid_file}; echo started; wait", timeout=1)
+    assert time.monotonic() - start < 10
+    assert result.timed_out and result.stdout.strip() == "started"
+    await asyncio.sleep(0.1)
+    assert not alive(int(pid_file.read_text()))
+
+    task = asyncio.create_task(run_command(f"echo $$ > {pid_file}; exec sleep 30"))
+    await asyncio.sleep(0.5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not alive(int(pid_file.read_text()))
+
+
+@pytest.mark.asyncio
+async def test_run_command_concurrency(mocker):
+    mocker.patch.object(async_subprocess, "_limiter", ProcessLimiter(2))
+    start = time.monotonic()
+    results = await asyncio.gather(*[run_command("sleep 0.5") for _ in range(4)])
+    assert [i.returncode for i in results] == [0] * 4
+    assert time.monotonic() - start >= 1
+    assert async_subprocess._limiter.active == 0
+
+
+def test_process_limiter_across_loops():
+    limiter = ProcessLimiter(1)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    async def work():
+        async with limiter:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    async def cancelled():
+        task = asyncio.create_task(work())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    threads = [threading.Thread(target=asyncio.run, args=(work(),)) for _ in range(4)]
+    threads += [threading.Thread(target=asyncio.run, args=(cancelled(),)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+    assert limiter.active == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_code_sandbox.py
+@Desc    : Unit tests for code_sandbox.py
+"""
+import asyncio
+import time
+
+import pytest
+
+from metagpt.ext.aflow.benchmark import code_eval
+from metagpt.ext.aflow.benchmark.humaneval import HumanEvalBenchmark
+from metagpt.utils import code_sandbox
+from metagpt.utils.code_sandbox import CRASH, ERROR, OK, TIMEOUT, SandboxPool
+
+SOLUTION = "def add(a, b):\n    return a + b\n"
+TEST = "def check(candidate):\n    assert candidate(1, 2) == 3\n"
+
+
+@pytest.mark.asyncio
+async def test_sandbox_pool():
+    pool = SandboxPool(workers=2, timeout=2, memory_limit=1024**3)
+    result = await pool.run(code_eval.check_solution, SOLUTION, TEST, "add")
+    assert result.status == OK and result.value is None
+    assert pool.idle == 2
+
+    assert await pool.run(code_eval.check_solution, SOLUTION, TEST, "add") is result
+    assert pool.cache_hits == 1
+
+    result = await pool.run(code_eval.check_solution, SOLUTION.replace("+", "-"), TEST, "add")
+    assert result.status == ERROR and result.error_type == "AssertionError"
+
+    start = time.monotonic()
+    result = await pool.run(code_eval.run_code, "def solve():\n    while True:\n        pass", timeout=1)
+    assert result.status == TIMEOUT and time.monotonic() - start < 5
+    assert pool.idle == 2  # the hung worker was replaced
+
+    result = await pool.run(code_eval.run_code, "def solve():\n    return len(bytearray(4 * 1024**3))")
+    assert result.status == OK and "MemoryError" in result.value[1]
+
+    result = await pool.run(code_eval.exec_test, "import os\nos._exit(3)")
+    assert result.status == CRASH and "3" in result.error
+    assert (await pool.run(code_eval.run_code, "def solve():\n    return 42")).value == ("Success", "42")
+    pool.close()
+    assert pool.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_sandbox_pool_off_loop(mocker):
+    kill = code_sandbox._Worker.kill
+
+    def slow_kill(worker):
+        time.sleep(0.5)
+        kill(worker)
+
+    mocker.patch.object(code_sandbox._Worker, "kill", slow_kill)
+    pool = SandboxPool(workers=1, timeout=0.2, max_tasks=1)
+    gaps = []
+
+    async def heartbeat():
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - start)
+
+    task = asyncio.create_task(heartbeat())
+    hang = "def solve():\n    while True:\n        pass"
+    assert (await pool.run(code_eval.run_code, hang, cache=False)).status == TIMEOUT  # killed and replaced
+    assert (await pool.run(code_eval.run_code, "def solve():\n    return 1", cache=False)).ok  # recycled
+    task.cancel()
+    assert max(gaps) < 0.3
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_humaneval_check_solution(tmp_path, mocker):
+    mocker.patch.object(code_eval, "CHECK_TIMEOUT", 1)
+    benchmark = HumanEvalBenchmark("HumanEval", "", str(tmp_path))
+    assert (await benchmark.check_solution(SOLUTION, TEST, "add"))[0] == benchmark.PASS
+    hang = "def add(a, b):\n    while a + b:\n        a += 0\n    return a\n"
+    ret = await benchmark.check_solution(hang, TEST, "add")
+    assert ret[0] == benchmark.FAIL and "timed out" in ret[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -61,5 +61,47 @@ async def test_dependency_file():
     assert not file.exists
 
 
+@pytest.mark.asyncio
+async def test_dependency_file_dependents_and_update_many(tmp_path):
+    file = DependencyFile(workdir=tmp_path)
+    await file.update_many(
+        {
+            tmp_path / "a.py": {tmp_path / "c.py", "d.py"},
+            "b.py": {"c.py"},
+        }
+    )
+    assert await file.get_dependents("c.py") == {"a.py", "b.py"}
+    assert await file.get_dependents(tmp_path / "d.py") == {"a.py"}
+
+    await file.update("a.py", {"d.py"})
+    assert await file.get_dependents("c.py") == {"b.py"}
+    await file.update("b.py", None)
+    assert await file.get_dependents("c.py") == set()
+
+    file2 = DependencyFile(workdir=tmp_path)
+    assert await file2.get_dependents("d.py") == {"a.py"}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.asyncio
+async def test_dependency_file_write_behind(tmp_path):
+    file = DependencyFile.resident(workdir=tmp_path, flush_delay=60)
+    assert DependencyFile.resident(workdir=tmp_path) is file
+
+    for i in range(10):
+        await file.update(f"{i}.py", {"base.py"})
+    assert not file.exists
+    assert await file.get("3.py") == {"base.py"}
+
+    await file.flush()
+    assert file.exists
+    assert await DependencyFile(workdir=tmp_path).get("9.py") == {"base.py"}
+
+    await file.update("0.py", None)
+    DependencyFile.release(tmp_path)
+    assert await DependencyFile(workdir=tmp_path).get("0.py") == set()
+    assert DependencyFile.resident(workdir=tmp_path) is not file
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_env_cache.py
+@Desc    : Unit tests for env_cache.py
+"""
+import json
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from metagpt.utils.env_cache import node_modules_install_command, venv_install_command
+
+
+def run(cmd: str) -> str:
+    result = subprocess.run(["/bin/bash"], input=cmd, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_venv_install_command(tmp_path):
+    requirements = tmp_path / "project" / "requirements.txt"
+    requirements.parent.mkdir()
+    requirements.write_text("")
+    venv = requirements.parent / "venv_test"
+    cmd = venv_install_command(venv, requirements, cache_root=tmp_path / "cache", python=sys.executable, packages=())
+
+    assert "built the environment" in run(cmd)
+    assert "are up to date" in run(cmd)
+    shutil.rmtree(venv)
+    assert "reused the cached environment" in run(cmd)
+    # hardlinked from the cache, with the scripts pointing to the project's virtualenv
+    assert (venv / "pyvenv.cfg").stat().st_nlink == 2
+    assert str(venv) in (venv / "bin" / "pip").read_text().splitlines()[0]
+    assert str(venv) in run(f". {venv}/bin/activate; python -c 'import sys; print(sys.prefix)'")
+
+    requirements.write_text("# changed\n")
+    assert "built the environment" in run(cmd)
+    assert len(list((tmp_path / "cache" / "venv").glob("*.lock"))) == 2
+
+
+@pytest.mark.skipif(not shutil.which("npm"), reason="npm is not installed")
+def test_node_modules_install_command(tmp_path):
+    frontend = tmp_path / "frontend"
+    frontend.mkdir()
+    (frontend / "package.json").write_text(json.dumps({"name": "demo", "version": "1.0.0"}))
+    cmd = node_modules_install_command(frontend, cache_root=tmp_path / "cache")
+
+    run(cmd)
+    assert (frontend / "node_modules" / ".env_cache_key").exists()
+    assert not (frontend / "package-lock.json").exists()  # built in the cache
+    assert "node_modules of" in run(cmd)
+    shutil.rmtree(frontend / "node_modules")
+    assert "reused the cached node_modules" in run(cmd)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
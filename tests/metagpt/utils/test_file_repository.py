@@ -6,11 +6,14 @@
 @File    : test_file_repository.py
 @Desc: Unit tests for file_repository.py
 """
+import asyncio
 import shutil
+import time
 from pathlib import Path
 
 import pytest
 
+from metagpt.utils import file_repository
 from metagpt.utils.git_repository import ChangeType, GitRepository
 from tests.metagpt.utils.test_git_repository import mock_file
 
@@ -53,5 +56,101 @@ async def test_file_repo():
     git_repo.delete_repository()
 
 
+@pytest.mark.asyncio
+async def test_file_repo_many():
+    local_path = Path(__file__).parent / "file_repo_many_git"
+    if local_path.exists():
+        shutil.rmtree(local_path)
+
+    git_repo = GitRepository(local_path=local_path, auto_init=True, local=True)
+    file_repo = git_repo.new_file_repository("file_repo1")
+    docs = await file_repo.save_many([("a.txt", "AAA"), ("d/b.txt", "BBB")], dependencies=["file_repo1/c.txt"])
+    assert [i.content for i in docs] == ["AAA", "BBB"]
+    assert {"file_repo1/c.txt"} == await file_repo.get_dependency("d/b.txt")
+
+    docs = await file_repo.get_many(["d/b.txt", "x.txt", "a.txt"])
+    assert docs[0].content == "BBB"
+    assert docs[1] is None
+    assert docs[2].content == "AAA"
+    assert {i.content for i in await file_repo.get_all()} == {"AAA", "BBB"}
+
+    git_repo.delete_repository()
+
+
+@pytest.mark.asyncio
+async def test_get_documents_fallback(mocker):
+    local_path = Path(__file__).parent / "file_repo_batch_git"
+    if local_path.exists():
+        shutil.rmtree(local_path)
+
+    git_repo = GitRepository(local_path=local_path / "workspace", auto_init=True, local=True)
+    file_repo = git_repo.new_file_repository("file_repo1")
+    other_repo = git_repo.new_file_repository("file_repo2")
+    await file_repo.save("a.txt", "AAA")
+    await other_repo.save("b.txt", "BBB")
+    file_repo.local = other_repo.local = False
+    git_repo.sid = "sid-batch"
+
+    published = []
+    mocker.patch.object(file_repository, "publish_oh_action", side_effect=published.append)
+    get_docs = mocker.patch.object(file_repository, "get_docs_for_recv", side_effect=asyncio.TimeoutError)
+
+    async def set_doc_for_recv(sio, sid, doc, request_id=None, timeout=None):
+        action = next(i for i in published if i["request_id"] == request_id)
+        doc.content = (local_path / action["file_path"].lstrip("/")).read_text()
+
+    mocker.patch.object(file_repository, "set_doc_for_recv", side_effect=set_doc_for_recv)
+
+    requests = [(other_repo, "b.txt"), (file_repo, "x.txt"), (file_repo, "a.txt")]
+    docs = await file_repository.get_documents(requests, timeout=0.1)
+    assert [i.content if i else None for i in docs] == ["BBB", None, "AAA"]
+    assert [i["action_type"] for i in published] == ["FILE_READ_BATCH", "FILE_READ", "FILE_READ"]
+    assert published[0]["file_paths"] == ["/workspace/file_repo2/b.txt", "/workspace/file_repo1/a.txt"]
+
+    # the conversation does not answer batches, its next reads go one at a time at once
+    published.clear()
+    docs = await file_repository.get_documents(requests)
+    assert [i.content if i else None for i in docs] == ["BBB", None, "AAA"]
+    assert [i["action_type"] for i in published] == ["FILE_READ", "FILE_READ"]
+    assert get_docs.call_count == 1
+
+    # until the retry interval is over
+    file_repository._batch_read_support[git_repo.sid] = time.monotonic() - 1
+    get_docs.side_effect = lambda *args, **kwargs: {
+        "/workspace/file_repo2/b.txt": "BBB",
+        "/workspace/file_repo1/a.txt": "AAA",
+    }
+    published.clear()
+    docs = await file_repository.get_documents(requests)
+    assert [i.content if i else None for i in docs] == ["BBB", None, "AAA"]
+    assert [i["action_type"] for i in published] == ["FILE_READ_BATCH"]
+    assert get_docs.call_args.kwargs["timeout"] == file_repository.FILE_READ_BATCH_PROBE_TIMEOUT
+    assert file_repository._batch_read_support[git_repo.sid] is True
+
+    file_repository._batch_read_support.pop(git_repo.sid)
+    git_repo.delete_repository()
+    shutil.rmtree(local_path, ignore_errors=True)
+
+
+
+@pytest.mark.asyncio
+async def test_get_reply_timeout(mocker):
+    local_path = Path(__file__).parent / "file_repo_timeout_git"
+    if local_path.exists():
+        shutil.rmtree(local_path)
+
+    git_repo = GitRepository(local_path=local_path, auto_init=True, local=True, reply_timeout=0.1)
+    file_repo = git_repo.new_file_repository("file_repo1")
+    await file_repo.save("a.txt", "AAA")
+    file_repo.local = False
+    mocker.patch.object(file_repository, "publish_oh_action")
+    recv = mocker.patch.object(file_repository, "set_doc_for_recv", side_effect=asyncio.TimeoutError)
+
+    with pytest.raises(TimeoutError):
+        await file_repo.get("a.txt")
+    assert recv.call_args.kwargs["timeout"] == 0.1
+    git_repo.delete_repository()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
@@ -13,7 +13,7 @@ from pathlib import Path
 import pytest
 
 from metagpt.utils.common import awrite
-from metagpt.utils.git_repository import GitRepository
+from metagpt.utils.git_repository import ChangeJournal, ChangeType, GitRepository
 
 
 async def mock_file(filename, content=""):
@@ -42,6 +42,7 @@ async def test_git():
     local_path = Path(__file__).parent / "git"
     repo, subdir = await mock_repo(local_path)
 
+    repo.resync()  # written behind the change journal
     assert len(repo.changed_files) == 3
     repo.add_change(repo.changed_files)
     repo.commit("commit1")
@@ -53,6 +54,7 @@ async def test_git():
     rmfile.unlink()
     assert repo.status
 
+    repo.resync()
     assert len(repo.changed_files) == 3
     repo.add_change(repo.changed_files)
     repo.commit("commit2")
@@ -75,6 +77,7 @@ async def test_git1():
     await mock_repo(local_path)
 
     repo1 = GitRepository(local_path=local_path, auto_init=False)
+    repo1.resync()
     assert repo1.changed_files
 
     file_repo = repo1.new_file_repository("__pycache__")
@@ -100,12 +103,60 @@ async def test_dependency_file():
     assert not dependancy_file.exists
 
     await dependancy_file.update(filename="a/b.txt", dependencies={"c/d.txt", "e/f.txt"})
+    assert not dependancy_file.exists  # written behind
+    repo.flush_dependency()
     assert dependancy_file.exists
+    assert await dependancy_file.get_dependents("c/d.txt") == {"a/b.txt"}
 
     repo.delete_repository()
     assert not dependancy_file.exists
 
 
+@pytest.mark.asyncio
+async def test_change_journal(mocker):
+    local_path = Path(__file__).parent / "git5"
+    repo, subdir = await mock_repo(local_path)
+    repo.resync()
+    file_repo = repo.new_file_repository("src")
+    await file_repo.save("a.py", "a")
+    await file_repo.save_many([("b.py", "b"), ("c.py", "c")])
+    repo.archive()
+    assert not repo.changed_files
+    assert ".dependencies.json" not in repo.status
+
+    scan = mocker.spy(ChangeJournal, "resync")
+    await file_repo.save("a.py", "a")  # same content as committed
+    await file_repo.save("b.py", "b2")
+    await file_repo.delete("c.py")
+    await file_repo.save("node_modules/x.js", "x")  # ignored
+    await file_repo.save("d.py", "d")
+    await file_repo.delete("d.py")  # never committed
+    await file_repo.save("e.py", "e")
+    assert repo.changed_files == {"src/b.py": ChangeType.MODIFIED, "src/c.py": ChangeType.DELETED, "src/e.py": ChangeType.UNTRACTED}
+    assert file_repo.changed_files == {"b.py": ChangeType.MODIFIED, "e.py": ChangeType.UNTRACTED}
+    assert scan.call_count == 0
+
+    # another repository opened on the same directory shares the journal
+    assert GitRepository(local_path=local_path).changed_files == repo.changed_files
+
+    # matches a git scan
+    files = repo.changed_files
+    repo.resync()
+    assert repo.changed_files == files
+
+    repo.archive()
+    assert not repo.changed_files
+    assert "src/c.py" not in repo.status
+
+    # written outside of FileRepository, e.g. by mermaid_to_file
+    await mock_file(local_path / "resources" / "seq_flow.svg", "<svg/>")
+    await file_repo.save("f.py", "f")
+    repo.archive()
+    assert not repo.changed_files
+    assert "working tree clean" in repo.status
+    repo.delete_repository()
+
+
 @pytest.mark.asyncio
 async def test_git_open():
     local_path = Path(__file__).parent / "git3"
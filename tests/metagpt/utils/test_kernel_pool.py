@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_kernel_pool.py
+@Desc    : Unit tests for kernel_pool.py
+"""
+import asyncio
+
+import pytest
+
+from metagpt.actions.di.execute_nb_code import ExecuteNbCode
+from metagpt.utils.kernel_pool import KernelPool
+
+
+async def run(kernel, code: str) -> str:
+    outputs = []
+    await kernel.client.execute_interactive(code, output_hook=outputs.append, timeout=30)
+    return "".join(i["content"].get("text", "") for i in outputs if i["msg_type"] == "stream")
+
+
+@pytest.mark.asyncio
+async def test_kernel_pool():
+    pool = KernelPool(size=1, max_kernels=1, max_uses=2, preload=["json"], memory_limit=8 * 1024**3)
+    await pool.fill()
+    assert pool.idle == 1
+
+    kernel = await pool.checkout()
+    assert await run(kernel, "import sys; print('json' in sys.modules, 'importlib' in dir()); x = 1") == "True False\n"
+    pid = kernel.km.provisioner.pid
+
+    pool.checkout_timeout = 0.1
+    with pytest.raises(TimeoutError):
+        await pool.checkout()  # max_kernels are checked out
+    pool.checkout_timeout = None
+    waiting = asyncio.create_task(pool.checkout())
+    await asyncio.sleep(0.5)
+    assert not waiting.done()
+    await pool.checkin(kernel)
+    kernel = await waiting
+    assert kernel.km.provisioner.pid == pid
+    assert await run(kernel, "print('x' in dir())") == "False\n"  # scrubbed
+
+    await pool.checkin(kernel)  # worn out
+    assert not await kernel.km.is_alive()
+    kernel = await pool.checkout()
+    assert kernel.km.provisioner.pid != pid
+    await pool.checkin(kernel, recycle=True)
+    await pool.close()
+    assert pool.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_nb_code_with_pool():
+    pool = KernelPool(size=1)
+    await pool.fill()
+    executor = ExecuteNbCode(kernel_pool=pool)
+    await executor.run("x = 1")
+    assert pool.idle == 0
+
+    await executor.reset()
+    assert executor.nb_client.km is None
+    output, success = await executor.run("print('x' in dir())")
+    assert success and "False" in output
+
+    await executor.terminate()
+    assert executor.kernel is None
+    await pool.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
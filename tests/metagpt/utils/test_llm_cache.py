@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_llm_cache.py
+@Desc: Unit tests for llm_cache.py
+"""
+import time
+
+import pytest
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.utils.llm_cache import (
+    MemoryLLMCache,
+    SQLiteLLMCache,
+    get_llm_cache,
+    llm_cache_key,
+)
+
+
+def test_llm_cache_key():
+    messages = [{"role": "user", "content": "hello"}]
+    key = llm_cache_key("gpt-4", messages, temperature=0)
+    assert key == llm_cache_key("gpt-4", [{"content": "hello", "role": "user"}], temperature=0)
+    assert key != llm_cache_key("gpt-4o", messages, temperature=0)
+    assert key != llm_cache_key("gpt-4", messages, temperature=0.5)
+    assert key != llm_cache_key("gpt-4", messages, temperature=0, tools=[{"name": "f"}])
+    tools_key = llm_cache_key("gpt-4", messages, temperature=0, tools=[{"name": "f"}])
+    assert tools_key != llm_cache_key("gpt-4", messages, temperature=0, tools=[{"name": "f"}], tool_choice="auto")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def _make(**kwargs):
+        if request.param == "memory":
+            return MemoryLLMCache(**kwargs)
+        return SQLiteLLMCache(tmp_path / f"cache_{time.time_ns()}.sqlite3", **kwargs)
+
+    return _make
+
+
+def test_llm_cache_lru(make_cache):
+    cache = make_cache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_llm_cache_ttl(make_cache):
+    cache = make_cache(ttl=0.05)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_llm_cache_persist(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = SQLiteLLMCache(path)
+    cache.set("a", "中文")
+    cache.close()
+    assert SQLiteLLMCache(path).get("a") == "中文"
+
+
+def test_get_llm_cache(tmp_path):
+    assert get_llm_cache(LLMConfig()) is None
+    cache = get_llm_cache(LLMConfig(cache_mode="on"))
+    assert isinstance(cache, MemoryLLMCache)
+    assert get_llm_cache(LLMConfig(cache_mode="replay")) is cache
+    other = get_llm_cache(LLMConfig(cache_mode="on", cache_ttl=60, cache_max_entries=8))
+    assert other is not cache
+    assert (other.ttl, other.max_entries) == (60, 8)
+
+    config = LLMConfig(cache_mode="on", cache_backend="sqlite", cache_path=str(tmp_path / "cache.sqlite3"))
+    assert isinstance(get_llm_cache(config), SQLiteLLMCache)
+    assert get_llm_cache(config) is get_llm_cache(config.model_copy())
+    assert get_llm_cache(config) is not get_llm_cache(config.model_copy(update={"cache_ttl": 60}))
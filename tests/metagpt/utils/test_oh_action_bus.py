@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_oh_action_bus.py
+@Desc: Unit tests for oh_action_bus.py
+"""
+import json
+
+import pytest
+
+from metagpt.utils.oh_action_bus import (
+    COMPRESSED_ENCODING,
+    OH_ACTION_PREFIX,
+    MemorySink,
+    OHActionBus,
+    decode_file_content,
+)
+
+
+class _Stream:
+    def __init__(self):
+        self.messages = []
+
+    def write(self, message):
+        self.messages.append(message)
+
+
+def test_oh_action_bus_routing():
+    bus = OHActionBus()
+    everything = bus.subscribe(MemorySink())
+    conv_a = bus.subscribe(MemorySink(), conversation_id="a")
+    conv_b = bus.subscribe(MemorySink(), conversation_id="b")
+
+    bus.publish({"action_type": "MESSAGE", "conversation_id": "a", "message": "hi"})
+    bus.publish({"action_type": "FILE_READ", "file_path": "x.py"})
+
+    assert len(everything.actions) == 2
+    assert [i.action_type for i in conv_a.actions] == ["MESSAGE"]
+    assert conv_a.actions[0].message == "hi"
+    assert not conv_b.actions
+    assert json.loads(conv_a.payloads[0]) == {"action_type": "MESSAGE", "conversation_id": "a", "message": "hi"}
+
+    bus.unsubscribe(conv_a, conversation_id="a")
+    bus.publish({"action_type": "MESSAGE", "conversation_id": "a"})
+    assert len(conv_a.actions) == 1
+    assert len(everything.of_type("MESSAGE")) == 2
+
+
+def test_oh_action_bus_stream_dedupe():
+    bus = OHActionBus()
+    stream = _Stream()
+    first = bus.subscribe(stream, conversation_id="a")
+    assert bus.subscribe(stream, conversation_id="a") is first
+
+    payload = bus.publish({"action_type": "MESSAGE", "conversation_id": "a"})
+    assert stream.messages == [f"{OH_ACTION_PREFIX}{payload}"]
+
+    bus.unsubscribe(stream, conversation_id="a")
+    assert bus.publish({"action_type": "MESSAGE", "conversation_id": "a"}) is None
+
+
+@pytest.mark.parametrize("size", [10, 1024])
+def test_oh_action_bus_compress(size):
+    bus = OHActionBus()
+    sink = bus.subscribe(MemorySink(), compress_threshold=100)
+    plain = bus.subscribe(MemorySink())
+    content = "print('hello')\n" * size
+
+    bus.publish({"action_type": "FILE_SAVE", "file_path": "a.py", "file_content": content})
+
+    data = json.loads(sink.payloads[0])
+    assert (data.get("file_content_encoding") == COMPRESSED_ENCODING) == (len(content) > 100)
+    assert decode_file_content(data) == content
+    assert sink.actions[0].file_content == content
+    assert json.loads(plain.payloads[0])["file_content"] == content
+
+
+def test_oh_action_bus_no_compress_by_default():
+    bus = OHActionBus()
+    sink = bus.subscribe(MemorySink())
+    content = "x" * 100 * 1024
+
+    bus.publish({"action_type": "FILE_SAVE", "file_path": "a.py", "file_content": content})
+
+    data = json.loads(sink.payloads[0])
+    assert "file_content_encoding" not in data
+    assert data["file_content"] == content
+
+
+def test_oh_action_bus_subscription():
+    bus = OHActionBus()
+    stream = _Stream()
+    with bus.subscription(stream, conversation_id="a", compress_threshold=100) as sink:
+        assert sink.compress_threshold == 100
+        bus.publish({"action_type": "MESSAGE", "conversation_id": "a"})
+    assert len(stream.messages) == 1
+    assert bus.publish({"action_type": "MESSAGE", "conversation_id": "a"}) is None
+
+    with pytest.raises(ValueError):
+        with bus.subscription(stream, conversation_id="a"):
+            raise ValueError("failed")
+    assert bus.publish({"action_type": "MESSAGE", "conversation_id": "a"}) is None
+
+    with bus.subscription(None, conversation_id="a") as sink:
+        assert sink is None
+
+
+def test_oh_action_bus_sink_error():
+    class _Broken(MemorySink):
+        def send(self, action, payload):
+            raise ValueError("broken")
+
+    bus = OHActionBus()
+    bus.subscribe(_Broken())
+    sink = bus.subscribe(MemorySink())
+    bus.publish({"action_type": "MESSAGE"})
+    assert len(sink.actions) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
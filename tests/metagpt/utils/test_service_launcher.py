@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_service_launcher.py
+@Desc    : Unit tests for service_launcher.py
+"""
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from metagpt.utils.service_launcher import (
+    ServiceGroup,
+    ServiceNotReadyError,
+    wait_ready_command,
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_service_group(tmp_path):
+    port = free_port()
+    server = f"sleep 0.5; echo starting; exec {sys.executable} -m http.server {port} --bind 127.0.0.1"
+    async with ServiceGroup(grace=2) as services:
+        tcp = await services.start("tcp", server, port=port, cwd=str(tmp_path))
+        await tcp.wait_ready(timeout=10)
+        assert "starting" in tcp.output
+        pid = tcp.process.pid
+    assert not tcp.running
+    with pytest.raises(ProcessLookupError):
+        os.killpg(pid, 0)  # the whole group is gone
+
+    port = free_port()
+    server = f"{sys.executable} -m http.server {port} --bind 127.0.0.1"
+    async with ServiceGroup(grace=2) as services:
+        http = await services.start("http", server, url=f"http://127.0.0.1:{port}/", cwd=str(tmp_path))
+        await http.wait_ready(timeout=10)
+    assert "GET / " in http.output
+
+
+@pytest.mark.asyncio
+async def test_service_not_ready():
+    async with ServiceGroup(grace=2) as services:
+        crashed = await services.start("crashed", "echo 'ImportError: no module'; exit 3", port=free_port())
+        with pytest.raises(ServiceNotReadyError, match="ImportError"):
+            await crashed.wait_ready(timeout=10)
+
+        silent = await services.start("silent", "sleep 30", port=free_port(), max_lines=1)
+        with pytest.raises(ServiceNotReadyError, match="not ready after 1s"):
+            await silent.wait_ready(timeout=1)
+    assert crashed.process.returncode == 3
+    assert not silent.running
+
+
+def test_wait_ready_command():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        s.listen()
+        port = s.getsockname()[1]
+        result = subprocess.run(["/bin/bash"], input=wait_ready_command(port), capture_output=True, text=True)
+        assert result.returncode == 0
+        assert f"ready: localhost:{port}" in result.stdout
+
+    result = subprocess.run(
+        ["/bin/bash"],
+        input=wait_ready_command("$TEST_PORT", host="127.0.0.1", timeout=1),
+        capture_output=True,
+        text=True,
+        env={**os.environ, "TEST_PORT": str(port)},
+    )
+    assert result.returncode == 1
+    assert f"not ready: 127.0.0.1:{port}" in result.stdout
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
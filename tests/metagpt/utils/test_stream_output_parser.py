@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_stream_output_parser.py
+@Desc    : Unit tests for stream_output_parser.py
+"""
+import json
+from typing import List
+
+import pytest
+
+from metagpt.actions.action_node import ActionNode
+from metagpt.utils.stream_output_parser import (
+    StreamingOutputParser,
+    StreamingParseError,
+    partial_output_listener,
+)
+
+MAPPING = {
+    "Project Name": (str, ...),
+    "Task list": (List[str], ...),
+    "Anything UNCLEAR": (str, ...),
+}
+OUTPUT_CLASS = ActionNode.create_model_class("StreamTest", MAPPING)
+
+
+def chunks(text: str, size: int = 3):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_stream_json():
+    data = {
+        "Project Name": 'snake_game, "v2" \\ {beta}',
+        "Task list": ["main.py", "game.py"],
+        "Anything UNCLEAR": "",
+    }
+    reply = f"Sure, here it is:\n[CONTENT]\n{json.dumps(data, indent=4)}\n[/CONTENT]"
+    events = []
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json", node="Tasks")
+    with partial_output_listener(events.append):
+        for i in chunks(reply):
+            parser.feed(i)
+
+    assert parser.done
+    assert parser.fields == data
+    assert [i.key for i in events] == list(data)
+    assert events[0].node == "Tasks"
+    assert events[1].fields == {"Project Name": data["Project Name"], "Task list": data["Task list"]}
+
+
+def test_stream_json_hopeless():
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json")
+    parser.feed('[CONTENT]\n{"project name": "snake", ')  # the repair fixes the case of the keys
+    assert parser.fields == {"Project Name": "snake"}
+    with pytest.raises(StreamingParseError):
+        parser.feed('"Task list": {"main.py": 1}, ')
+
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json")
+    with pytest.raises(StreamingParseError):
+        parser.feed('[CONTENT]\n{"Project Name": "snake", "Task list": []}')
+
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json", max_preamble=10)
+    with pytest.raises(StreamingParseError):
+        parser.feed("I would rather write prose")
+
+    # after the tag, the object may start late
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json", max_preamble=10)
+    parser.feed("[CONTENT]\n")
+    parser.feed("Here is the answer you asked for, " * 10)
+    parser.feed('{"Project Name": "snake", ')
+    assert parser.fields == {"Project Name": "snake"}
+
+
+def test_stream_json_left_to_repair():
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="json")
+    parser.feed("[CONTENT]\n{'Project Name': 'snake', \"Task list\": [], \"Anything UNCLEAR\": \"\"}")
+    assert parser.done
+    assert parser.fields == {"Task list": [], "Anything UNCLEAR": ""}
+
+
+def test_stream_markdown():
+    reply = (
+        "[CONTENT]\n## Project Name\nsnake_game\n\n## Task list\n```python\n['main.py', 'game.py']\n```\n"
+        "## Anything UNCLEAR\nNothing\n[/CONTENT]"
+    )
+    events = []
+    parser = StreamingOutputParser(OUTPUT_CLASS, schema="markdown", mapping=MAPPING)
+    with partial_output_listener(events.append):
+        for i in chunks(reply, size=1):
+            parser.feed(i)
+
+    assert parser.done
+    assert parser.fields == {"Project Name": "snake_game", "Task list": ["main.py", "game.py"], "Anything UNCLEAR": "Nothing"}
+    assert [i.key for i in events] == ["Project Name", "Task list", "Anything UNCLEAR"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
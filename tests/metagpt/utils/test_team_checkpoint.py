@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_team_checkpoint.py
+@Desc    : Unit tests for team_checkpoint.py
+"""
+import json
+
+import pytest
+from pydantic_core import to_jsonable_python
+
+from metagpt.roles import Role  # noqa: F401, resolves the forward references of `Team`
+from metagpt.schema import Message
+from metagpt.team import Team
+from metagpt.utils.team_checkpoint import (
+    CHECKPOINT_KEY,
+    TeamCheckpoint,
+    _team_context,
+    load_checkpoint,
+)
+from tests.metagpt.serialize_deserialize.test_serdeser_base import RoleA, RoleC
+
+
+def expected_data(team: Team) -> dict:
+    data = team.model_dump()
+    data["context"] = _team_context(team)
+    return json.loads(json.dumps(data, default=to_jsonable_python))
+
+
+def loaded_data(path) -> dict:
+    data = load_checkpoint(path / "team.json")
+    data.pop(CHECKPOINT_KEY)
+    return data
+
+
+def test_team_checkpoint_journal(context, tmp_path):
+    team = Team(context=context)
+    role_a, role_c = RoleA(), RoleC()
+    team.hire([role_a, role_c])
+    checkpoint = TeamCheckpoint(tmp_path, compact_every=100)
+
+    checkpoint.save(team)
+    snapshot = (tmp_path / "team.json").read_text()
+    assert loaded_data(tmp_path) == expected_data(team)
+
+    for i in range(5):
+        msg = Message(content=f"msg {i}", cause_by="metagpt.actions.add_requirement.UserRequirement")
+        role_a.rc.memory.add(msg)
+        role_c.rc.working_memory.add(msg)
+        checkpoint.save(team)
+        assert loaded_data(tmp_path) == expected_data(team)
+    role_c.use_flag = True
+    role_c.rc.state = 0
+    checkpoint.save(team)
+    checkpoint.save(team)  # unchanged, nothing written
+
+    assert (tmp_path / "team.json").read_text() == snapshot
+    assert len((tmp_path / "team.journal.jsonl").read_text().splitlines()) == 6
+    data = loaded_data(tmp_path)
+    assert data == expected_data(team)
+    assert data["context"]["last_role"] == role_c.profile
+
+    # rewritten memories and new roles
+    role_c.rc.working_memory.clear()
+    role_c.rc.working_memory.add(Message(content="after clear"))
+    team.hire([RoleA(profile="RoleA2")])
+    checkpoint.save(team)
+    assert loaded_data(tmp_path) == expected_data(team)
+
+    # a truncated last record is ignored
+    with open(tmp_path / "team.journal.jsonl", "a") as writer:
+        writer.write('{"generation": ')
+    assert loaded_data(tmp_path) == expected_data(team)
+
+
+def test_team_checkpoint_compact(context, tmp_path):
+    team = Team(context=context)
+    role = RoleA()
+    team.hire([role])
+    checkpoint = TeamCheckpoint(tmp_path, compact_every=3)
+    checkpoint.save(team)
+    generation = checkpoint.generation
+
+    for i in range(4):
+        role.rc.memory.add(Message(content=f"msg {i}"))
+        checkpoint.save(team)
+    assert checkpoint.generation != generation
+    assert (tmp_path / "team.journal.jsonl").read_text() == ""
+    assert loaded_data(tmp_path) == expected_data(team)
+
+    # records of another generation, e.g. left by a crash during a compaction, are skipped
+    with open(tmp_path / "team.journal.jsonl", "a") as writer:
+        writer.write(json.dumps({"generation": generation, "env": {"desc": "stale"}}) + "\n")
+    assert loaded_data(tmp_path) == expected_data(team)
+
+
+def test_team_deserialize_checkpoint(context, tmp_path):
+    context.config.sid = "checkpoint"
+    team = Team(context=context)
+    role = RoleC()
+    team.hire([role])
+    team.serialize(tmp_path)
+    role.rc.memory.add(Message(content="hello", cause_by="metagpt.actions.add_requirement.UserRequirement"))
+    team.serialize(tmp_path)
+
+    team_info_path = tmp_path / "checkpoint" / "team.json"
+    new_team = Team.deserialize(team_info_path, context=context)
+    assert new_team.env.get_role(role.profile).rc.memory == role.rc.memory
+
+    # the restored team goes on appending to the same journal
+    new_role = new_team.env.get_role(role.profile)
+    new_role.rc.memory.add(Message(content="world"))
+    new_team.serialize(tmp_path)
+    assert len((tmp_path / "checkpoint" / "team.journal.jsonl").read_text().splitlines()) == 2
+    assert loaded_data(tmp_path / "checkpoint") == expected_data(new_team)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
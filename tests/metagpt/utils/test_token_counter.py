@@ -7,7 +7,15 @@
 """
 import pytest
 
-from metagpt.utils.token_counter import count_input_tokens, count_output_tokens
+from metagpt.utils.token_counter import (
+    TOKEN_COUNT_CACHE,
+    TokenCountCache,
+    approximate_tokens,
+    count_input_tokens,
+    count_output_tokens,
+    count_tokens_batch,
+    get_encoding,
+)
 
 
 def test_count_message_tokens():
@@ -69,5 +77,37 @@ def test_count_string_tokens_gpt_4():
     assert count_output_tokens(string, model="gpt-4-0314") == 4
 
 
+def test_count_tokens_batch():
+    document = "You are a helpful assistant. " * 20
+    counts = count_tokens_batch(["Hello, world!", "", document], model="gpt-4-0314")
+    assert counts[:2] == [4, 0]
+    assert counts[2] == count_output_tokens(document, model="gpt-4-0314")
+
+    key = TokenCountCache.key(get_encoding("gpt-4-0314").name, document)
+    assert TOKEN_COUNT_CACHE.get(key) == counts[2]
+    assert get_encoding("gpt-4-0314") is get_encoding("gpt-4-0314")
+
+
+def test_approximate_tokens():
+    assert approximate_tokens("") == 0
+    assert approximate_tokens("Hello, world!") == 4
+    assert approximate_tokens("你好") == 2
+    assert count_output_tokens("Hello, world!", model="invalid_model", approximate=True) == 4
+
+    messages = [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "Hi there!"},
+    ]
+    assert count_input_tokens(messages, model="invalid_model", approximate=True) == 18
+
+
+def test_token_count_cache():
+    cache = TokenCountCache(maxsize=1)
+    cache.set(TokenCountCache.key("cl100k_base", "a"), 1)
+    cache.set(TokenCountCache.key("cl100k_base", "b"), 2)
+    assert cache.get(TokenCountCache.key("cl100k_base", "a")) is None
+    assert cache.get(TokenCountCache.key("cl100k_base", "b")) == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
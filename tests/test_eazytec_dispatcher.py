@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_eazytec_dispatcher.py
+@Desc    : Unit tests for eazytec_dispatcher.py, on an in-memory stand-in of redis.asyncio
+"""
+import asyncio
+
+import pytest
+
+from eazytec_dispatcher import SessionDispatcher
+
+
+class FakeRedis:
+    """The commands of redis.asyncio used by SessionDispatcher: pipelined SET NX EX / GET and the renew script"""
+
+    def __init__(self):
+        self.store = {}  # key -> value
+        self.ttl = {}  # key -> seconds
+        self.executes = []  # the commands of each pipeline execution
+
+    def register_script(self, script: str):
+        return FakeRenewScript()
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append(("set", key, value, nx, ex))
+
+    def get(self, key):
+        self.commands.append(("get", key))
+
+    async def execute(self):
+        self.redis.executes.append(list(self.commands))
+        results = []
+        for command in self.commands:
+            name, key = command[:2]
+            if name == "set":
+                _, _, value, nx, ex = command
+                if nx and key in self.redis.store:
+                    results.append(None)
+                else:
+                    self.redis.store[key], self.redis.ttl[key] = value, ex
+                    results.append(True)
+            elif name == "get":
+                value = self.redis.store.get(key)
+                results.append(value.encode("utf-8") if value is not None else None)
+            elif name == "renew":
+                _, _, owner, ttl = command
+                renewed = self.redis.store.get(key) == owner
+                if renewed:
+                    self.redis.ttl[key] = ttl
+                results.append(int(renewed))
+        return results
+
+
+class FakeRenewScript:
+    async def __call__(self, keys, args, client):
+        client.commands.append(("renew", keys[0], *args))
+
+
+def new_dispatcher(redis: FakeRedis, handled: list, **kwargs) -> SessionDispatcher:
+    async def handler(data: dict):
+        handled.append(data)
+
+    return SessionDispatcher(redis, "channel", "m1", handler, renew_interval=3600, **kwargs)
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_claim():
+    redis, handled = FakeRedis(), []
+    redis.store["meta-server:c3"] = "m2"
+    dispatcher = new_dispatcher(redis, handled, lease_ttl=100)
+    for conversation_id in ("c1", "c2", "c3"):
+        assert dispatcher.dispatch({"conversation_id": conversation_id, "type": "chat"})
+    assert not dispatcher.dispatch({"type": "chat"})
+    await settle()
+
+    assert len(redis.executes) == 1  # the claims share one pipeline
+    assert [c[0] for c in redis.executes[0]] == ["set", "get"] * 3
+    assert redis.store["meta-server:c1"] == "m1" and redis.ttl["meta-server:c1"] == 100
+    assert [i["conversation_id"] for i in handled] == ["c1", "c2"]
+
+    # cached ownership: no more round trips, the foreign session is dropped before queueing
+    assert dispatcher.dispatch({"conversation_id": "c1", "type": "chat"})
+    assert not dispatcher.dispatch({"conversation_id": "c3", "type": "chat"})
+    await settle()
+    assert len(redis.executes) == 1 and len(handled) == 3
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_renew_and_lease_loss():
+    redis, handled = FakeRedis(), []
+    dispatcher = new_dispatcher(redis, handled, lease_ttl=100)
+    dispatcher.dispatch({"conversation_id": "c1", "type": "chat"})
+    dispatcher.dispatch({"conversation_id": "c2", "type": "chat"})
+    await settle()
+
+    redis.ttl["meta-server:c1"] = 5
+    await dispatcher.renew()
+    assert redis.ttl["meta-server:c1"] == 100
+    assert sorted(c[1] for c in redis.executes[-1]) == ["meta-server:c1", "meta-server:c2"]
+
+    executes = len(redis.executes)
+    await dispatcher.renew()  # nothing active since the last renewal
+    assert len(redis.executes) == executes
+
+    # another machine took c1 over: the renewal fails and the next message claims again
+    redis.store["meta-server:c1"] = "m2"
+    dispatcher.dispatch({"conversation_id": "c1", "type": "chat"})
+    await settle()
+    await dispatcher.renew()
+    assert "c1" not in dispatcher._ownership
+    handled.clear()
+    dispatcher.dispatch({"conversation_id": "c1", "type": "chat"})
+    await settle()
+    assert not handled
+    assert not await dispatcher.is_owner("c1")
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_queue_overflow():
+    redis, handled = FakeRedis(), []
+    release = asyncio.Event()
+
+    async def slow_handler(data: dict):
+        await release.wait()
+        handled.append(data)
+
+    dispatcher = SessionDispatcher(redis, "channel", "m1", slow_handler, queue_size=2)
+    assert dispatcher.dispatch({"conversation_id": "c1", "type": "chat", "n": 0})
+    await settle()  # the worker takes the first message and blocks on it
+    results = [dispatcher.dispatch({"conversation_id": "c1", "type": "chat", "n": i}) for i in range(1, 4)]
+    assert results == [True, True, False]
+
+    # other sessions are not blocked by the slow one
+    assert dispatcher.dispatch({"conversation_id": "c2", "type": "chat", "n": 9})
+    release.set()
+    await settle()
+    assert sorted(i["n"] for i in handled) == [0, 1, 2, 9]
+    await dispatcher.close()
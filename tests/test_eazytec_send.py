@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_eazytec_send.py
+@Desc    : Unit tests for the Mailbox of eazytec_send.py
+"""
+import asyncio
+import threading
+
+import pytest
+
+from eazytec_send import (
+    FILE_REPLY,
+    MESSAGE_REPLY,
+    Mailbox,
+    get_cmd_output_for_recv,
+    get_connection_state,
+)
+
+
+async def wait_pending(mailbox: Mailbox, kind: str, count: int):
+    while mailbox.pending(kind) < count:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_out_of_order_replies_with_ids():
+    mailbox = Mailbox()
+    first = asyncio.create_task(mailbox.receive(FILE_REPLY, request_id="r1", timeout=5))
+    second = asyncio.create_task(mailbox.receive(FILE_REPLY, request_id="r2", timeout=5))
+    await wait_pending(mailbox, FILE_REPLY, 2)
+
+    mailbox.deliver(FILE_REPLY, "content of r2", request_id="r2")
+    mailbox.deliver(FILE_REPLY, "content of r1", request_id="r1")
+    assert await first == "content of r1"
+    assert await second == "content of r2"
+    assert mailbox.pending(FILE_REPLY) == 0
+
+
+@pytest.mark.asyncio
+async def test_replies_without_ids_go_fifo():
+    mailbox = Mailbox()
+    first = asyncio.create_task(mailbox.receive(MESSAGE_REPLY, timeout=5))
+    await wait_pending(mailbox, MESSAGE_REPLY, 1)
+    second = asyncio.create_task(mailbox.receive(MESSAGE_REPLY, timeout=5))
+    await wait_pending(mailbox, MESSAGE_REPLY, 2)
+
+    mailbox.deliver(MESSAGE_REPLY, "a")
+    mailbox.deliver(MESSAGE_REPLY, "b")
+    assert await first == "a" and await second == "b"
+
+    # a reply of another kind is not taken
+    waiter = asyncio.create_task(mailbox.receive(MESSAGE_REPLY, timeout=5))
+    await wait_pending(mailbox, MESSAGE_REPLY, 1)
+    mailbox.deliver(FILE_REPLY, "file")
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    mailbox.deliver(MESSAGE_REPLY, "c")
+    assert await waiter == "c"
+
+
+@pytest.mark.asyncio
+async def test_reply_before_receive():
+    mailbox = Mailbox()
+    mailbox.deliver(FILE_REPLY, "early r2", request_id="r2")
+    mailbox.deliver(FILE_REPLY, "early r1", request_id="r1")
+    mailbox.deliver(MESSAGE_REPLY, "early message")
+
+    assert await mailbox.receive(FILE_REPLY, request_id="r1", timeout=1) == "early r1"
+    assert await mailbox.receive(FILE_REPLY, request_id="r2", timeout=1) == "early r2"
+    assert await mailbox.receive(MESSAGE_REPLY, timeout=1) == "early message"
+    assert mailbox.pending(FILE_REPLY) == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_removes_waiter():
+    mailbox = Mailbox()
+    with pytest.raises(asyncio.TimeoutError):
+        await mailbox.receive(FILE_REPLY, request_id="r1", timeout=0.05)
+    assert mailbox.pending(FILE_REPLY) == 0
+
+    # the late reply is kept for whoever asks for it next instead of resolving the dead future
+    mailbox.deliver(FILE_REPLY, "late", request_id="r1")
+    assert await mailbox.receive(FILE_REPLY, request_id="r1", timeout=1) == "late"
+
+
+@pytest.mark.asyncio
+async def test_delivery_from_another_thread():
+    mailbox = Mailbox()
+    results = {}
+
+    def receive_on_own_loop():
+        results["reply"] = asyncio.run(mailbox.receive(FILE_REPLY, request_id="r1", timeout=5))
+
+    thread = threading.Thread(target=receive_on_own_loop)
+    thread.start()
+    await wait_pending(mailbox, FILE_REPLY, 1)
+
+    waiter = asyncio.create_task(mailbox.receive(FILE_REPLY, request_id="r2", timeout=5))
+    await wait_pending(mailbox, FILE_REPLY, 2)
+    await asyncio.to_thread(mailbox.deliver, FILE_REPLY, "for the thread", "r1")
+    mailbox.deliver(FILE_REPLY, "for this loop", request_id="r2")
+
+    assert await waiter == "for this loop"
+    await asyncio.to_thread(thread.join, 5)
+    assert results["reply"] == "for the thread"
+
+
+class _Sio:
+    sid = "sio-cmd"
+
+
+@pytest.mark.asyncio
+async def test_cmd_output_timeout():
+    sio = _Sio()
+    output = await get_cmd_output_for_recv(sio, "s1", "r1", timeout=0.05)
+    assert "Error: no output of the command received within 0.05s" in output
+
+    get_connection_state(sio, "s1").mailbox.deliver(MESSAGE_REPLY, "done", request_id="r2")
+    assert await get_cmd_output_for_recv(sio, "s1", "r2", timeout=1) == "done"